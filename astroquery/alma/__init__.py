@@ -23,6 +23,11 @@ class Conf(_config.ConfigNamespace):
 
     timeout = _config.ConfigItem(60, "Timeout in seconds.")
 
+    proprietary_ttl = _config.ConfigItem(
+        300,
+        'Number of seconds the proprietary status of a UID is kept in memory '
+        'before being requested again.')
+
     archive_url = _config.ConfigItem(
         _url_list,
         'The ALMA Archive mirror to use.')
@@ -7,6 +7,8 @@ import numpy as np
 import re
 import tarfile
 import string
+import threading
+import time
 import requests
 import warnings
 from pkg_resources import resource_filename
@@ -15,7 +17,7 @@ import pyvo
 
 from six.moves.urllib_parse import urljoin
 import six
-from astropy.table import Table, Column, vstack as table_vstack
+from astropy.table import Table, Column, MaskedColumn
 from astropy import log
 from astropy.utils.console import ProgressBar
 from astropy.utils.exceptions import AstropyDeprecationWarning
@@ -39,6 +41,14 @@ __doctest_skip__ = ['AlmaClass.*']
 ALMA_TAP_PATH = 'tap'
 ALMA_SIA_PATH = 'sia'
 
+# proprietary status of the UIDs, keyed by (data archive URL, UID), as
+# (time of the request, status) pairs; shared by all the AlmaClass instances
+_proprietary_status = {}
+_proprietary_status_lock = threading.Lock()
+
+# placeholder for the properties missing from a product
+_MISSING = object()
+
 # Map from ALMA ObsCore result to ALMA original query result
 # The map is provided in order to preserve the name of the columns in the
 # original ALMA query original results and make it backwards compatible
@@ -464,10 +474,14 @@ class AlmaClass(QueryWithLogin):
                              "on github.")
         return self.dataarchive_url
 
-    def stage_data(self, uids, expand_tarfiles=False, return_json=False):
+    def stage_data(self, uids, expand_tarfiles=False, return_json=False,
+                   max_workers=None):
         """
         Obtain table of ALMA files
 
+        The metadata of the UIDs and their proprietary status are requested
+        concurrently, with at most ``max_workers`` requests in progress.
+
         Parameters
         ----------
         uids : list or str
@@ -480,6 +494,9 @@ class AlmaClass(QueryWithLogin):
             Return a list of the JSON data sets returned from the query.  This
             is primarily intended as a debug routine, but may be useful if there
             are unusual scheduling block layouts.
+        max_workers : int, optional
+            Number of concurrent requests; defaults to
+            ``astroquery.query.conf.max_workers``.
 
         Returns
         -------
@@ -494,89 +511,132 @@ class AlmaClass(QueryWithLogin):
         if isinstance(uids, str):
             uids = [uids]
 
-        tables = []
-        for uu in uids:
-            log.debug("Retrieving metadata for {0}".format(uu))
-            uid = clean_uid(uu)
-            req = self._request('GET', '{dataarchive_url}/rh/data/expand/{uid}'
-                                .format(dataarchive_url=dataarchive_url,
-                                        uid=uid),
-                                cache=False)
-            req.raise_for_status()
-            try:
-                jdata = req.json()
-            # Note this exception does not work in Python 2.7
-            except json.JSONDecodeError:
-                if 'Central Authentication Service' in req.text or 'recentRequests' in req.url:
-                    # this indicates a wrong server is being used;
-                    # the "pre-feb2020" stager will be phased out
-                    # when the new services are deployed
-                    raise RemoteServiceError("Failed query!  This shouldn't happen - please "
-                                             "report the issue as it may indicate a change in "
-                                             "the ALMA servers.")
-                else:
-                    raise
-
-            if return_json:
-                tables.append(jdata)
-            else:
-                if jdata['type'] != 'PROJECT':
-                    log.error("Skipped uid {uu} because it is not a project and"
-                              "lacks the appropriate metadata; it is a "
-                              "{jdata}".format(uu=uu, jdata=jdata['type']))
-                    continue
-                if expand_tarfiles:
-                    table = uid_json_to_table(jdata, productlist=['ASDM',
-                                                                  'PIPELINE_PRODUCT'])
-                else:
-                    table = uid_json_to_table(jdata,
-                                              productlist=['ASDM',
-                                                           'PIPELINE_PRODUCT'
-                                                           'PIPELINE_PRODUCT_TARFILE',
-                                                           'PIPELINE_AUXILIARY_TARFILE'])
-                table['sizeInBytes'].unit = u.B
-                table.rename_column('sizeInBytes', 'size')
-                table.add_column(Column(data=['{dataarchive_url}/dataPortal/{name}'
-                                              .format(dataarchive_url=dataarchive_url,
-                                                      name=name)
-                                              for name in table['name']],
-                                        name='URL'))
-
-                isp = self.is_proprietary(uid)
-                table.add_column(Column(data=[isp for row in table],
-                                        name='isProprietary'))
-
-                tables.append(table)
-                log.debug("Completed metadata retrieval for {0}".format(uu))
-
-        if len(tables) == 0:
-            raise ValueError("No valid UIDs supplied.")
+        cleaned = [clean_uid(uu) for uu in uids]
+        log.debug("Retrieving metadata for {0} UIDs".format(len(cleaned)))
+        responses = self.request_many(
+            [dict(method='GET', url='{dataarchive_url}/rh/data/expand/{uid}'
+                  .format(dataarchive_url=dataarchive_url, uid=uid))
+             for uid in cleaned],
+            max_workers=max_workers, return_exceptions=False, cache=False)
+        jdatas = [_expand_json(req) for req in responses]
 
         if return_json:
-            return tables
+            if len(jdatas) == 0:
+                raise ValueError("No valid UIDs supplied.")
+            return jdatas
+
+        projects = []
+        for uu, uid, jdata in zip(uids, cleaned, jdatas):
+            if jdata['type'] != 'PROJECT':
+                log.error("Skipped uid {uu} because it is not a project and"
+                          "lacks the appropriate metadata; it is a "
+                          "{jdata}".format(uu=uu, jdata=jdata['type']))
+                continue
+            projects.append((uid, jdata))
+
+        if len(projects) == 0:
+            raise ValueError("No valid UIDs supplied.")
 
-        table = table_vstack(tables)
+        if expand_tarfiles:
+            productlist = ['ASDM', 'PIPELINE_PRODUCT']
+        else:
+            productlist = ['ASDM',
+                           'PIPELINE_PRODUCT'
+                           'PIPELINE_PRODUCT_TARFILE',
+                           'PIPELINE_AUXILIARY_TARFILE']
+        columns, counts = _uid_json_columns([jdata for uid, jdata in projects],
+                                            productlist)
+        if len(columns) == 0:
+            raise ValueError("No files found for the supplied UIDs.")
+
+        status = self.get_proprietary_status([uid for uid, jdata in projects],
+                                             max_workers=max_workers)
+        columns['URL'] = ['{dataarchive_url}/dataPortal/{name}'
+                          .format(dataarchive_url=dataarchive_url, name=name)
+                          for name in columns['name']]
+        columns['isProprietary'] = np.repeat(
+            np.array([status[uid] for uid, jdata in projects], dtype=bool),
+            counts)
+        table = _columns_to_table(columns)
+        table['sizeInBytes'].unit = u.B
+        table.rename_column('sizeInBytes', 'size')
+        log.debug("Completed metadata retrieval for {0} UIDs"
+                  .format(len(projects)))
 
         return table
 
-    def is_proprietary(self, uid):
+    def is_proprietary(self, uid, cache=True):
         """
         Given an ALMA UID, query the servers to determine whether it is
-        proprietary or not.  This will never be cached, since proprietarity is
-        time-sensitive.
+        proprietary or not.  Since proprietarity is time-sensitive, the
+        answer is only kept for ``conf.proprietary_ttl`` seconds.
+
+        Parameters
+        ----------
+        uid : str
+            A valid UID.
+        cache : bool
+            If False, always query the servers.
         """
-        dataarchive_url = self._get_dataarchive_url()
+        return self.get_proprietary_status([uid], cache=cache)[uid]
 
-        is_proprietary = self._request('GET',
-                                       '{dataarchive_url}/rh/access/{uid}'
-                                       .format(dataarchive_url=dataarchive_url,
-                                               uid=clean_uid(uid)), cache=False)
+    def get_proprietary_status(self, uids, max_workers=None, cache=True):
+        """
+        Determine whether many ALMA UIDs are proprietary or not.
 
-        is_proprietary.raise_for_status()
+        The UIDs whose status was obtained less than ``conf.proprietary_ttl``
+        seconds ago are not queried again; the others are queried
+        concurrently.
 
-        isp = is_proprietary.json()['isProprietary']
+        Parameters
+        ----------
+        uids : list
+            A list of valid UIDs.
+        max_workers : int, optional
+            Number of concurrent requests; defaults to
+            ``astroquery.query.conf.max_workers``.
+        cache : bool
+            If False, query the servers for all the UIDs.
 
-        return isp
+        Returns
+        -------
+        status : dict
+            The proprietary status of each UID of ``uids``.
+        """
+        dataarchive_url = self._get_dataarchive_url()
+
+        status = {}
+        missing = []
+        now = time.time()
+        with _proprietary_status_lock:
+            for uid in uids:
+                key = (dataarchive_url, clean_uid(uid))
+                entry = _proprietary_status.get(key)
+                if cache and entry is not None and \
+                        now - entry[0] < conf.proprietary_ttl:
+                    status[uid] = entry[1]
+                elif key not in missing:
+                    missing.append(key)
+
+        if missing:
+            responses = self.request_many(
+                [dict(method='GET', url='{dataarchive_url}/rh/access/{uid}'
+                      .format(dataarchive_url=dataarchive_url, uid=uid))
+                 for dataarchive_url, uid in missing],
+                max_workers=max_workers, return_exceptions=False, cache=False)
+            fetched = {}
+            for key, response in zip(missing, responses):
+                response.raise_for_status()
+                fetched[key] = response.json()['isProprietary']
+            now = time.time()
+            with _proprietary_status_lock:
+                _proprietary_status.update((key, (now, value))
+                                           for key, value in fetched.items())
+            for uid in uids:
+                if uid not in status:
+                    status[uid] = fetched[(dataarchive_url, clean_uid(uid))]
+
+        return status
 
     def _HEADER_data_size(self, files):
         """
@@ -1187,28 +1247,92 @@ def uid_json_to_table(jdata,
                       productlist=['ASDM', 'PIPELINE_PRODUCT',
                                    'PIPELINE_PRODUCT_TARFILE',
                                    'PIPELINE_AUXILIARY_TARFILE']):
-    rows = []
+    """
+    Convert the expansion of a UID returned by the ALMA data service, or a
+    list of them, to a table with a row per product.
+    """
+    if isinstance(jdata, dict):
+        jdata = [jdata]
+    return _columns_to_table(_uid_json_columns(jdata, productlist)[0])
+
+
+def _uid_json_columns(jdatas, productlist):
+    """
+    Collect the products of UID expansions in a single pass, as a dict of
+    value lists keyed by column name, along with the number of products of
+    each expansion.  The values of the keys missing from a product are
+    ``_MISSING``.
+    """
+    productlist = set(productlist)
+    # the columns of the product properties, in order of first appearance
+    fields = {}
+    mous_uids = []
+    counts = []
 
     def flatten_jdata(this_jdata, mousID=None):
         if isinstance(this_jdata, list):
             for kk in this_jdata:
                 if kk['type'] in productlist:
-                    kk['mous_uid'] = mousID
-                    rows.append(kk)
+                    nrows = len(mous_uids)
+                    for key, value in kk.items():
+                        if key not in ('children', 'allMousUids'):
+                            if key not in fields:
+                                fields[key] = [_MISSING] * nrows
+                            fields[key].append(value)
+                    mous_uids.append(mousID)
+                    for values in fields.values():
+                        if len(values) == nrows:
+                            values.append(_MISSING)
                 elif len(kk['children']) > 0:
                     if len(kk['allMousUids']) == 1:
                         flatten_jdata(kk['children'], kk['allMousUids'][0])
                     else:
                         flatten_jdata(kk['children'])
 
-    flatten_jdata(jdata['children'])
-
-    keys = rows[-1].keys()
-
-    columns = [Column(data=[row[key] for row in rows], name=key)
-               for key in keys if key not in ('children', 'allMousUids')]
+    for jdata in jdatas:
+        before = len(mous_uids)
+        flatten_jdata(jdata['children'])
+        counts.append(len(mous_uids) - before)
+
+    columns = fields
+    if fields:
+        columns['mous_uid'] = mous_uids
+    return columns, counts
+
+
+def _columns_to_table(columns):
+    table = Table()
+    for key, values in columns.items():
+        if isinstance(values, list) and _MISSING in values:
+            # a property missing from some of the products
+            mask = [value is _MISSING for value in values]
+            fill = next(value for value in values if value is not _MISSING)
+            table[key] = MaskedColumn(
+                data=[fill if missing else value
+                      for value, missing in zip(values, mask)],
+                mask=mask, name=key)
+        else:
+            table[key] = Column(data=values, name=key)
+        if table[key].dtype.name == 'object':
+            table[key] = table[key].astype(str)
+    return table
 
-    columns = [col.astype(str) if col.dtype.name == 'object' else col for col
-               in columns]
 
-    return Table(columns)
+def _expand_json(req):
+    """
+    Decode the response of a ``rh/data/expand`` request.
+    """
+    req.raise_for_status()
+    try:
+        return req.json()
+    # Note this exception does not work in Python 2.7
+    except json.JSONDecodeError:
+        if 'Central Authentication Service' in req.text or 'recentRequests' in req.url:
+            # this indicates a wrong server is being used;
+            # the "pre-feb2020" stager will be phased out
+            # when the new services are deployed
+            raise RemoteServiceError("Failed query!  This shouldn't happen - please "
+                                     "report the issue as it may indicate a change in "
+                                     "the ALMA servers.")
+        else:
+            raise
@@ -4,6 +4,7 @@ import os
 import pytest
 from unittest.mock import patch, Mock
 from six import StringIO
+from requests import HTTPError
 
 from astropy import units as u
 from astropy import coordinates as coord
@@ -11,8 +12,9 @@ from astropy.table import Table
 from astropy.coordinates import SkyCoord
 from astropy.time import Time
 
-from astroquery.alma import Alma
-from astroquery.alma.core import _gen_sql, _OBSCORE_TO_ALMARESULT
+from astroquery.alma import Alma, AlmaClass, conf
+from astroquery.alma.core import (_gen_sql, _OBSCORE_TO_ALMARESULT,
+                                  uid_json_to_table)
 from astroquery.alma.tapsql import _val_parse
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
@@ -372,3 +374,115 @@ def test_tap():
 
     tap_mock.search.assert_called_once_with('select * from ivoa.ObsCore',
                                             language='ADQL')
+
+
+def expand_json(uid, ntar=2):
+    """An ``rh/data/expand`` response of a project with one member OUS"""
+    mous = uid.replace('___', '://').replace('_', '/')
+    products = [{'type': 'ASDM', 'id': None, 'permission': 'UNKNOWN',
+                 'name': '{0}_{1}.asdm.sdm.tar'.format(uid, ii),
+                 'sizeInBytes': 1000 * (ii + 1), 'children': [],
+                 'allMousUids': []}
+                for ii in range(ntar)]
+    products.append({'type': 'PIPELINE_PRODUCT', 'id': 'product',
+                     'permission': 'UNKNOWN', 'name': uid + '.fits',
+                     'sizeInBytes': 10, 'children': [], 'allMousUids': []})
+    return {'type': 'PROJECT', 'id': uid, 'name': uid, 'sizeInBytes': 0,
+            'permission': 'UNKNOWN', 'allMousUids': [mous],
+            'children': [{'type': 'GROUP', 'id': None, 'name': 'group',
+                          'sizeInBytes': 0, 'permission': 'UNKNOWN',
+                          'allMousUids': [mous], 'children': products}]}
+
+
+def test_stage_data():
+    urls = []
+
+    def request(method, url, **kwargs):
+        urls.append(url)
+        uid = url.rsplit('/', 1)[1]
+        response = Mock()
+        if '/rh/access/' in url:
+            response.json.return_value = {'isProprietary': uid.endswith('1')}
+        else:
+            response.json.return_value = expand_json(uid)
+        return response
+
+    alma = AlmaClass()
+    alma.dataarchive_url = 'https://almascience.example'
+    alma._request = request
+    uids = ['uid://A001/X1/X1', 'uid://A001/X1/X2', 'uid://A001/X1/X3']
+    with conf.set_temp('proprietary_ttl', 60):
+        result = alma.stage_data(uids, max_workers=2)
+        assert len(urls) == 6
+        assert len(result) == 6
+        assert list(result['name'][:2]) == ['uid___A001_X1_X1_0.asdm.sdm.tar',
+                                            'uid___A001_X1_X1_1.asdm.sdm.tar']
+        assert list(result['mous_uid'][::2]) == uids
+        assert list(result['isProprietary']) == [True, True, False, False,
+                                                 False, False]
+        assert result['URL'][0] == ('https://almascience.example/dataPortal/'
+                                    'uid___A001_X1_X1_0.asdm.sdm.tar')
+        assert result['size'].unit == u.B
+        assert result['size'][1] == 2000
+        assert list(result['id']) == ['None'] * 6
+
+        # the proprietary status is not requested again
+        assert alma.is_proprietary(uids[0])
+        assert len(urls) == 6
+        alma.stage_data(uids[:1], expand_tarfiles=True)
+        assert len(urls) == 7
+
+    with conf.set_temp('proprietary_ttl', 0):
+        assert not alma.is_proprietary(uids[1])
+        assert len(urls) == 8
+
+
+def test_get_proprietary_status_error():
+    urls = []
+
+    def request(method, url, **kwargs):
+        urls.append(url)
+        uid = url.rsplit('/', 1)[1]
+        response = Mock()
+        if uid.endswith('X2') and len(urls) <= 3:
+            response.raise_for_status.side_effect = HTTPError('500')
+        response.json.return_value = {'isProprietary': False}
+        return response
+
+    alma = AlmaClass()
+    alma.dataarchive_url = 'https://almascience.example'
+    alma._request = request
+    uids = ['uid://A001/X2/X1', 'uid://A001/X2/X2', 'uid://A001/X2/X3']
+    with conf.set_temp('proprietary_ttl', 60):
+        with pytest.raises(HTTPError):
+            alma.get_proprietary_status(uids, max_workers=1)
+        # no status is kept from a failed request
+        assert alma.get_proprietary_status(uids) == dict.fromkeys(uids,
+                                                                  False)
+        assert len(urls) == 6
+
+
+def test_uid_json_to_table():
+    table = uid_json_to_table(expand_json('uid___A001_X1_X1'))
+    assert table.colnames == ['type', 'id', 'permission', 'name',
+                              'sizeInBytes', 'mous_uid']
+    assert list(table['type']) == ['ASDM', 'ASDM', 'PIPELINE_PRODUCT']
+    table = uid_json_to_table([expand_json('uid___A001_X1_X1'),
+                               expand_json('uid___A001_X1_X2', ntar=1)],
+                              productlist=['ASDM'])
+    assert list(table['mous_uid']) == ['uid://A001/X1/X1'] * 2 + \
+        ['uid://A001/X1/X2']
+
+
+def test_uid_json_to_table_missing_keys():
+    jdata = expand_json('uid___A001_X1_X1', ntar=1)
+    products = jdata['children'][0]['children']
+    del products[0]['permission']
+    products[1]['md5'] = 'abc'
+    table = uid_json_to_table(jdata)
+    assert table.colnames == ['type', 'id', 'name', 'sizeInBytes',
+                              'permission', 'md5', 'mous_uid']
+    assert list(table['permission'].mask) == [True, False]
+    assert table['permission'][1] == 'UNKNOWN'
+    assert list(table['md5'].mask) == [True, False]
+    assert table['md5'][1] == 'abc'
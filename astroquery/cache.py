@@ -0,0 +1,706 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Response cache backends used by `~astroquery.query.BaseQuery`.
+
+Cached responses are stored as their status, headers and raw body rather than
+as pickled `requests.Response` objects.  Three storage backends are available:
+
+* ``directory``: one raw body file plus a small JSON metadata file per
+  response, in the service cache directory.
+* ``sqlite``: a single indexed SQLite database per service cache directory.
+* ``memory``: an in-process LRU store, which can also be placed in front of
+  either persistent backend as a tier (see ``conf.memory_tier_bytes``).
+
+All backends honour a maximum size in bytes, evicting the least recently used
+entries beyond it, an optional time to live, and keep hit/miss statistics.
+"""
+import base64
+import io
+import json
+import mmap
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from astropy import config as _config
+from astropy.logger import log
+import astropy.utils.data
+
+__all__ = ['CacheEntry', 'CachedResponse', 'CacheStats', 'CacheBackend',
+           'DirectoryCacheBackend', 'SQLiteCacheBackend',
+           'MemoryCacheBackend', 'TieredCacheBackend',
+           'get_cache_backend', 'Conf', 'conf']
+
+
+class Conf(_config.ConfigNamespace):
+    """
+    Configuration parameters for `astroquery.cache`.
+    """
+    backend = _config.ConfigItem(
+        ['directory', 'sqlite', 'memory'],
+        'Storage backend used for cached responses.')
+
+    max_bytes = _config.ConfigItem(
+        2 ** 30,
+        'Maximum size in bytes of the response cache of each service. Least '
+        'recently used responses are evicted beyond it; 0 means no limit.')
+
+    ttl = _config.ConfigItem(
+        0.,
+        'Default time to live of cached responses in seconds; 0 means '
+        'responses never expire. Can be overridden per service with the '
+        '``cache_ttl`` attribute of the query class.')
+
+    memory_tier_bytes = _config.ConfigItem(
+        0,
+        'Size in bytes of an in-memory LRU tier placed in front of the '
+        'persistent backend; 0 disables the tier.')
+
+
+conf = Conf()
+
+
+class CacheEntry(object):
+    """
+    The cached parts of an HTTP response: status, headers and raw body, plus
+    the request method, URL and body some parsers inspect.
+    """
+
+    def __init__(self, body=None, status_code=200, headers=None, url=None,
+                 encoding=None, reason=None, request=None, created=None,
+                 body_path=None, size=None):
+        self._body = body
+        self.body_path = body_path
+        self._size = size
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        self.url = url
+        self.encoding = encoding
+        self.reason = reason
+        self.request = request
+        self.created = time.time() if created is None else created
+
+    @property
+    def body(self):
+        """
+        The body as bytes.  Bodies stored in a file are read on first access.
+        """
+        if self._body is None and self.body_path is not None:
+            with open(self.body_path, 'rb') as f:
+                self._body = f.read()
+        return self._body
+
+    @property
+    def size(self):
+        if self._body is not None:
+            return len(self._body)
+        if self._size is None:
+            self._size = os.path.getsize(self.body_path)
+        return self._size
+
+    def open(self):
+        """
+        Return a binary file object over the body, streaming it from disk if
+        it is stored in a file.
+        """
+        if self._body is None and self.body_path is not None:
+            return open(self.body_path, 'rb')
+        return io.BytesIO(self.body)
+
+    def mmap(self):
+        """
+        Return the body as a read-only memory map if it is stored in a file,
+        or as bytes otherwise.  Slicing the result does not copy the body.
+        """
+        if self._body is None and self.body_path is not None and self.size:
+            with open(self.body_path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.body
+
+    @classmethod
+    def from_response(cls, response, body=True):
+        """
+        Build an entry from a `requests.Response`, reading its content unless
+        ``body`` is False.
+        """
+        request = getattr(response, 'request', None)
+        if request is not None:
+            request_body = request.body
+            if not isinstance(request_body, (bytes, str)):
+                # streamed or generated uploads cannot be stored
+                request_body = None
+            request = {'method': request.method, 'url': request.url,
+                       'headers': dict(request.headers),
+                       'body': request_body}
+        return cls(response.content if body else None,
+                   status_code=response.status_code,
+                   headers=response.headers, url=response.url,
+                   encoding=response.encoding, reason=response.reason,
+                   request=request)
+
+    def to_response(self):
+        """
+        Rebuild a `requests.Response` from the entry.  Bodies stored in a file
+        are only read when the response content is accessed.
+        """
+        response = CachedResponse(self)
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = self.encoding
+        response.reason = self.reason
+        if self.request is not None:
+            prepared = requests.PreparedRequest()
+            prepared.method = self.request['method']
+            prepared.url = self.request['url']
+            prepared.headers = CaseInsensitiveDict(self.request['headers'])
+            prepared.body = self.request['body']
+            response.request = prepared
+        return response
+
+    def metadata(self):
+        """
+        JSON-serializable description of everything but the body.
+        """
+        meta = {'status_code': self.status_code, 'headers': self.headers,
+                'url': self.url, 'encoding': self.encoding,
+                'reason': self.reason, 'created': self.created,
+                'size': self.size, 'request': None}
+        if self.request is not None:
+            request = dict(self.request)
+            if isinstance(request['body'], bytes):
+                request['body'] = base64.b64encode(request['body']).decode('ascii')
+                request['body_b64'] = True
+            meta['request'] = request
+        return meta
+
+    @classmethod
+    def from_metadata(cls, meta, body=None, body_path=None):
+        request = meta.get('request')
+        if request is not None and request.pop('body_b64', False):
+            request['body'] = base64.b64decode(request['body'])
+        return cls(body, status_code=meta['status_code'],
+                   headers=meta['headers'], url=meta['url'],
+                   encoding=meta['encoding'], reason=meta['reason'],
+                   request=request, created=meta['created'],
+                   body_path=body_path, size=meta.get('size'))
+
+
+class CachedResponse(requests.Response):
+    """
+    A `requests.Response` rebuilt from a `CacheEntry`.
+
+    If the body is stored in a file, ``content`` reads it in a single pass on
+    first access, and `open_body` streams it without loading it in memory.
+    """
+
+    def __init__(self, entry):
+        super(CachedResponse, self).__init__()
+        self._entry = entry
+        if entry._body is not None:
+            self._content = entry._body
+            self._content_consumed = True
+
+    @property
+    def content(self):
+        if self._content is False:
+            self._content = self._entry.body
+            self._content_consumed = True
+        return self._content
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        if self._content is False:
+            # serve the chunks from the content read in one pass
+            self.content
+        return super(CachedResponse, self).iter_content(
+            chunk_size, decode_unicode=decode_unicode)
+
+    def open_body(self):
+        """
+        Return a binary file object over the body; bodies stored in a file
+        are streamed from disk.
+        """
+        if self._content is False:
+            return self._entry.open()
+        return io.BytesIO(self._content)
+
+    def close(self):
+        pass
+
+
+class CacheStats(object):
+    """
+    Hit, miss, store and eviction counters of a cache backend.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def lookups(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.
+
+    def __repr__(self):
+        return ("<CacheStats hits={0} misses={1} stores={2} evictions={3} "
+                "expirations={4}>".format(self.hits, self.misses, self.stores,
+                                          self.evictions, self.expirations))
+
+
+class CacheBackend(object):
+    """
+    Base class of the response cache backends.
+
+    Subclasses implement the storage primitives ``_load``, ``_store``,
+    ``_remove``, ``_lru_keys``, ``_keys`` and ``total_bytes``; size bounding,
+    expiry and statistics are handled here.
+
+    Parameters
+    ----------
+    max_bytes : int or None
+        Maximum total size of the stored bodies.  Least recently used entries
+        are evicted beyond it.  ``None`` or 0 means no limit.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or None
+        self.stats = CacheStats()
+        self._lock = threading.RLock()
+
+    def get(self, key, ttl=None):
+        """
+        Return the `CacheEntry` stored under ``key``, or `None` on a miss.
+
+        Entries older than ``ttl`` seconds are removed and count as misses.
+        """
+        with self._lock:
+            entry = self._load(key)
+            if entry is not None and ttl and time.time() - entry.created > ttl:
+                self._remove(key)
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """
+        Store ``entry`` under ``key`` and evict entries beyond ``max_bytes``.
+        """
+        with self._lock:
+            if self.max_bytes is not None and entry.size > self.max_bytes:
+                log.debug("Not caching {0}: {1} bytes exceed the cache size "
+                          "limit".format(key, entry.size))
+                return
+            self._store(key, entry)
+            self.stats.stores += 1
+            self._evict()
+
+    def put_response(self, key, response):
+        """
+        Store a `requests.Response` under ``key``.
+
+        Returns the response to hand back to the caller, which may be a
+        `CachedResponse` replacing a consumed streamed response.
+        """
+        self.put(key, CacheEntry.from_response(response))
+        return response
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._keys()):
+                self._remove(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in set(self._keys())
+
+    def __len__(self):
+        with self._lock:
+            return len(list(self._keys()))
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for key, size in self._lru_keys():
+            self._remove(key)
+            self.stats.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def total_bytes(self):
+        raise NotImplementedError
+
+    def _load(self, key):
+        raise NotImplementedError
+
+    def _store(self, key, entry):
+        raise NotImplementedError
+
+    def _remove(self, key):
+        raise NotImplementedError
+
+    def _keys(self):
+        raise NotImplementedError
+
+    def _lru_keys(self):
+        """
+        Yield ``(key, size)`` pairs, least recently used first.
+        """
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU cache backend.
+    """
+
+    def __init__(self, max_bytes=None):
+        super(MemoryCacheBackend, self).__init__(max_bytes)
+        self._entries = OrderedDict()
+        self._total = 0
+
+    def total_bytes(self):
+        return self._total
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self._remove(key)
+        # read bodies stored in files, the point of this tier is to hold
+        # them in memory
+        entry.body
+        self._entries[key] = entry
+        self._total += entry.size
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total -= entry.size
+
+    def _keys(self):
+        return self._entries.keys()
+
+    def _lru_keys(self):
+        return [(key, entry.size) for key, entry in self._entries.items()]
+
+
+class DirectoryCacheBackend(CacheBackend):
+    """
+    Cache backend storing each response as a raw ``<key>.body`` file next to a
+    ``<key>.meta`` JSON file.  The modification time of the metadata file
+    records the last access and drives LRU eviction.
+
+    Responses cached by older astroquery versions as ``<key>.pickle`` are
+    still read, but never written.
+    """
+
+    def __init__(self, location, max_bytes=None):
+        super(DirectoryCacheBackend, self).__init__(max_bytes)
+        self.location = location
+        self._total = None
+
+    def _path(self, key, ext):
+        return os.path.join(self.location, key + ext)
+
+    def total_bytes(self):
+        if self._total is None:
+            self._total = sum(size for _, size in self._lru_keys())
+        return self._total
+
+    def _load(self, key):
+        meta_file = self._path(key, '.meta')
+        body_file = self._path(key, '.body')
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            meta['size'] = os.stat(body_file).st_size
+        except (IOError, OSError, ValueError):
+            return self._load_legacy(key)
+        try:
+            os.utime(meta_file, None)
+        except OSError:
+            pass
+        log.debug("Retrieving data from {0}".format(meta_file))
+        # the body is left on disk until it is accessed
+        return CacheEntry.from_metadata(meta, body_path=body_file)
+
+    def _load_legacy(self, key):
+        request_file = self._path(key, '.pickle')
+        try:
+            with open(request_file, 'rb') as f:
+                response = pickle.load(f)
+        except (IOError, OSError):
+            return None
+        if not isinstance(response, requests.Response):
+            return None
+        log.debug("Retrieving data from {0}".format(request_file))
+        return CacheEntry.from_response(response)
+
+    def _write(self, path, data, mode):
+        # write then rename so concurrent readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put_response(self, key, response):
+        """
+        Store a `requests.Response` under ``key``, streaming a body that has
+        not been read yet straight to disk.
+
+        Returns a `CachedResponse` reading the stored body, so that the body
+        of a streamed response is never held in memory as a whole.
+        """
+        if response._content is not False:
+            return super(DirectoryCacheBackend, self).put_response(key,
+                                                                   response)
+        blocksize = astropy.utils.data.conf.download_block_size
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            for block in response.iter_content(blocksize):
+                f.write(block)
+        response.close()
+        size = os.path.getsize(tmp_path)
+        if self.max_bytes is not None and size > self.max_bytes:
+            log.debug("Not caching {0}: {1} bytes exceed the cache size "
+                      "limit".format(key, size))
+            with open(tmp_path, 'rb') as f:
+                response._content = f.read()
+            os.remove(tmp_path)
+            return response
+
+        entry = CacheEntry.from_response(response, body=False)
+        entry._size = size
+        with self._lock:
+            self._remove(key)
+            log.debug("Caching data to {0}".format(self._path(key, '.body')))
+            os.replace(tmp_path, self._path(key, '.body'))
+            self._write(self._path(key, '.meta'), json.dumps(entry.metadata()),
+                        'w')
+            if self._total is not None:
+                self._total += size
+            self.stats.stores += 1
+            self._evict()
+        entry.body_path = self._path(key, '.body')
+        return entry.to_response()
+
+    def _store(self, key, entry):
+        self._remove(key)
+        log.debug("Caching data to {0}".format(self._path(key, '.body')))
+        self._write(self._path(key, '.body'), entry.body, 'wb')
+        self._write(self._path(key, '.meta'), json.dumps(entry.metadata()), 'w')
+        if self._total is not None:
+            self._total += entry.size
+
+    def _remove(self, key):
+        try:
+            size = os.stat(self._path(key, '.body')).st_size
+        except OSError:
+            size = None
+        for ext in ('.meta', '.body'):
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+        if size is not None and self._total is not None:
+            self._total -= size
+
+    def _keys(self):
+        return [name[:-5] for name in os.listdir(self.location)
+                if name.endswith('.meta')]
+
+    def _lru_keys(self):
+        entries = []
+        for key in self._keys():
+            try:
+                accessed = os.stat(self._path(key, '.meta')).st_mtime
+                size = os.stat(self._path(key, '.body')).st_size
+            except OSError:
+                continue
+            entries.append((accessed, key, size))
+        entries.sort()
+        return [(key, size) for _, key, size in entries]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache backend storing all responses of a service in a single indexed
+    SQLite database file, ``cache.sqlite``, in the cache directory.
+    """
+
+    filename = 'cache.sqlite'
+
+    def __init__(self, location, max_bytes=None):
+        super(SQLiteCacheBackend, self).__init__(max_bytes)
+        self.location = location
+        self._db = sqlite3.connect(os.path.join(location, self.filename),
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, meta TEXT, body BLOB, size INTEGER, "
+                "accessed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed "
+                             "ON responses (accessed)")
+
+    def total_bytes(self):
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _load(self, key):
+        row = self._db.execute("SELECT meta, body FROM responses WHERE key=?",
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        with self._db:
+            self._db.execute("UPDATE responses SET accessed=? WHERE key=?",
+                             (time.time(), key))
+        return CacheEntry.from_metadata(json.loads(row[0]), bytes(row[1]))
+
+    def _store(self, key, entry):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(entry.metadata()), sqlite3.Binary(entry.body),
+                 entry.size, time.time()))
+
+    def _remove(self, key):
+        with self._db:
+            self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+
+    def _keys(self):
+        return [row[0] for row in
+                self._db.execute("SELECT key FROM responses")]
+
+    def _lru_keys(self):
+        return self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed").fetchall()
+
+
+class TieredCacheBackend(CacheBackend):
+    """
+    Chain of cache backends, fastest first.  Hits in a slower tier are
+    promoted into the faster ones; stores go to every tier.
+    """
+
+    def __init__(self, *tiers):
+        super(TieredCacheBackend, self).__init__()
+        self.tiers = tiers
+
+    def get(self, key, ttl=None):
+        with self._lock:
+            for i, tier in enumerate(self.tiers):
+                entry = tier.get(key, ttl=ttl)
+                if entry is not None:
+                    for faster in self.tiers[:i]:
+                        faster.put(key, entry)
+                    self.stats.hits += 1
+                    return entry
+            self.stats.misses += 1
+            return None
+
+    def put(self, key, entry):
+        with self._lock:
+            for tier in self.tiers:
+                tier.put(key, entry)
+            self.stats.stores += 1
+
+    def put_response(self, key, response):
+        # responses are promoted to the faster tiers when they are read again
+        with self._lock:
+            self.stats.stores += 1
+            return self.tiers[-1].put_response(key, response)
+
+    def delete(self, key):
+        with self._lock:
+            for tier in self.tiers:
+                tier.delete(key)
+
+    def clear(self):
+        with self._lock:
+            for tier in self.tiers:
+                tier.clear()
+
+    def __contains__(self, key):
+        return any(key in tier for tier in self.tiers)
+
+    def __len__(self):
+        return len(self.tiers[-1])
+
+    def total_bytes(self):
+        return self.tiers[-1].total_bytes()
+
+
+_BACKENDS = {'directory': DirectoryCacheBackend,
+             'sqlite': SQLiteCacheBackend}
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache_backend(location, backend=None):
+    """
+    Return the shared cache backend for a cache directory.
+
+    Instances are shared between all query objects using the same directory,
+    so the in-memory tier and statistics are common to them.
+
+    Parameters
+    ----------
+    location : str
+        The cache directory, e.g. ``BaseQuery.cache_location``.
+    backend : str or `CacheBackend`, optional
+        ``'directory'``, ``'sqlite'`` or ``'memory'``, or a backend instance
+        which is returned as-is.  Defaults to ``conf.backend``.
+    """
+    if isinstance(backend, CacheBackend):
+        return backend
+    backend = backend or conf.backend
+    if backend != 'memory' and backend not in _BACKENDS:
+        raise ValueError("Unknown cache backend '{0}'; must be one of "
+                         "'directory', 'sqlite' or 'memory'.".format(backend))
+    key = (backend, os.path.abspath(location), conf.max_bytes,
+           conf.memory_tier_bytes)
+    with _registry_lock:
+        if key not in _registry:
+            if backend == 'memory':
+                cache = MemoryCacheBackend(conf.max_bytes)
+            else:
+                cache = _BACKENDS[backend](location, conf.max_bytes)
+                if conf.memory_tier_bytes:
+                    cache = TieredCacheBackend(
+                        MemoryCacheBackend(conf.memory_tier_bytes), cache)
+            _registry[key] = cache
+        return _registry[key]
@@ -18,6 +18,7 @@ from astropy import log
 
 from ..exceptions import LoginError, RemoteServiceError, NoResultsWarning
 from ..utils import schema, system_tools
+from ..utils.download_manager import DownloadManager
 from ..query import QueryWithLogin, suspend_cache
 from . import conf
 
@@ -808,12 +809,23 @@ class EsoClass(QueryWithLogin):
             nfiles = len(fileLinks)
             log.info("Downloading {} files...".format(nfiles))
             log.debug("Files:\n{}".format('\n'.join(fileLinks)))
-            for i, fileLink in enumerate(fileLinks, 1):
+            downloads = []
+            for fileLink in fileLinks:
+                local_filename = fileLink.rsplit('/', maxsplit=1)[1]
+                if os.name == 'nt':
+                    # Windows doesn't allow ":" in filenames
+                    local_filename = local_filename.replace(':', '_')
+                downloads.append((fileLink, os.path.join(self.cache_location,
+                                                         local_filename)))
+            manifest = DownloadManager(self).download(downloads,
+                                                      continuation=True)
+            failed = []
+            for fileLink, row in zip(fileLinks, manifest):
                 fileId = fileLink.rsplit('/', maxsplit=1)[1]
-                log.info("Downloading file {}/{}: {}..."
-                         .format(i, nfiles, fileId))
-                filename = self._request("GET", fileLink, save=True,
-                                         continuation=True)
+                if row['Status'] != 'COMPLETE':
+                    failed.append(fileLink)
+                    continue
+                filename = str(row['Local Path'])
 
                 if filename.endswith(('.gz', '.7z', '.bz2', '.xz', '.Z')) and unzip:
                     log.info("Unzipping file {0}...".format(fileId))
@@ -827,6 +839,10 @@ class EsoClass(QueryWithLogin):
                 else:
                     files.append(filename)
 
+            if failed:
+                raise RemoteServiceError("The following files could not be "
+                                         "downloaded: {0}".format(failed))
+
         # Empty the redirect cache of this request session
         # Only available and needed for requests versions < 2.17
         try:
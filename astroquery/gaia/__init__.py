@@ -33,6 +33,25 @@ class Conf(_config.ConfigNamespace):
     ROW_LIMIT = _config.ConfigItem(50,
                                    "Number of rows to return from database "
                                    "query (set to -1 for unlimited).")
+    DATA_BATCH_SIZE = _config.ConfigItem(5000,
+                                         "Maximum number of identifiers of "
+                                         "a single load_data or "
+                                         "get_datalinks request; longer lists "
+                                         "are split into several requests.")
+    DATA_BATCH_WORKERS = _config.ConfigItem(4,
+                                            "Maximum number of load_data or "
+                                            "get_datalinks requests in "
+                                            "progress at once.")
+    MULTICONE_BATCH_SIZE = _config.ConfigItem(50000,
+                                              "Maximum number of positions "
+                                              "of a single "
+                                              "multi_cone_search job; longer "
+                                              "lists are split into several "
+                                              "jobs.")
+    MULTICONE_WORKERS = _config.ConfigItem(4,
+                                           "Maximum number of "
+                                           "multi_cone_search jobs in "
+                                           "progress at once.")
 
 
 conf = Conf()
@@ -15,9 +15,18 @@ Created on 30 jun. 2016
 
 """
 
+import hashlib
+import os
+
+import numpy as np
+
 from astroquery.utils.tap import TapPlus
+from astroquery.utils.tap.scheduler import JobScheduler
 from astroquery.utils import commons
 from astropy import units
+from astropy.coordinates import SkyCoord
+from astropy.logger import log
+from astropy.table import Table, vstack
 from astropy.units import Quantity
 import six
 from astroquery.utils.tap import taputils
@@ -57,10 +66,14 @@ class GaiaClass(TapPlus):
 
     def load_data(self, ids, retrieval_type="epoch_photometry",
                   valid_data=True, band=None, format="VOTABLE",
-                  output_file=None, verbose=False):
+                  output_file=None, verbose=False, output_dir=None,
+                  batch_size=None, max_workers=None):
         """Loads the specified table
         TAP+ only
 
+        Lists of more than 'batch_size' identifiers are split into several
+        requests, up to 'max_workers' of them in progress at once.
+
         Parameters
         ----------
         ids : str list, mandatory
@@ -82,12 +95,26 @@ class GaiaClass(TapPlus):
         output_file : string, optional, default None
             file where the results are saved.
             If it is not provided, the http response contents are returned.
+            The identifiers are then requested at once.
         verbose : bool, optional, default 'False'
             flag to display information about the process
+        output_dir : string, optional, default None
+            directory where the results of each request are saved as they
+            arrive, rather than kept in memory. Files already present are
+            not requested again, so that a call interrupted or partly failed
+            can be resumed by repeating it.
+        batch_size : int, optional, default None
+            maximum number of identifiers of a single request, by default
+            ``conf.DATA_BATCH_SIZE``
+        max_workers : int, optional, default None
+            maximum number of requests in progress at once, by default
+            ``conf.DATA_BATCH_WORKERS``
 
         Returns
         -------
-        A table object
+        A table object. If 'output_dir' is provided, a table with the
+        'Local Path', 'Status' ('COMPLETE' or 'ERROR') and 'Message' of each
+        request instead. If 'output_file' is provided, None.
         """
         if retrieval_type is None:
             raise ValueError("Missing mandatory argument 'retrieval_type'")
@@ -104,36 +131,99 @@ class GaiaClass(TapPlus):
                                  "'G', 'BP' and 'RP)" % band)
             else:
                 params_dict['BAND'] = band
-        if isinstance(ids, six.string_types):
-            ids_arg = ids
-        else:
-            if isinstance(ids, int):
-                ids_arg = str(ids)
-            else:
-                ids_arg = ','.join(str(item) for item in ids)
-        params_dict['ID'] = ids_arg
         params_dict['FORMAT'] = str(format)
         params_dict['RETRIEVAL_TYPE'] = str(retrieval_type)
-        return self.__gaiadata.load_data(params_dict=params_dict,
-                                         output_file=output_file,
-                                         verbose=verbose)
-
-    def get_datalinks(self, ids, verbose=False):
+        batches = _split_ids(ids, batch_size or conf.DATA_BATCH_SIZE)
+        if output_dir is None and (output_file is not None or
+                                   len(batches) == 1):
+            params_dict['ID'] = _join_ids(ids)
+            return self.__gaiadata.load_data(params_dict=params_dict,
+                                             output_file=output_file,
+                                             verbose=verbose)
+
+        def load_batch(batch):
+            return self.__gaiadata.load_data(
+                params_dict=dict(params_dict, ID=','.join(batch)),
+                verbose=verbose)
+
+        if output_dir is None:
+            tables = commons.map_concurrent(
+                load_batch, batches, max_workers or conf.DATA_BATCH_WORKERS,
+                return_exceptions=False)
+            return vstack(tables, metadata_conflicts='silent')
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+        extension = DATA_EXTENSIONS.get(str(format).lower(), '')
+
+        def save_batch(item):
+            index, batch = item
+            # named after the request parameters and identifiers, so that a
+            # resumed call with the same arguments finds the files already
+            # saved
+            key = ['{0}={1}'.format(name, params_dict[name])
+                   for name in sorted(params_dict)]
+            key.append('ID=' + ','.join(batch))
+            digest = hashlib.sha1('&'.join(key).encode('utf-8')).hexdigest()
+            file_name = os.path.join(output_dir, "{0}_{1:05d}_{2}{3}".format(
+                retrieval_type, index, digest[:12], extension))
+            if os.path.exists(file_name):
+                return [file_name, 'COMPLETE', None]
+            part_name = file_name + '.part'
+            try:
+                self.__gaiadata.load_data(
+                    params_dict=dict(params_dict, ID=','.join(batch)),
+                    output_file=part_name, verbose=verbose)
+                os.replace(part_name, file_name)
+            except Exception as ex:
+                if os.path.exists(part_name):
+                    os.remove(part_name)
+                log.warning("Loading {0} identifiers failed: {1}"
+                            .format(len(batch), ex))
+                return [file_name, 'ERROR', "{0}: {1}".format(
+                    ex.__class__.__name__, ex)]
+            return [file_name, 'COMPLETE', None]
+
+        rows = commons.map_concurrent(
+            save_batch, list(enumerate(batches)),
+            max_workers or conf.DATA_BATCH_WORKERS, return_exceptions=False)
+        return Table(rows=rows, names=('Local Path', 'Status', 'Message'),
+                     dtype=(str, str, object))
+
+    def get_datalinks(self, ids, verbose=False, batch_size=None,
+                      max_workers=None):
         """Gets datalinks associated to the provided identifiers
         TAP+ only
 
+        Lists of more than 'batch_size' identifiers are split into several
+        requests, up to 'max_workers' of them in progress at once.
+
         Parameters
         ----------
         ids : str list, mandatory
             list of identifiers
         verbose : bool, optional, default 'False'
             flag to display information about the process
+        batch_size : int, optional, default None
+            maximum number of identifiers of a single request, by default
+            ``conf.DATA_BATCH_SIZE``
+        max_workers : int, optional, default None
+            maximum number of requests in progress at once, by default
+            ``conf.DATA_BATCH_WORKERS``
 
         Returns
         -------
         A table object
         """
-        return self.__gaiadata.get_datalinks(ids=ids, verbose=verbose)
+        batches = _split_ids(ids, batch_size or conf.DATA_BATCH_SIZE)
+        if len(batches) == 1:
+            return self.__gaiadata.get_datalinks(ids=ids, verbose=verbose)
+        tables = commons.map_concurrent(
+            lambda batch: self.__gaiadata.get_datalinks(ids=batch,
+                                                        verbose=verbose),
+            batches, max_workers or conf.DATA_BATCH_WORKERS,
+            return_exceptions=False)
+        return vstack(tables, metadata_conflicts='silent')
 
     def __query_object(self, coordinate, radius=None, width=None, height=None,
                        async_job=False, verbose=False, columns=[]):
@@ -473,6 +563,98 @@ class GaiaClass(TapPlus):
                                   verbose=verbose,
                                   dump_to_file=dump_to_file, columns=columns)
 
+    def multi_cone_search(self, coordinates, radius,
+                          table_name=MAIN_GAIA_TABLE,
+                          ra_column_name=MAIN_GAIA_TABLE_RA,
+                          dec_column_name=MAIN_GAIA_TABLE_DEC,
+                          columns=[], batch_size=None, max_workers=None,
+                          timeout=None, verbose=False):
+        """Cone search around many positions at once
+        TAP+ only
+
+        The positions are uploaded as a table and searched with a single
+        positional join in an asynchronous job, instead of a job per
+        position. Lists of more than 'batch_size' positions are split into
+        several jobs, up to 'max_workers' of them in progress at once.
+
+        Parameters
+        ----------
+        coordinates : astropy.coordinate, mandatory
+            array of coordinates, or list of coordinates or strings
+        radius : astropy.units, mandatory
+            radius, a single value or one value per position
+        table_name : str, optional, default main gaia table
+            table name doing the cone search against
+        ra_column_name : str, optional, default ra column in main gaia table
+            ra column doing the cone search against
+        dec_column_name : str, optional, default dec column in main gaia table
+            dec column doing the cone search against
+        columns: list, optional, default []
+            if empty, all columns will be selected
+        batch_size : int, optional, default None
+            maximum number of positions of a single job, by default
+            ``conf.MULTICONE_BATCH_SIZE``
+        max_workers : int, optional, default None
+            maximum number of jobs in progress at once, by default
+            ``conf.MULTICONE_WORKERS``
+        timeout : float, optional, default None
+            maximum number of seconds a job may run
+        verbose : bool, optional, default 'False'
+            flag to display information about the process
+
+        Returns
+        -------
+        A table with the sources found around each position, sorted by
+        position and distance. The 'target_index' column holds the index of
+        the position in 'coordinates' and the 'dist' column the distance
+        to it in degrees. ``ROW_LIMIT`` does not apply.
+        """
+        targets = _multi_cone_targets(coordinates, radius)
+        if columns:
+            columns = ','.join('g.' + str(column) for column in columns)
+        else:
+            columns = "g.*"
+        query = """
+                SELECT
+                  t.target_index,
+                  {columns},
+                  DISTANCE(
+                    POINT('ICRS', g.{ra_column}, g.{dec_column}),
+                    POINT('ICRS', t.target_ra, t.target_dec)
+                  ) AS dist
+                FROM
+                  {table_name} AS g
+                JOIN tap_upload.{upload_table} AS t
+                ON
+                  1 = CONTAINS(
+                    POINT('ICRS', g.{ra_column}, g.{dec_column}),
+                    CIRCLE('ICRS', t.target_ra, t.target_dec,
+                           t.target_radius)
+                  )
+                ORDER BY
+                  t.target_index ASC, dist ASC
+                """.format(**{
+                    'ra_column': ra_column_name,
+                    'dec_column': dec_column_name,
+                    'columns': columns, 'table_name': table_name,
+                    'upload_table': MULTICONE_UPLOAD_TABLE
+                })
+
+        batch_size = batch_size or conf.MULTICONE_BATCH_SIZE
+        with JobScheduler(self, max_workers=max_workers or
+                          conf.MULTICONE_WORKERS, timeout=timeout) \
+                as scheduler:
+            for start in range(0, len(targets), batch_size):
+                scheduler.submit(query,
+                                 upload_resource=targets[start:
+                                                         start + batch_size],
+                                 upload_table_name=MULTICONE_UPLOAD_TABLE,
+                                 verbose=verbose)
+            tables = scheduler.results(return_exceptions=False)
+        if len(tables) == 1:
+            return tables[0]
+        return vstack(tables, metadata_conflicts='silent')
+
     def __checkQuantityInput(self, value, msg):
         if not (isinstance(value, str) or isinstance(value, units.Quantity)):
             raise ValueError(
@@ -596,4 +778,60 @@ class GaiaClass(TapPlus):
                                      upload_table_name=None)
 
 
+# name of the table of positions uploaded by multi_cone_search
+MULTICONE_UPLOAD_TABLE = 'multicone_targets'
+
+
+def _multi_cone_targets(coordinates, radius):
+    """Returns the table of positions uploaded by multi_cone_search"""
+    if isinstance(coordinates, str) or \
+            isinstance(coordinates, commons.CoordClasses):
+        coordinates = [coordinates]
+    if not isinstance(coordinates, SkyCoord):
+        coordinates = [commons.parse_coordinates(item)
+                       if isinstance(item, str) else item
+                       for item in coordinates]
+        try:
+            coordinates = SkyCoord(coordinates)
+        except ValueError:
+            # positions in different frames
+            coordinates = SkyCoord([item.icrs for item in coordinates])
+    coordinates = coordinates.icrs
+    if coordinates.isscalar:
+        coordinates = coordinates.reshape((1,))
+    if not isinstance(radius, Quantity):
+        raise ValueError("radius must be an astropy.units.Quantity")
+    radius = np.broadcast_to(radius.to(units.deg).value, coordinates.shape)
+    return Table([np.arange(len(coordinates)), coordinates.ra.deg,
+                  coordinates.dec.deg, radius],
+                 names=['target_index', 'target_ra', 'target_dec',
+                        'target_radius'])
+
+
+# extension of the files saved by load_data, by format
+DATA_EXTENSIONS = {'votable': '.xml', 'votable_plain': '.xml', 'fits': '.fits',
+                   'csv': '.csv', 'ecsv': '.ecsv'}
+
+
+def _join_ids(ids):
+    if isinstance(ids, six.string_types):
+        return ids
+    if isinstance(ids, int):
+        return str(ids)
+    return ','.join(str(item) for item in ids)
+
+
+def _split_ids(ids, batch_size):
+    """Splits identifiers into lists of at most batch_size strings"""
+    if ids is None:
+        raise ValueError("Missing mandatory argument 'ids'")
+    if isinstance(ids, six.string_types):
+        ids = [item.strip() for item in ids.split(',')]
+    elif isinstance(ids, int):
+        ids = [ids]
+    ids = [str(item) for item in ids]
+    return [ids[batch]
+            for batch in commons.split_batches(len(ids), batch_size)]
+
+
 Gaia = GaiaClass()
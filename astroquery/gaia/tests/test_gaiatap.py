@@ -16,6 +16,7 @@ Created on 30 jun. 2016
 """
 import unittest
 import os
+import threading
 import pytest
 
 from astroquery.gaia.core import GaiaClass
@@ -24,6 +25,7 @@ from astroquery.utils.tap.conn.tests.DummyConnHandler import DummyConnHandler
 from astroquery.utils.tap.conn.tests.DummyResponse import DummyResponse
 import astropy.units as u
 from astropy.coordinates.sky_coordinate import SkyCoord
+from astropy.table import Table
 from astropy.units import Quantity
 import numpy as np
 from astroquery.utils.tap.xmlparser import utils
@@ -558,6 +560,133 @@ class TestTap(unittest.TestCase):
         assert job.failed is False, "Wrong job status (set Failed = True)"
 
 
+class FakeDataHandler(object):
+    """Returns a row per identifier; requests including 'fail_ids' fail"""
+
+    def __init__(self, fail_ids=()):
+        self.requests = []
+        self.fail_ids = set(fail_ids)
+        self.lock = threading.Lock()
+
+    def __table(self, ids):
+        with self.lock:
+            self.requests.append(ids)
+        if self.fail_ids.intersection(ids):
+            raise IOError("Service unavailable")
+        return Table([[int(item) for item in ids]], names=['source_id'])
+
+    def load_data(self, params_dict, output_file=None, verbose=False):
+        table = self.__table(params_dict['ID'].split(','))
+        if output_file is None:
+            return table
+        table.write(output_file, format='votable')
+
+    def get_datalinks(self, ids, verbose=False):
+        return self.__table(ids)
+
+
+def test_load_data_batches():
+    handler = FakeDataHandler()
+    gaia = GaiaClass(DummyTapHandler(), handler)
+    ids = list(range(10))
+    result = gaia.load_data(ids, batch_size=3, max_workers=2)
+    assert list(result['source_id']) == ids
+    assert sorted(len(request) for request in handler.requests) == \
+        [2, 2, 3, 3]
+
+    handler.requests = []
+    result = gaia.get_datalinks([str(i) for i in ids], batch_size=4)
+    assert list(result['source_id']) == ids
+    assert len(handler.requests) == 3
+
+
+def test_load_data_output_dir_resume(tmpdir):
+    handler = FakeDataHandler(fail_ids=['4'])
+    gaia = GaiaClass(DummyTapHandler(), handler)
+    ids = ','.join(str(i) for i in range(10))
+    manifest = gaia.load_data(ids, batch_size=3, output_dir=tmpdir.strpath)
+    assert list(manifest['Status']) == ['COMPLETE', 'ERROR', 'COMPLETE',
+                                        'COMPLETE']
+    assert 'Service unavailable' in manifest['Message'][1]
+    assert all(path.endswith('.xml') for path in manifest['Local Path'])
+    assert not [name for name in os.listdir(tmpdir.strpath)
+                if name.endswith('.part')]
+
+    # only the failed request is repeated
+    handler.fail_ids = set()
+    handler.requests = []
+    resumed = gaia.load_data(ids, batch_size=3, output_dir=tmpdir.strpath)
+    assert list(resumed['Status']) == ['COMPLETE'] * 4
+    assert handler.requests == [['3', '4', '5']]
+    assert list(resumed['Local Path']) == list(manifest['Local Path'])
+    tables = [Table.read(path) for path in resumed['Local Path']]
+    assert [len(table) for table in tables] == [3, 3, 2, 2]
+
+    # other request parameters are saved to other files
+    handler.requests = []
+    other = gaia.load_data(ids, batch_size=3, output_dir=tmpdir.strpath,
+                           band='G')
+    assert len(handler.requests) == 4
+    assert not set(other['Local Path']).intersection(manifest['Local Path'])
+
+
+class FakeMultiConeJob(object):
+    """Finds a source 1 arcsec north of each uploaded position"""
+
+    def __init__(self, targets):
+        self.targets = targets
+
+    def wait_for_job_end(self, **kwargs):
+        pass
+
+    def get_results(self):
+        return Table([self.targets['target_index'],
+                      self.targets['target_index'] * 10,
+                      self.targets['target_ra'],
+                      self.targets['target_dec'] + 1 / 3600.,
+                      np.full(len(self.targets), 1 / 3600.)],
+                     names=['target_index', 'source_id', 'ra', 'dec', 'dist'])
+
+
+def test_multi_cone_search(monkeypatch):
+    gaia = GaiaClass(DummyTapHandler(), DummyTapHandler())
+    launched = []
+
+    def launch_job_async(query, background=False, upload_resource=None,
+                         upload_table_name=None, verbose=False):
+        assert background
+        launched.append((query, upload_resource, upload_table_name))
+        return FakeMultiConeJob(upload_resource)
+    monkeypatch.setattr(gaia, 'launch_job_async', launch_job_async)
+
+    coordinates = SkyCoord(ra=np.linspace(10, 20, 5),
+                           dec=np.linspace(-5, 5, 5), unit='deg')
+    result = gaia.multi_cone_search(coordinates, 2 * u.arcsec,
+                                    columns=['source_id', 'ra'],
+                                    batch_size=2)
+    assert len(launched) == 3
+    assert [len(upload) for query, upload, name in launched] == [2, 2, 1]
+    query, upload, name = launched[0]
+    assert "JOIN tap_upload.{0} AS t".format(name) in query
+    assert "SELECT\n                  t.target_index,\n" \
+        "                  g.source_id,g.ra," in query
+    assert "CIRCLE('ICRS', t.target_ra, t.target_dec,\n" in query
+    assert list(upload['target_index']) == [0, 1]
+    np.testing.assert_allclose(upload['target_radius'], 2 / 3600.)
+    assert list(result['target_index']) == [0, 1, 2, 3, 4]
+    assert list(result['source_id']) == [0, 10, 20, 30, 40]
+
+    launched.clear()
+    gaia.multi_cone_search(['10d -5d', SkyCoord(1, 2, unit='deg',
+                                              frame='galactic')],
+                           [1, 2] * u.arcmin)
+    upload = launched[0][1]
+    assert len(launched) == 1
+    np.testing.assert_allclose(upload['target_radius'], [1 / 60., 2 / 60.])
+    galactic = SkyCoord(1, 2, unit='deg', frame='galactic').icrs
+    np.testing.assert_allclose(upload['target_ra'], [10, galactic.ra.deg])
+
+
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
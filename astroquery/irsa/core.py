@@ -364,7 +364,10 @@ class IrsaClass(BaseQuery):
         if not verbose:
             commons.suppress_vo_warnings()
 
-        content = response.text
+        # Error messages are short pages: only the start of the body is
+        # decoded to look for them, the table itself is parsed from the stream
+        with commons.response_fileobj(response) as fileobj:
+            content = fileobj.read(65536).decode('utf-8', errors='replace')
 
         # Check if results were returned
         if 'The catalog is not on the list' in content:
@@ -389,8 +392,9 @@ class IrsaClass(BaseQuery):
 
         # Read it in using the astropy VO table reader
         try:
-            first_table = votable.parse(six.BytesIO(response.content),
-                                        pedantic=False).get_first_table()
+            with commons.response_fileobj(response) as fileobj:
+                first_table = votable.parse(fileobj,
+                                            pedantic=False).get_first_table()
         except Exception as ex:
             self.response = response
             self.table_parse_error = ex
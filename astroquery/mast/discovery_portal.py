@@ -9,8 +9,13 @@ This module contains various methods for querying the MAST Discovery Portal API.
 import warnings
 import uuid
 import json
+import itertools
+import operator
 import time
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from urllib.parse import quote as urlencode
@@ -18,10 +23,10 @@ from urllib.parse import quote as urlencode
 from astropy.table import Table, vstack, MaskedColumn
 from astropy.utils import deprecated
 
-from ..query import BaseQuery, QueryWithLogin
+from ..query import BaseQuery, QueryWithLogin, conf as query_conf
 from ..utils import async_to_sync
 from ..utils.class_or_instance import class_or_instance
-from ..exceptions import InputWarning, NoResultsWarning
+from ..exceptions import InputWarning, NoResultsWarning, RemoteServiceError
 
 from . import conf, utils
 
@@ -55,6 +60,9 @@ def _json_to_table(json_obj, col_config=None):
     """
     Takes a JSON object as returned from a Mashup request and turns it into an `~astropy.table.Table`.
 
+    The rows are transposed into columns in a single pass, and each column is
+    converted straight to a typed array and mask.
+
     Parameters
     ----------
     json_obj : dict
@@ -67,16 +75,28 @@ def _json_to_table(json_obj, col_config=None):
     response : `~astropy.table.Table`
     """
 
-    data_table = Table(masked=True)
-
     if not all(x in json_obj.keys() for x in ['fields', 'data']):
         raise KeyError("Missing required key(s) 'data' and/or 'fields.'")
 
-    for col, atype in [(x['name'], x['type']) for x in json_obj['fields']]:
-
-        # Removing "_selected_" column
-        if col == "_selected_":
-            continue
+    # Removing "_selected_" column
+    fields = [(x['name'], x['type']) for x in json_obj['fields'] if x['name'] != "_selected_"]
+    names = [col for col, _ in fields]
+    rows = json_obj['data']
+
+    # transposing the rows into columns
+    if not rows or not names:
+        columns = [()] * len(names)
+    else:
+        try:
+            getter = operator.itemgetter(*names)
+            values = [getter(row) for row in rows]
+        except KeyError:
+            # some rows lack some columns
+            values = [tuple(row.get(col) for col in names) for row in rows]
+        columns = list(zip(*values)) if len(names) > 1 else [tuple(values)]
+
+    data_columns = []
+    for (col, atype), col_data in zip(fields, columns):
 
         # reading the colum config if given
         ignore_value = None
@@ -89,22 +109,64 @@ def _json_to_table(json_obj, col_config=None):
         atype = reg_type[1]
         ignore_value = reg_type[2] if (ignore_value is None) else ignore_value
 
-        # Make the column list (don't assign final type yet or there will be errors)
-        col_data = np.array([x.get(col, ignore_value) for x in json_obj['data']], dtype=object)
-        if ignore_value is not None:
-            col_data[np.where(np.equal(col_data, None))] = ignore_value
+        col_data, col_mask = _typed_column(col_data, atype, ignore_value)
+        data_columns.append(MaskedColumn(col_data, name=col, mask=col_mask))
 
-        # no consistant way to make the mask because np.equal fails on ''
-        # and array == value fails with None
-        if atype == 'str':
-            col_mask = (col_data == ignore_value)
-        else:
-            col_mask = np.equal(col_data, ignore_value)
+    return Table(data_columns, names=names, masked=True, copy=False)
 
-        # add the column
-        data_table.add_column(MaskedColumn(col_data.astype(atype), name=col, mask=col_mask))
 
-    return data_table
+def _typed_column(col_data, atype, ignore_value):
+    """
+    Converts the values of a column, where `None` marks a missing value, to a typed array and a
+    mask of the values equal to ``ignore_value``.
+    """
+
+    try:
+        if atype is np.float64:
+            values = np.array(col_data, dtype=atype)  # None -> nan
+            if ignore_value is not None:
+                nulls = np.flatnonzero(np.isnan(values))
+                if len(nulls):
+                    nulls = nulls[np.array([col_data[i] is None for i in nulls], dtype=bool)]
+                    values[nulls] = ignore_value
+                return values, values == ignore_value
+            return values, np.zeros(len(values), dtype=bool)
+
+        if atype is str and isinstance(ignore_value, str):
+            if None in col_data:
+                col_data = [ignore_value if x is None else x for x in col_data]
+            values = np.array(col_data, dtype=str)
+            if not len(values):
+                values = values.astype("U1")
+            return values, values == ignore_value
+
+        if atype is bool and ignore_value is None:
+            values = np.array(col_data, dtype=bool)  # None -> False
+            if None in col_data:
+                return values, np.array([x is None for x in col_data], dtype=bool)
+            return values, np.zeros(len(values), dtype=bool)
+
+        if atype is np.int64 and ignore_value is not None:
+            if None in col_data:
+                col_data = [ignore_value if x is None else x for x in col_data]
+            values = np.array(col_data, dtype=atype)
+            return values, values == ignore_value
+    except (TypeError, ValueError):
+        pass
+
+    # generic conversion through an object array
+    col_data = np.array(col_data, dtype=object)
+    if ignore_value is not None:
+        col_data[np.where(np.equal(col_data, None))] = ignore_value
+
+    # no consistant way to make the mask because np.equal fails on ''
+    # and array == value fails with None
+    if atype == 'str':
+        col_mask = (col_data == ignore_value)
+    else:
+        col_mask = np.equal(col_data, ignore_value)
+
+    return col_data.astype(atype), col_mask
 
 
 @async_to_sync
@@ -147,6 +209,8 @@ class PortalAPI(BaseQuery):
         Thus the cache parameter of the parent method is hard coded to false
         (the MAST server does it's own caching, no need to cache locally and it
         interferes with follow requests after an 'Executing' response was returned.)
+        Once the first page gives the number of pages, the remaining pages are
+        requested concurrently (see `_iter_responses`).
         Also parameters that allow for file download through this method are removed
 
 
@@ -170,46 +234,100 @@ class PortalAPI(BaseQuery):
             The response from the server.
         """
 
-        start_time = time.time()
-        all_responses = []
-        total_pages = 1
-        cur_page = 0
+        return list(self._iter_responses(method, url, params=params, data=data, headers=headers,
+                                         files=files, stream=stream, auth=auth,
+                                         retrieve_all=retrieve_all))
 
-        while cur_page < total_pages:
-            status = "EXECUTING"
+    def _iter_responses(self, method, url, params=None, data=None, headers=None,
+                        files=None, stream=False, auth=None, retrieve_all=True):
+        """
+        Iterates over the responses to a paginated Mashup request, in page order.
 
-            while status == "EXECUTING":
-                response = super(PortalAPI, self)._request(method, url, params=params, data=data,
-                                                           headers=headers, files=files, cache=False,
-                                                           stream=stream, auth=auth)
+        The first page is requested on its own to learn the number of pages,
+        then the remaining pages are requested concurrently. At most
+        ``astroquery.query.conf.max_workers`` pages are in flight (or waiting
+        to be consumed) at any time, so the memory used is bounded however
+        many pages there are.
 
-                if (time.time() - start_time) >= self.TIMEOUT:
-                    raise TimeoutError("Timeout limit of {} exceeded.".format(self.TIMEOUT))
+        Parameters are the same as those of `_request`.
 
-                # Raising error based on HTTP status if necessary
-                response.raise_for_status()
+        Returns
+        -------
+        response : iterator of `~requests.Response`
+        """
+
+        start_time = time.time()
+        response, result, status = self._poll_page(method, url, params, data, headers, files,
+                                                   stream, auth, start_time)
+        yield response
+
+        if (status != "COMPLETE") or (not retrieve_all):
+            return
+
+        paging = result.get("paging")
+        if paging is None:
+            return
+        total_pages = paging['pagesFiltered']
+        cur_page = paging['page']
+        if cur_page >= total_pages:
+            return
+
+        pages = iter(range(cur_page + 1, total_pages + 1))
+        max_workers = min(query_conf.max_workers, total_pages - cur_page)
+        pending = deque()
+
+        def submit(page):
+            page_data = data.replace("page%22%3A%20" + str(cur_page) + "%2C",
+                                     "page%22%3A%20" + str(page) + "%2C")
+            pending.append(executor.submit(self._poll_page, method, url, params, page_data,
+                                           headers, files, stream, auth, start_time))
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            try:
+                for page in itertools.islice(pages, max_workers):
+                    submit(page)
+                while pending:
+                    response = pending.popleft().result()[0]
+                    page = next(pages, None)
+                    if page is not None:
+                        submit(page)
+                    yield response
+            finally:
+                # the iteration may be abandoned or have failed
+                for future in pending:
+                    future.cancel()
+
+    def _poll_page(self, method, url, params, data, headers, files, stream, auth, start_time):
+        """
+        Requests a page until the Mashup server is done executing the query.
+
+        Returns
+        -------
+        response : tuple
+            The `~requests.Response`, its decoded JSON and its status.
+        """
 
-                result = response.json()
+        status = "EXECUTING"
 
-                if not result:  # kind of hacky, but col_config service returns nothing if there is an error
-                    status = "ERROR"
-                else:
-                    status = result.get("status")
+        while status == "EXECUTING":
+            response = super(PortalAPI, self)._request(method, url, params=params, data=data,
+                                                       headers=headers, files=files, cache=False,
+                                                       stream=stream, auth=auth)
 
-            all_responses.append(response)
+            if (time.time() - start_time) >= self.TIMEOUT:
+                raise TimeoutError("Timeout limit of {} exceeded.".format(self.TIMEOUT))
 
-            if (status != "COMPLETE") or (not retrieve_all):
-                break
+            # Raising error based on HTTP status if necessary
+            response.raise_for_status()
 
-            paging = result.get("paging")
-            if paging is None:
-                break
-            total_pages = paging['pagesFiltered']
-            cur_page = paging['page']
+            result = response.json()
 
-            data = data.replace("page%22%3A%20"+str(cur_page)+"%2C", "page%22%3A%20"+str(cur_page+1)+"%2C")
+            if not result:  # kind of hacky, but col_config service returns nothing if there is an error
+                status = "ERROR"
+            else:
+                status = result.get("status")
 
-        return all_responses
+        return response, result, status
 
     def _get_col_config(self, service, fetch_name=None):
         """
@@ -284,14 +402,7 @@ class PortalAPI(BaseQuery):
             self._current_service = None  # clearing current service
 
         for resp in responses:
-            result = resp.json()
-
-            # check for error message
-            if result['status'] == "ERROR":
-                raise RemoteServiceError(result.get('msg', "There was an error with your request."))
-
-            result_table = _json_to_table(result, col_config)
-            result_list.append(result_table)
+            result_list.append(self._parse_page(resp, col_config))
 
         all_results = vstack(result_list)
 
@@ -300,6 +411,31 @@ class PortalAPI(BaseQuery):
             warnings.warn("Query returned no results.", NoResultsWarning)
         return all_results
 
+    @staticmethod
+    def _parse_page(response, col_config=None):
+        """
+        Decodes a single page of Mashup results.
+
+        Parameters
+        ----------
+        response : `~requests.Response`
+            A response to a Mashup request.
+        col_config : dict, optional
+            Dictionary that defines column properties, e.g. default value.
+
+        Returns
+        -------
+        response : `~astropy.table.Table`
+        """
+
+        result = json.loads(response.content)
+
+        # check for error message
+        if result['status'] == "ERROR":
+            raise RemoteServiceError(result.get('msg', "There was an error with your request."))
+
+        return _json_to_table(result, col_config)
+
     @class_or_instance
     def service_request_async(self, service, params, pagesize=None, page=None, **kwargs):
         """
@@ -331,6 +467,61 @@ class PortalAPI(BaseQuery):
         response : list of `~requests.Response`
         """
 
+        req_string, headers, retrieve_all = self._prepare_service_request(service, params, pagesize,
+                                                                          page, **kwargs)
+        response = self._request("POST", self.MAST_REQUEST_URL, data=req_string, headers=headers,
+                                 retrieve_all=retrieve_all)
+
+        return response
+
+    def service_request_iter(self, service, params, pagesize=None, **kwargs):
+        """
+        Given a Mashup service and parameters, builds and excecutes a Mashup query
+        and iterates over the pages of results.
+
+        The pages are fetched concurrently, decoded as they arrive and returned in
+        order; only a bounded number of pages is held in memory at any time, so this
+        is suited to queries with too many results to be loaded at once.
+
+        Parameters
+        ----------
+        service : str
+            The Mashup service to query.
+        params : dict
+            JSON object containing service parameters.
+        pagesize : int, optional
+            Default None.
+            Can be used to override the default pagesize (set in configs) for this query only.
+        **kwargs :
+            See MashupRequest properties
+            `here <https://mast.stsci.edu/api/v0/class_mashup_1_1_mashup_request.html>`__
+            for additional keyword arguments.
+
+        Returns
+        -------
+        response : iterator of `~astropy.table.Table`
+            One table per page of results.
+        """
+
+        req_string, headers, _ = self._prepare_service_request(service, params, pagesize, None, **kwargs)
+        col_config = self._column_configs.get(service)
+        self._current_service = None  # the pages are parsed here
+
+        for response in self._iter_responses("POST", self.MAST_REQUEST_URL, data=req_string,
+                                             headers=headers):
+            yield self._parse_page(response, col_config)
+
+    def _prepare_service_request(self, service, params, pagesize=None, page=None, **kwargs):
+        """
+        Builds the request string and headers of a Mashup query.
+
+        Returns
+        -------
+        response : tuple
+            The URL encoded request string, the request headers and whether
+            all pages of results are to be retrieved.
+        """
+
         # setting self._current_service
         if service not in self._column_configs.keys():
             fetch_name = kwargs.pop('fetch_name', None)
@@ -359,11 +550,7 @@ class PortalAPI(BaseQuery):
         for prop, value in kwargs.items():
             mashup_request[prop] = value
 
-        req_string = _prepare_service_request_string(mashup_request)
-        response = self._request("POST", self.MAST_REQUEST_URL, data=req_string, headers=headers,
-                                 retrieve_all=retrieve_all)
-
-        return response
+        return _prepare_service_request_string(mashup_request), headers, retrieve_all
 
     def build_filter_set(self, column_config_name, service_name=None, **filters):
         """
@@ -15,8 +15,6 @@ import uuid
 
 import numpy as np
 
-from requests import HTTPError
-
 import astropy.units as u
 import astropy.coordinates as coord
 
@@ -32,6 +30,7 @@ from six.moves.urllib.parse import quote as urlencode
 from ..query import QueryWithLogin
 from ..utils import commons, async_to_sync
 from ..utils.class_or_instance import class_or_instance
+from ..utils.download_manager import Download, DownloadManager
 from ..exceptions import (TimeoutError, InvalidQueryError, RemoteServiceError,
                           ResolverError, MaxResultsWarning,
                           NoResultsWarning, InputWarning, AuthenticationWarning)
@@ -303,6 +302,40 @@ class ObservationsClass(MastQueryWithLogin):
         response : list of `~requests.Response`
         """
 
+        service, params = self._criteria_request(**criteria)
+
+        return self._portal_api_connection.service_request_async(service, params)
+
+    def query_criteria_iter(self, pagesize=None, **criteria):
+        """
+        Given an set of criteria, iterates over the matching MAST observations
+        one page at a time.
+
+        Pages are fetched concurrently and decoded as they arrive, without keeping
+        every response in memory, which makes this suited to queries over large
+        collections. Stacking the pages gives the result of `query_criteria`.
+
+        Parameters
+        ----------
+        pagesize : int, optional
+            Can be used to override the default pagesize.
+        **criteria
+            Criteria to apply, as in `query_criteria`.
+
+        Returns
+        -------
+        response : iterator of `~astropy.table.Table`
+        """
+
+        service, params = self._criteria_request(**criteria)
+
+        return self._portal_api_connection.service_request_iter(service, params, pagesize)
+
+    def _criteria_request(self, **criteria):
+        """
+        Returns the Mashup service and parameters of a criteria query.
+        """
+
         position, mashup_filters = self._parse_caom_criteria(**criteria)
 
         if not mashup_filters:
@@ -318,7 +351,7 @@ class ObservationsClass(MastQueryWithLogin):
             params = {"columns": "*",
                       "filters": mashup_filters}
 
-        return self._portal_api_connection.service_request_async(service, params)
+        return service, params
 
     def query_region_count(self, coordinates, radius=0.2*u.deg, pagesize=None, page=None):
         """
@@ -542,6 +575,7 @@ class ObservationsClass(MastQueryWithLogin):
         """
 
         manifest_array = []
+        downloads = []
         for data_product in products:
 
             local_path = os.path.join(base_dir, data_product['obs_collection'], data_product['obs_id'])
@@ -552,41 +586,31 @@ class ObservationsClass(MastQueryWithLogin):
 
             local_path = os.path.join(local_path, data_product['productFilename'])
 
-            status = "COMPLETE"
-            msg = None
-            url = None
-
-            try:
-                if self._cloud_connection is not None and self._cloud_connection.is_supported(data_product):
-                    try:
-                        self._cloud_connection.download_file(data_product, local_path, cache)
-                    except Exception as ex:
-                        log.exception("Error pulling from S3 bucket: {}".format(ex))
-                        if cloud_only:
-                            log.warn("Skipping file...")
-                            local_path = ""
-                            status = "SKIPPED"
-                        else:
-                            log.warn("Falling back to mast download...")
-                            self._download_file(data_url, local_path,
-                                                cache=cache, head_safe=True, continuation=False)
-                else:
-                    self._download_file(data_url, local_path,
-                                        cache=cache, head_safe=True, continuation=False)
-
-                # check if file exists also this is where would perform md5,
-                # and also check the filesize if the database reliably reported file sizes
-                if (not os.path.isfile(local_path)) and (status != "SKIPPED"):
-                    status = "ERROR"
-                    msg = "File was not downloaded"
-                    url = data_url
-
-            except HTTPError as err:
-                status = "ERROR"
-                msg = "HTTPError: {0}".format(err)
-                url = data_url
-
-            manifest_array.append([local_path, status, msg, url])
+            if self._cloud_connection is not None and self._cloud_connection.is_supported(data_product):
+                try:
+                    self._cloud_connection.download_file(data_product, local_path, cache)
+                    manifest_array.append([local_path, "COMPLETE", None, None])
+                    continue
+                except Exception as ex:
+                    log.exception("Error pulling from S3 bucket: {}".format(ex))
+                    if cloud_only:
+                        log.warn("Skipping file...")
+                        manifest_array.append(["", "SKIPPED", None, None])
+                        continue
+                    log.warn("Falling back to mast download...")
+
+            # files not available in the cloud are downloaded concurrently
+            # from MAST below, their manifest rows filled in afterwards
+            downloads.append((len(manifest_array), Download(data_url, local_path)))
+            manifest_array.append(None)
+
+        download_manifest = DownloadManager(self).download(
+            [download for _, download in downloads], cache=cache,
+            head_safe=True, continuation=False)
+        for (index, _), row in zip(downloads, download_manifest):
+            # only errors keep the URL in the MAST manifest
+            manifest_array[index] = [row['Local Path'], row['Status'], row['Message'],
+                                     row['URL'] if row['Status'] == "ERROR" else None]
 
         manifest = Table(rows=manifest_array, names=('Local Path', 'Status', 'Message', "URL"))
 
@@ -1,8 +1,11 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import print_function
 
+import json
 import os
 import re
+import threading
+import time
 
 from shutil import copyfile
 
@@ -18,7 +21,7 @@ import astropy.units as u
 from ...utils.testing_tools import MockResponse
 from ...exceptions import (InvalidQueryError, InputWarning)
 
-from ... import mast
+from ... import mast, query
 
 DATA_FILES = {'Mast.Caom.Cone': 'caom.json',
               'Mast.Name.Lookup': 'resolver.json',
@@ -157,6 +160,81 @@ def tess_download_mockreturn(url, file_path):
     copyfile(filename, file_path)
     return
 
+
+def test_json_to_table():
+    json_obj = {'fields': [{'name': 'flux', 'type': 'float'},
+                           {'name': 'count', 'type': 'int'},
+                           {'name': 'name', 'type': 'string'},
+                           {'name': 'flag', 'type': 'boolean'},
+                           {'name': '_selected_', 'type': 'boolean'}],
+                'data': [{'flux': 1.5, 'count': 3, 'name': 'a', 'flag': True},
+                         {'flux': None, 'count': None, 'name': None, 'flag': None},
+                         {'flux': 2, 'count': 4, 'name': 5}]}
+    col_config = {'flux': {'ignoreValue': -1.0}, 'count': {'ignoreValue': 4}}
+
+    table = mast.discovery_portal._json_to_table(json_obj, col_config)
+
+    assert table.colnames == ['flux', 'count', 'name', 'flag']
+    assert table['flux'].dtype.kind == 'f' and table['count'].dtype.kind == 'i'
+    assert list(table['flux'].filled(0)) == [1.5, 0, 2]
+    assert list(table['count'].mask) == [False, True, True]
+    assert list(table['count'].data.data) == [3, 4, 4]
+    assert list(table['name'].data.data) == ['a', '', '5']
+    assert list(table['name'].mask) == [False, True, False]
+    assert list(table['flag'].mask) == [False, True, True]
+
+    empty = mast.discovery_portal._json_to_table({'fields': json_obj['fields'], 'data': []})
+    assert len(empty) == 0
+    assert empty.colnames == table.colnames
+
+
+def paged_mockreturn(self, method="POST", url=None, data=None, **kwargs):
+    # pages arrive in reverse order, the first one after an 'EXECUTING' response
+    page = int(re.search(r"page%22%3A%20(\d+)%2C", data).group(1))
+    time.sleep(0.02 * (5 - page))
+    with lock:
+        calls.append(page)
+        status = "EXECUTING" if calls.count(1) == 1 and page == 1 else "COMPLETE"
+    result = {'status': status,
+              'paging': {'page': page, 'pagesFiltered': 5},
+              'fields': [{'name': 'page', 'type': 'int'}],
+              'data': [{'page': page}, {'page': page}]}
+    return MockResponse(json.dumps(result).encode('utf-8'))
+
+
+lock = threading.Lock()
+calls = []
+
+
+def test_portal_paged_request(monkeypatch):
+    monkeypatch.setattr(query.BaseQuery, '_request', paged_mockreturn)
+    del calls[:]
+    portal = mast.discovery_portal.PortalAPI()
+    portal._column_configs['Mast.Test'] = {}
+
+    responses = portal.service_request_async('Mast.Test', {})
+    assert [response.json()['paging']['page'] for response in responses] == [1, 2, 3, 4, 5]
+    assert sorted(calls) == [1, 1, 2, 3, 4, 5]
+    # the remaining pages were fetched concurrently, last page first
+    assert calls[2] == 5
+
+    table = portal._parse_result(responses)
+    assert list(table['page']) == [1, 1, 2, 2, 3, 3, 4, 4, 5, 5]
+
+    del calls[:]
+    tables = list(portal.service_request_iter('Mast.Test', {}))
+    assert [list(table['page']) for table in tables] == [[page, page] for page in range(1, 6)]
+
+    # an abandoned iteration stops requesting pages
+    del calls[:]
+    with query.conf.set_temp('max_workers', 1):
+        pages = portal.service_request_iter('Mast.Test', {})
+        next(pages)
+        next(pages)
+        pages.close()
+    assert max(calls) < 5
+
+
 ###################
 # MastClass tests #
 ###################
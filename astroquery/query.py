@@ -9,9 +9,14 @@ import hashlib
 import keyring
 import io
 import os
+import threading
+from contextlib import contextmanager
+
 import requests
+from six.moves.urllib_parse import urlparse
 
 import six
+from astropy import config as _config
 from astropy.config import paths
 from astropy.logger import log
 import astropy.units as u
@@ -19,15 +24,56 @@ from astropy.utils.console import ProgressBarOrSpinner
 import astropy.utils.data
 
 from . import version
-from .utils import system_tools
+from . import cache as _cache
+from .utils import commons, system_tools
+
+__all__ = ['BaseQuery', 'QueryWithLogin', 'Conf', 'conf']
+
+
+class Conf(_config.ConfigNamespace):
+    """
+    Configuration parameters for `astroquery.query`.
+    """
+    max_workers = _config.ConfigItem(
+        8,
+        'Number of threads used by BaseQuery.map_query and request_many; '
+        'also the size of the HTTP connection pool of each query class.')
+
+    max_connections_per_host = _config.ConfigItem(
+        4,
+        'Maximum number of concurrent network requests to a single host; '
+        'also the number of keep-alive connections kept per TAP host.')
 
-__all__ = ['BaseQuery', 'QueryWithLogin']
+    keep_alive_timeout = _config.ConfigItem(
+        60.,
+        'Seconds an idle keep-alive connection is kept open for reuse.')
 
 
-def to_cache(response, cache_file):
-    log.debug("Caching data to {0}".format(cache_file))
-    with open(cache_file, "wb") as f:
-        pickle.dump(response, f)
+conf = Conf()
+
+
+class _HostLimiter(object):
+    """
+    Process-wide cap on the number of concurrent requests to each host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    @contextmanager
+    def slot(self, url):
+        limit = conf.max_connections_per_host
+        key = (urlparse(url).netloc, limit)
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(limit)
+            semaphore = self._slots[key]
+        with semaphore:
+            yield
+
+
+_host_limiter = _HostLimiter()
 
 
 def _replace_none_iterable(iterable):
@@ -92,27 +138,25 @@ class AstroQuery(object):
                     request_key += (None,)
                 elif isinstance(k, six.string_types):
                     request_key += (k,)
+                elif hasattr(k, 'cache_key'):
+                    # streamed request bodies identify their own content
+                    request_key += (k.cache_key,)
                 else:
                     raise TypeError("{0} must be a dict, tuple, str, or "
                                     "list".format(k))
             self._hash = hashlib.sha224(pickle.dumps(request_key)).hexdigest()
         return self._hash
 
-    def request_file(self, cache_location):
-        fn = os.path.join(cache_location, self.hash() + ".pickle")
-        return fn
-
-    def from_cache(self, cache_location):
-        request_file = self.request_file(cache_location)
-        try:
-            with open(request_file, "rb") as f:
-                response = pickle.load(f)
-            if not isinstance(response, requests.Response):
-                response = None
-        except IOError:  # TODO: change to FileNotFoundError once drop py2 support
-            response = None
-        if response:
-            log.debug("Retrieving data from {0}".format(request_file))
+    def from_cache(self, cache, ttl=None):
+        entry = cache.get(self.hash(), ttl=ttl)
+        if entry is None:
+            return None
+        return entry.to_response()
+
+    def to_cache(self, response, cache):
+        # only genuine HTTP responses are cached, not test doubles
+        if isinstance(response, requests.Response):
+            response = cache.put_response(self.hash(), response)
         return response
 
 
@@ -149,14 +193,29 @@ class BaseQuery(object):
     """
     This is the base class for all the query classes in astroquery. It
     is implemented as an abstract class and must not be directly instantiated.
+
+    Responses are cached in ``cache_location`` by the backend selected with
+    ``cache_backend`` (default: `astroquery.cache.conf`), and expire after
+    ``cache_ttl`` seconds if that is set.
     """
 
+    #: Time to live of cached responses in seconds; `None` uses
+    #: ``astroquery.cache.conf.ttl``.
+    cache_ttl = None
+
+    #: Name or instance of the cache backend; `None` uses
+    #: ``astroquery.cache.conf.backend``.
+    cache_backend = None
+
     def __init__(self):
         S = self._session = requests.session()
         S.headers['User-Agent'] = (
             'astroquery/{vers} {olduseragent}'
             .format(vers=version.version,
                     olduseragent=S.headers['User-Agent']))
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=conf.max_workers)
+        S.mount('http://', adapter)
+        S.mount('https://', adapter)
 
         self.cache_location = os.path.join(
             paths.get_cache_dir(), 'astroquery',
@@ -169,6 +228,29 @@ class BaseQuery(object):
         """ init a fresh copy of self """
         return self.__class__(*args, **kwargs)
 
+    @property
+    def _cache(self):
+        return _cache.get_cache_backend(self.cache_location,
+                                        self.cache_backend)
+
+    @property
+    def _cache_ttl(self):
+        return self.cache_ttl if self.cache_ttl is not None else _cache.conf.ttl
+
+    @property
+    def cache_stats(self):
+        """
+        Hit/miss statistics of the response cache, a
+        `~astroquery.cache.CacheStats`.
+        """
+        return self._cache.stats
+
+    def clear_cache(self):
+        """
+        Remove all cached responses of this service.
+        """
+        self._cache.clear()
+
     def _request(self, method, url,
                  params=None, data=None, headers=None,
                  files=None, save=False, savedir='', timeout=None, cache=True,
@@ -246,28 +328,106 @@ class BaseQuery(object):
         else:
             query = AstroQuery(method, url, **req_kwargs)
             if ((self.cache_location is None) or (not self._cache_active) or (not cache)):
-                with suspend_cache(self):
+                with suspend_cache(self), _host_limiter.slot(url):
                     response = query.request(self._session, stream=stream,
                                              auth=auth, verify=verify,
                                              allow_redirects=allow_redirects,
                                              json=json)
             else:
-                response = query.from_cache(self.cache_location)
+                response = query.from_cache(self._cache, ttl=self._cache_ttl)
                 if not response:
-                    response = query.request(self._session,
-                                             self.cache_location,
-                                             stream=stream,
-                                             auth=auth,
-                                             allow_redirects=allow_redirects,
-                                             verify=verify,
-                                             json=json)
-                    to_cache(response, query.request_file(self.cache_location))
+                    # the body is streamed to the cache rather than read into
+                    # memory as a whole
+                    with _host_limiter.slot(url):
+                        response = query.request(self._session,
+                                                 self.cache_location,
+                                                 stream=True,
+                                                 auth=auth,
+                                                 allow_redirects=allow_redirects,
+                                                 verify=verify,
+                                                 json=json)
+                        response = query.to_cache(response, self._cache)
             self._last_query = query
             return response
 
+    def map_query(self, method, arguments, max_workers=None,
+                  return_exceptions=True, **kwargs):
+        """
+        Run a query method over many inputs concurrently.
+
+        The calls share this object's HTTP session and response cache, so
+        cached queries never touch the network.  Network requests are limited
+        to ``conf.max_connections_per_host`` concurrent requests per host.
+
+        Parameters
+        ----------
+        method : str or callable
+            The name of a query method of this class, e.g. ``'query_object'``,
+            or any callable.
+        arguments : iterable
+            One item per call: a tuple of positional arguments, a dict of
+            keyword arguments, or a single positional argument.
+        max_workers : int, optional
+            Number of threads; defaults to ``conf.max_workers``.
+        return_exceptions : bool
+            If True (default), a call that raises puts its exception in the
+            results in place of a result; otherwise the first error is raised.
+        **kwargs
+            Keyword arguments passed to every call.
+
+        Returns
+        -------
+        results : list
+            The results of the calls, in the order of ``arguments``.
+        """
+        if isinstance(method, six.string_types):
+            method = getattr(self, method)
+
+        def call(item):
+            if isinstance(item, tuple):
+                return method(*item, **kwargs)
+            elif isinstance(item, dict):
+                return method(**dict(kwargs, **item))
+            return method(item, **kwargs)
+
+        return commons.map_concurrent(call, arguments,
+                                      max_workers or conf.max_workers,
+                                      return_exceptions=return_exceptions)
+
+    def request_many(self, payloads, max_workers=None,
+                     return_exceptions=True, **kwargs):
+        """
+        Send many HTTP requests concurrently through `_request`.
+
+        Parameters
+        ----------
+        payloads : iterable of dict
+            `_request` keyword arguments of each request, including at least
+            ``method`` and ``url``.
+        max_workers : int, optional
+            Number of threads; defaults to ``conf.max_workers``.
+        return_exceptions : bool
+            If True (default), a failed request puts its exception in the
+            results in place of a response; otherwise the first error is
+            raised.
+        **kwargs
+            `_request` keyword arguments shared by all requests, e.g.
+            ``timeout`` or ``cache``.
+
+        Returns
+        -------
+        responses : list
+            The `requests.Response` of each request (or local file path if
+            ``save=True``), in the order of ``payloads``.
+        """
+        return self.map_query(self._request, [dict(payload)
+                                              for payload in payloads],
+                              max_workers=max_workers,
+                              return_exceptions=return_exceptions, **kwargs)
+
     def _download_file(self, url, local_filepath, timeout=None, auth=None,
                        continuation=True, cache=False, method="GET",
-                       head_safe=False, **kwargs):
+                       head_safe=False, progress_hook=None, **kwargs):
         """
         Download a file.  Resembles `astropy.utils.data.download_file` but uses
         the local ``_session``
@@ -285,16 +445,22 @@ class BaseQuery(object):
         cache : bool
         method : "GET" or "POST"
         head_safe : bool
+        progress_hook : callable or None
+            Called with the number of bytes of each block received.  If given,
+            no progress bar is shown.
         """
+        headers = dict(kwargs.pop('headers', None) or {})
 
         if head_safe:
             response = self._session.request("HEAD", url,
                                              timeout=timeout, stream=True,
-                                             auth=auth, **kwargs)
+                                             auth=auth, headers=headers,
+                                             **kwargs)
         else:
             response = self._session.request(method, url,
                                              timeout=timeout, stream=True,
-                                             auth=auth, **kwargs)
+                                             auth=auth, headers=headers,
+                                             **kwargs)
 
         response.raise_for_status()
         if 'content-length' in response.headers:
@@ -314,6 +480,7 @@ class BaseQuery(object):
                 # all done!
                 log.info("Found cached file {0} with expected size {1}."
                          .format(local_filepath, existing_file_length))
+                response.close()
                 return
             elif existing_file_length == 0:
                 open_mode = 'wb'
@@ -326,12 +493,17 @@ class BaseQuery(object):
                 # bytes are indexed from 0:
                 # https://en.wikipedia.org/wiki/List_of_HTTP_header_fields#range-request-header
                 end = "{0}".format(length-1) if length is not None else ""
-                self._session.headers['Range'] = "bytes={0}-{1}".format(existing_file_length,
-                                                                        end)
+                # the Range header is set on this request only, never on the
+                # shared session
+                range_headers = dict(headers, Range="bytes={0}-{1}".format(
+                    existing_file_length, end))
 
+                response.close()
                 response = self._session.request(method, url,
                                                  timeout=timeout, stream=True,
-                                                 auth=auth, **kwargs)
+                                                 auth=auth,
+                                                 headers=range_headers,
+                                                 **kwargs)
                 response.raise_for_status()
 
         elif cache and os.path.exists(local_filepath):
@@ -358,15 +530,18 @@ class BaseQuery(object):
             if head_safe:
                 response = self._session.request(method, url,
                                                  timeout=timeout, stream=True,
-                                                 auth=auth, **kwargs)
+                                                 auth=auth, headers=headers,
+                                                 **kwargs)
                 response.raise_for_status()
 
         blocksize = astropy.utils.data.conf.download_block_size
 
         bytes_read = 0
+        if open_mode == 'ab':
+            bytes_read = existing_file_length
 
         # Only show progress bar if logging level is INFO or lower.
-        if log.getEffectiveLevel() <= 20:
+        if log.getEffectiveLevel() <= 20 and progress_hook is None:
             progress_stream = None  # Astropy default
         else:
             progress_stream = io.StringIO()
@@ -378,7 +553,9 @@ class BaseQuery(object):
             with open(local_filepath, open_mode) as f:
                 for block in response.iter_content(blocksize):
                     f.write(block)
-                    bytes_read += blocksize
+                    bytes_read += len(block)
+                    if progress_hook is not None:
+                        progress_hook(len(block))
                     if length is not None:
                         pb.update(bytes_read if bytes_read <= length else
                                   length)
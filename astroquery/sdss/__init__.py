@@ -20,6 +20,14 @@ class Conf(_config.ConfigNamespace):
         60,
         'Time limit for connecting to SDSS server.')
     default_release = _config.ConfigItem(14, 'Default SDSS data release.')
+    batch_size = _config.ConfigItem(
+        20,
+        'Maximum number of targets of a single query_region SQL query; longer '
+        'lists of targets are split into several queries.')
+    batch_workers = _config.ConfigItem(
+        4,
+        'Maximum number of queries of a split query_region in progress at '
+        'once.')
 
 
 conf = Conf()
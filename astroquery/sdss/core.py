@@ -5,19 +5,23 @@ Access Sloan Digital Sky Survey database online.
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import io
+import os
 import warnings
 import numpy as np
+from six.moves.urllib_parse import urlparse
 
 from astropy import units as u
 import astropy.coordinates as coord
-from astropy.table import Table, Column
+from astropy.io import fits
+from astropy.table import Table, Column, vstack
 
 from ..query import BaseQuery
 from . import conf
 from ..utils import commons, async_to_sync, prepend_docstr_nosections
+from ..utils.download_manager import DownloadManager
 from ..exceptions import RemoteServiceError, NoResultsWarning
 from .field_names import (photoobj_defs, specobj_defs,
-                          crossid_defs, get_field_info)
+                          crossid_defs, get_field_info, get_field_dtypes)
 
 __all__ = ['SDSS', 'SDSSClass']
 __doctest_skip__ = ['SDSSClass.*']
@@ -262,6 +266,56 @@ class SDSSClass(BaseQuery):
                                  timeout=timeout, cache=cache)
         return response
 
+    @prepend_docstr_nosections(query_region_async.__doc__)
+    def query_region(self, coordinates, radius=2. * u.arcsec,
+                     timeout=TIMEOUT, get_query_payload=False,
+                     field_help=False, data_release=conf.default_release,
+                     cache=True, verbose=False, **kwargs):
+        """
+        Notes
+        -----
+        Lists of more than ``conf.batch_size`` targets are split into several
+        queries, up to ``conf.batch_workers`` of them in progress at once, and
+        the distinct rows of their results are returned.
+
+        Returns
+        -------
+        result : `~astropy.table.Table`
+            The result of the query as a `~astropy.table.Table` object.
+
+        """
+        if get_query_payload or field_help:
+            return self.query_region_async(
+                coordinates, radius=radius, timeout=timeout,
+                get_query_payload=get_query_payload, field_help=field_help,
+                data_release=data_release, cache=cache, **kwargs)
+
+        targets = _parse_targets(coordinates)
+        url = self._get_query_url(data_release)
+        payloads = [dict(method='GET', url=url,
+                         params=self._args_to_payload(
+                             coordinates=targets[batch], radius=radius,
+                             data_release=data_release, **kwargs))
+                    for batch in commons.split_batches(len(targets), conf.batch_size)]
+        responses = self.request_many(payloads,
+                                      max_workers=conf.batch_workers,
+                                      return_exceptions=False,
+                                      timeout=timeout, cache=cache)
+        tables = [table for table in (self._parse_result(response,
+                                                         verbose=verbose)
+                                      for response in responses)
+                  if table is not None]
+        if not tables:
+            result = None
+        elif len(tables) == 1:
+            result = tables[0]
+        else:
+            # objects near the targets of several queries are found by each
+            result = _unique_objects(vstack(tables,
+                                            metadata_conflicts='silent'))
+        self.table = result
+        return result
+
     def query_specobj_async(self, plate=None, mjd=None, fiberID=None,
                             fields=None, timeout=TIMEOUT,
                             get_query_payload=False, field_help=False,
@@ -563,34 +617,14 @@ class SDSSClass(BaseQuery):
             if get_query_payload:
                 return request_payload
 
-            url = self._get_query_url(data_release)
-            r = self._request("GET", url, params=request_payload,
-                              timeout=timeout, cache=cache)
-
-            matches = self._parse_result(r)
+            matches = self._query_matches(request_payload, timeout=timeout,
+                                          cache=cache,
+                                          data_release=data_release)
             if matches is None:
-                warnings.warn("Query returned no results.", NoResultsWarning)
                 return
 
-        if not isinstance(matches, Table):
-            raise TypeError("'matches' must be an astropy Table.")
-
         results = []
-        for row in matches:
-            linkstr = self.SPECTRA_URL_SUFFIX
-            # _parse_result returns bytes (requiring a decode) for
-            # - instruments
-            # - run2d sometimes (#739)
-            if isinstance(row['run2d'], bytes):
-                run2d = row['run2d'].decode()
-            else:
-                run2d = row['run2d']
-            link = linkstr.format(
-                base=conf.sas_baseurl, dr=data_release,
-                instrument=row['instrument'].lower(),
-                run2d=run2d, plate=row['plate'],
-                fiber=row['fiberID'], mjd=row['mjd'])
-
+        for link in self._spectra_urls(matches, data_release):
             results.append(commons.FileContainer(link,
                                                  encoding='binary',
                                                  remote_timeout=timeout,
@@ -719,32 +753,17 @@ class SDSSClass(BaseQuery):
             if get_query_payload:
                 return request_payload
 
-            url = self._get_query_url(data_release)
-            r = self._request("GET", url, params=request_payload,
-                              timeout=timeout, cache=cache)
-            matches = self._parse_result(r)
+            matches = self._query_matches(request_payload, timeout=timeout,
+                                          cache=cache,
+                                          data_release=data_release)
             if matches is None:
-                warnings.warn("Query returned no results.", NoResultsWarning)
                 return
-        if not isinstance(matches, Table):
-            raise ValueError("'matches' must be an astropy Table")
 
         results = []
-        for row in matches:
-            for b in band:
-                # Download and read in image data
-                linkstr = self.IMAGING_URL_SUFFIX
-                instrument = 'boss'
-                if data_release > 12:
-                    instrument = 'eboss'
-                link = linkstr.format(base=conf.sas_baseurl, run=row['run'],
-                                      dr=data_release, instrument=instrument,
-                                      rerun=row['rerun'], camcol=row['camcol'],
-                                      field=row['field'], band=b)
-
-                results.append(commons.FileContainer(
-                    link, encoding='binary', remote_timeout=timeout,
-                    cache=cache, show_progress=show_progress))
+        for link in self._image_urls(matches, band, data_release):
+            results.append(commons.FileContainer(
+                link, encoding='binary', remote_timeout=timeout,
+                cache=cache, show_progress=show_progress))
 
         return results
 
@@ -773,6 +792,181 @@ class SDSSClass(BaseQuery):
             else:
                 return [obj.get_fits() for obj in readable_objs]
 
+    def download_spectra(self, coordinates=None, radius=2. * u.arcsec,
+                         matches=None, plate=None, fiberID=None, mjd=None,
+                         timeout=TIMEOUT, cache=True,
+                         data_release=conf.default_release,
+                         download_dir=None, max_workers=None):
+        """
+        Download many spectra from SDSS concurrently to local files.
+
+        The spectra are selected as in `get_spectra`, but they are saved to
+        disk rather than read into memory, so that all the spectra of a
+        plate, or of a long list of matches, can be fetched at once.  Use
+        `open_fits` to read the downloaded files.
+
+        Parameters
+        ----------
+        coordinates : str or `astropy.coordinates` object
+            The target around which to search.
+        radius : str or `~astropy.units.Quantity` object, optional
+            Search radius around ``coordinates``. Defaults to 2 arcsec.
+        matches : `~astropy.table.Table`
+            Result of `query_region`.
+        plate : integer, optional
+            Plate number.
+        mjd : integer, optional
+            Modified Julian Date indicating the date a given piece of SDSS data
+            was taken.
+        fiberID : integer, optional
+            Fiber number.
+        timeout : float, optional
+            Time limit (in seconds) for establishing successful connection with
+            remote server.  Defaults to `SDSSClass.TIMEOUT`.
+        cache : bool
+            Skip the files already downloaded.
+        data_release : int
+            The data release of the SDSS to use.
+        download_dir : str, optional
+            Directory in which the files are saved, keeping the directory
+            layout of the SDSS Science Archive Server.  Defaults to the
+            astroquery cache directory.
+        max_workers : int, optional
+            Number of files downloaded at once; defaults to
+            ``astroquery.query.conf.max_workers``.
+
+        Returns
+        -------
+        manifest : `~astropy.table.Table`
+            One row per spectrum with the columns ``Local Path``, ``Status``
+            (``COMPLETE`` or ``ERROR``), ``Message`` and ``URL``, or None if
+            the query found no spectra.
+
+        Examples
+        --------
+        >>> from astroquery.sdss import SDSS
+        >>> manifest = SDSS.download_spectra(plate=751, mjd=52251)
+        >>> for hdulist in SDSS.open_fits(manifest):
+        ...     print(hdulist[2].data['Z'])
+        """
+        if not matches:
+            request_payload = self._args_to_payload(
+                specobj_fields=['instrument', 'run2d', 'plate',
+                                'mjd', 'fiberID'],
+                coordinates=coordinates, radius=radius, spectro=True,
+                plate=plate, mjd=mjd, fiberID=fiberID,
+                data_release=data_release)
+            matches = self._query_matches(request_payload, timeout=timeout,
+                                          cache=cache,
+                                          data_release=data_release)
+            if matches is None:
+                return
+
+        return self._download_links(self._spectra_urls(matches, data_release),
+                                    download_dir=download_dir, cache=cache,
+                                    timeout=timeout, max_workers=max_workers)
+
+    def download_images(self, coordinates=None, radius=2. * u.arcsec,
+                        matches=None, run=None, rerun=301, camcol=None,
+                        field=None, band='g', timeout=TIMEOUT, cache=True,
+                        data_release=conf.default_release,
+                        download_dir=None, max_workers=None):
+        """
+        Download many images from SDSS concurrently to local files.
+
+        The images are selected as in `get_images`, but they are saved to
+        disk rather than read into memory.  Use `open_fits` to read the
+        downloaded files.
+
+        Parameters
+        ----------
+        coordinates : str or `astropy.coordinates` object
+            The target around which to search.
+        radius : str or `~astropy.units.Quantity` object, optional
+            Search radius around ``coordinates``. Defaults to 2 arcsec.
+        matches : `~astropy.table.Table`
+            Result of `query_region`.
+        run : integer, optional
+            Length of a strip observed in a single continuous image observing
+            scan.
+        rerun : integer, optional
+            Reprocessing of an imaging run. Defaults to 301 which is the most
+            recent rerun.
+        camcol : integer, optional
+            Output of one camera column of CCDs.
+        field : integer, optional
+            Part of a camcol of size 2048 by 1489 pixels.
+        band : str, list
+            Could be individual band, or list of bands.
+            Options: ``'u'``, ``'g'``, ``'r'``, ``'i'``, or ``'z'``.
+        timeout : float, optional
+            Time limit (in seconds) for establishing successful connection with
+            remote server.  Defaults to `SDSSClass.TIMEOUT`.
+        cache : bool
+            Skip the files already downloaded.
+        data_release : int
+            The data release of the SDSS to use.
+        download_dir : str, optional
+            Directory in which the files are saved, keeping the directory
+            layout of the SDSS Science Archive Server.  Defaults to the
+            astroquery cache directory.
+        max_workers : int, optional
+            Number of files downloaded at once; defaults to
+            ``astroquery.query.conf.max_workers``.
+
+        Returns
+        -------
+        manifest : `~astropy.table.Table`
+            One row per image with the columns ``Local Path``, ``Status``
+            (``COMPLETE`` or ``ERROR``), ``Message`` and ``URL``, or None if
+            the query found no images.
+        """
+        if not matches:
+            request_payload = self._args_to_payload(
+                fields=['run', 'rerun', 'camcol', 'field'],
+                coordinates=coordinates, radius=radius, spectro=False, run=run,
+                rerun=rerun, camcol=camcol, field=field,
+                data_release=data_release)
+            matches = self._query_matches(request_payload, timeout=timeout,
+                                          cache=cache,
+                                          data_release=data_release)
+            if matches is None:
+                return
+
+        return self._download_links(self._image_urls(matches, band,
+                                                     data_release),
+                                    download_dir=download_dir, cache=cache,
+                                    timeout=timeout, max_workers=max_workers)
+
+    def open_fits(self, manifest, memmap=True):
+        """
+        Open the files of a download manifest one at a time.
+
+        Parameters
+        ----------
+        manifest : `~astropy.table.Table`
+            Result of `download_spectra` or `download_images`.  Rows whose
+            download failed are skipped.
+        memmap : bool
+            Map the data of uncompressed files from disk rather than reading
+            it into memory.  Compressed files, such as the images, are always
+            read into memory.
+
+        Returns
+        -------
+        hdulists : generator
+            Yields an `~astropy.io.fits.HDUList` per downloaded file.  Each
+            one is closed when the next is requested, so keep a copy of the
+            data needed afterwards.
+        """
+        for row in manifest:
+            if row['Status'] != 'COMPLETE':
+                continue
+            path = str(row['Local Path'])
+            compressed = path.endswith(('.bz2', '.gz'))
+            with fits.open(path, memmap=memmap and not compressed) as hdulist:
+                yield hdulist
+
     def get_spectral_template_async(self, kind='qso', timeout=TIMEOUT,
                                     show_progress=True):
         """
@@ -857,12 +1051,21 @@ class SDSSClass(BaseQuery):
 
         """
 
-        if 'error_message' in io.BytesIO(response.content):
-            raise RemoteServiceError(response.content)
-        arr = np.atleast_1d(np.genfromtxt(io.BytesIO(response.content),
-                                          names=True, dtype=None,
-                                          delimiter=',', skip_header=1,
-                                          comments='#'))
+        content = response.content
+        # the first line is the name of the table, then comes the header
+        header = content.split(b'\n', 2)[1:2]
+        if not header:
+            return None
+        if header[0].strip() == b'error_message':
+            raise RemoteServiceError(content)
+        try:
+            arr = _read_typed_csv(content, header[0].decode('utf-8'))
+        except ValueError:
+            # e.g. missing values, guessed by genfromtxt
+            arr = np.atleast_1d(np.genfromtxt(io.BytesIO(content),
+                                              names=True, dtype=None,
+                                              delimiter=',', skip_header=1,
+                                              comments='#'))
 
         if len(arr) == 0:
             return None
@@ -1004,23 +1207,16 @@ class SDSSClass(BaseQuery):
 
         q_where = 'WHERE '
         if coordinates is not None:
-            if (not isinstance(coordinates, list) and
-                not isinstance(coordinates, Column) and
-                not (isinstance(coordinates, commons.CoordClasses) and
-                     not coordinates.isscalar)):
-                coordinates = [coordinates]
-            for n, target in enumerate(coordinates):
-                # Query for a region
-                target = commons.parse_coordinates(target).transform_to('fk5')
-
-                ra = target.ra.degree
-                dec = target.dec.degree
-                dr = coord.Angle(radius).to('degree').value
-                if n > 0:
-                    q_where += ' or '
-                q_where += ('((p.ra between %g and %g) and '
-                            '(p.dec between %g and %g))'
-                            % (ra - dr, ra + dr, dec - dr, dec + dr))
+            # Query for the objects within radius of the targets, found with
+            # the spatial index
+            targets = _parse_targets(coordinates)
+            radius = coord.Angle(radius).to('arcmin').value
+            searches = np.char.add(
+                np.char.add('SELECT objID FROM dbo.fGetNearbyObjAllEq(',
+                            np.char.mod('%.8f', targets.ra.degree)),
+                np.char.add(np.char.mod(', %.8f', targets.dec.degree),
+                            ', {0:.10g})'.format(radius)))
+            q_where += 'p.objID IN ({0})'.format(' UNION '.join(searches))
         elif spectro:
             # Spectra: query for specified plate, mjd, fiberid
             s_fields = ['s.%s=%d' % (key, val) for (key, val) in
@@ -1054,6 +1250,72 @@ class SDSSClass(BaseQuery):
 
         return request_payload
 
+    def _query_matches(self, request_payload, timeout=TIMEOUT, cache=True,
+                       data_release=conf.default_release):
+        url = self._get_query_url(data_release)
+        r = self._request("GET", url, params=request_payload,
+                          timeout=timeout, cache=cache)
+        matches = self._parse_result(r)
+        if matches is None:
+            warnings.warn("Query returned no results.", NoResultsWarning)
+        return matches
+
+    def _spectra_urls(self, matches, data_release):
+        if not isinstance(matches, Table):
+            raise TypeError("'matches' must be an astropy Table.")
+
+        links = []
+        for row in matches:
+            # _parse_result returns bytes (requiring a decode) for
+            # - instruments
+            # - run2d sometimes (#739)
+            run2d = row['run2d']
+            if isinstance(run2d, bytes):
+                run2d = run2d.decode()
+            instrument = row['instrument']
+            if isinstance(instrument, bytes):
+                instrument = instrument.decode()
+            links.append(self.SPECTRA_URL_SUFFIX.format(
+                base=conf.sas_baseurl, dr=data_release,
+                instrument=instrument.lower(),
+                run2d=run2d, plate=row['plate'],
+                fiber=row['fiberID'], mjd=row['mjd']))
+        return links
+
+    def _image_urls(self, matches, band, data_release):
+        if not isinstance(matches, Table):
+            raise ValueError("'matches' must be an astropy Table")
+
+        instrument = 'boss'
+        if data_release > 12:
+            instrument = 'eboss'
+        links = []
+        for row in matches:
+            for b in band:
+                links.append(self.IMAGING_URL_SUFFIX.format(
+                    base=conf.sas_baseurl, run=row['run'],
+                    dr=data_release, instrument=instrument,
+                    rerun=row['rerun'], camcol=row['camcol'],
+                    field=row['field'], band=b))
+        return links
+
+    def _download_links(self, links, download_dir=None, cache=True,
+                        timeout=TIMEOUT, max_workers=None):
+        download_dir = download_dir or os.path.join(self.cache_location,
+                                                    'sas')
+        downloads = []
+        for link in links:
+            # the archive layout keeps the files of different plates, runs
+            # and data releases apart
+            if link.startswith(conf.sas_baseurl):
+                path = link[len(conf.sas_baseurl):]
+            else:
+                path = urlparse(link).path
+            downloads.append((link, os.path.join(download_dir,
+                                                 *path.strip('/').split('/'))))
+        return DownloadManager(self, max_workers=max_workers).download(
+            downloads, cache=cache, timeout=timeout)
+
     def _get_query_url(self, data_release):
         if data_release < 10:
             suffix = self.QUERY_URL_SUFFIX_DR_OLD
@@ -1077,4 +1339,93 @@ class SDSSClass(BaseQuery):
         return url
 
 
+def _unique_objects(table):
+    """
+    Removes the repeated rows of a table, keeping the first of each in the
+    order of the table.  Rows are identified by their ``objid`` and
+    ``specobjid`` where the table has them, otherwise by all their values.
+    """
+    keys = [name for name in ('objid', 'specobjid') if name in table.colnames]
+    columns = [table[name].tolist() for name in keys or table.colnames]
+    seen = set()
+    keep = []
+    for index, row in enumerate(zip(*columns)):
+        if row not in seen:
+            seen.add(row)
+            keep.append(index)
+    return table[keep]
+
+
+def _parse_targets(coordinates):
+    """
+    Returns the target(s) of a region query as a one-dimensional FK5
+    `~astropy.coordinates.SkyCoord`, transforming all of them at once.
+    """
+    if (isinstance(coordinates, (list, Column)) and
+            not isinstance(coordinates, commons.CoordClasses)):
+        targets = [target if isinstance(target, commons.CoordClasses)
+                   else commons.parse_coordinates(target)
+                   for target in coordinates]
+        try:
+            targets = coord.SkyCoord(targets)
+        except (ValueError, TypeError):
+            # targets in different frames
+            targets = coord.SkyCoord([target.transform_to('fk5')
+                                      for target in targets])
+    else:
+        targets = commons.parse_coordinates(coordinates)
+    if targets.isscalar:
+        targets = targets.reshape((1,))
+    return targets.transform_to('fk5')
+
+
+def _read_typed_csv(content, header):
+    """
+    Reads a SkyServer CSV result, reading the numeric columns listed in the
+    field info with their type and guessing the type of the others.
+
+    Parameters
+    ----------
+    content : bytes
+        The CSV text, after a line with the name of the table
+    header : str
+        The header line, with the column names
+
+    Returns
+    -------
+    arr : `~numpy.ndarray`
+        A structured array
+    """
+    names = [name.strip() for name in header.strip().split(',')]
+    field_dtypes = get_field_dtypes()
+    dtype = [(name, field_dtypes.get(name.lower(), object)) for name in names]
+    with warnings.catch_warnings():
+        # an empty result is not worth a warning
+        warnings.simplefilter('ignore', UserWarning)
+        arr = np.loadtxt(io.BytesIO(content), dtype=dtype, delimiter=',',
+                         skiprows=2, comments='#', ndmin=1)
+    guessed = [name for name in names if arr.dtype[name] == object]
+    if not guessed:
+        return arr
+    columns = [_guess_column(arr[name]) if name in guessed else arr[name]
+               for name in names]
+    return np.rec.fromarrays(columns, names=names).view(np.ndarray)
+
+
+def _guess_column(values):
+    """
+    Converts a column of strings to integers, floats or byte strings, the
+    first type all the values convert to.
+    """
+    if len(values) == 0:
+        return values.astype('S')
+    values = values.astype(str)
+    for dtype in (np.int64, np.float64):
+        try:
+            return values.astype(dtype)
+        except (ValueError, OverflowError):
+            pass
+    return np.char.encode(values, 'utf-8')
+
+
 SDSS = SDSSClass()
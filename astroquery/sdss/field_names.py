@@ -12,7 +12,7 @@ from astropy.utils.exceptions import AstropyUserWarning
 from . import conf
 from ..utils.mocks import MockResponse
 
-__all__ = ['get_field_info', 'photoobj_defs', 'specobj_defs', 'crossid_defs']
+__all__ = ['get_field_info', 'get_field_dtypes', 'photoobj_defs', 'specobj_defs', 'crossid_defs']
 
 # Default photometric and spectroscopic quantities to retrieve.
 photoobj_defs = ['ra', 'dec', 'objid', 'run', 'rerun', 'camcol', 'field']
@@ -56,6 +56,59 @@ def get_field_info(cls, tablename, sqlurl, timeout=conf.timeout):
     return _cached_table_fields[key]
 
 
+# numpy types of the SQL types of numeric columns; integers are widened to
+# 64 bits and floats kept at 64 bits, as they were when their type was
+# guessed from the values
+_sql_dtypes = {'bigint': 'i8', 'int': 'i8', 'smallint': 'i8', 'tinyint': 'i8',
+               'float': 'f8', 'real': 'f8'}
+
+# numpy types of the columns of each table of _cached_table_fields, by key,
+# as (field info, types) pairs
+_cached_table_dtypes = {}
+# the merged types, as (field info identities, types)
+_merged_dtypes = [None, None]
+
+
+def get_field_dtypes():
+    """
+    Returns the numpy types of the numeric columns of the SkyServer tables
+    whose field info is loaded, by lower case column name.
+
+    The built-in DR12 field info is used when none is loaded.  Columns whose
+    type differs between tables are left out.  The types of each table are
+    worked out once.
+    """
+    if not _cached_table_fields:
+        _load_builtin_table_fields()
+    tables = list(_cached_table_fields.items())
+    identity = tuple((key, id(fields)) for key, fields in tables)
+    if _merged_dtypes[0] == identity:
+        return _merged_dtypes[1]
+    dtypes = {}
+    conflicts = set()
+    for key, fields in tables:
+        for name, dtype in _table_dtypes(key, fields).items():
+            if dtypes.get(name, dtype) != dtype:
+                conflicts.add(name)
+            dtypes[name] = dtype
+    merged = dict((name, dtype) for name, dtype in dtypes.items()
+                  if dtype is not None and name not in conflicts)
+    _merged_dtypes[:] = [identity, merged]
+    return merged
+
+
+def _table_dtypes(key, fields):
+    cached = _cached_table_dtypes.get(key)
+    if cached is None or cached[0] is not fields:
+        dtypes = {}
+        if 'type' in fields.colnames:
+            for name, sql_type in zip(fields['name'], fields['type']):
+                dtypes[name.lower()] = _sql_dtypes.get(sql_type)
+        cached = (fields, dtypes)
+        _cached_table_dtypes[key] = cached
+    return cached[1]
+
+
 def _columns_json_to_table(jsonobj):
     rows = jsonobj[0]['Rows']
     columns = dict([(nm, []) for nm in rows[0].keys()])
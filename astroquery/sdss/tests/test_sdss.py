@@ -7,12 +7,13 @@ from numpy.testing import assert_allclose
 
 import six
 from astropy.io import fits
-from astropy.table import Column, Table
+import astropy.units as u
+from astropy.table import Column, Table, vstack
 import pytest
 
 from ... import sdss
 from ...utils.testing_tools import MockResponse
-from ...exceptions import TimeoutError
+from ...exceptions import TimeoutError, RemoteServiceError
 from ...utils import commons
 
 # actual spectra/data are a bit heavy to include in astroquery, so we don't try
@@ -325,6 +326,31 @@ def test_query_crossid(patch_post, dr):
     url_tester_crossid(dr)
 
 
+def test_parse_result_types():
+    content = (b'#Table1\nra,objid,psfMag_r,class,run2d,extra\n'
+               b'1.5,1237652943176138868,18.25,GALAXY,26,3\n'
+               b'2.5,1237652943176138869,19.5,QSO,v5_7_0,4\n')
+    result = sdss.SDSS._parse_result(MockResponse(content))
+    # the numeric types of the field info, guessed types otherwise
+    assert result['ra'].dtype == np.float64
+    assert result['objid'].dtype == np.int64
+    assert result['psfMag_r'].dtype == np.float64
+    assert result['extra'].dtype == np.int64
+    assert result['class'].dtype.kind == 'S'
+    assert list(result['class']) == ['GALAXY', 'QSO']
+    assert list(result['run2d']) == ['26', 'v5_7_0']
+    assert result['objid'][1] == 1237652943176138869
+
+    assert sdss.SDSS._parse_result(MockResponse(b'#Table1\nra,dec\n')) is None
+    # the types are worked out once
+    assert sdss.field_names.get_field_dtypes() is \
+        sdss.field_names.get_field_dtypes()
+
+    with pytest.raises(RemoteServiceError):
+        sdss.SDSS._parse_result(
+            MockResponse(b'#Table1\nerror_message\nSQL syntax error\n'))
+
+
 # ===========
 # Payload tests
 
@@ -332,11 +358,11 @@ def test_query_crossid(patch_post, dr):
 def test_list_coordinates_payload(patch_get, dr):
     expect = ("SELECT DISTINCT "
               "p.ra, p.dec, p.objid, p.run, p.rerun, p.camcol, p.field "
-              "FROM PhotoObjAll AS p   WHERE "
-              "((p.ra between 2.02291 and 2.02402) and "
-              "(p.dec between 14.8393 and 14.8404)) or "
-              "((p.ra between 2.02291 and 2.02402) and "
-              "(p.dec between 14.8393 and 14.8404))")
+              "FROM PhotoObjAll AS p   WHERE p.objID IN ("
+              "SELECT objID FROM dbo.fGetNearbyObjAllEq("
+              "2.02346618, 14.83980789, 0.03333333333) UNION "
+              "SELECT objID FROM dbo.fGetNearbyObjAllEq("
+              "2.02346618, 14.83980789, 0.03333333333))")
     query_payload = sdss.SDSS.query_region(coords_list,
                                            get_query_payload=True,
                                            data_release=dr)
@@ -348,11 +374,11 @@ def test_list_coordinates_payload(patch_get, dr):
 def test_column_coordinates_payload(patch_get, dr):
     expect = ("SELECT DISTINCT "
               "p.ra, p.dec, p.objid, p.run, p.rerun, p.camcol, p.field "
-              "FROM PhotoObjAll AS p   WHERE "
-              "((p.ra between 2.02291 and 2.02402) and "
-              "(p.dec between 14.8393 and 14.8404)) or "
-              "((p.ra between 2.02291 and 2.02402) and "
-              "(p.dec between 14.8393 and 14.8404))")
+              "FROM PhotoObjAll AS p   WHERE p.objID IN ("
+              "SELECT objID FROM dbo.fGetNearbyObjAllEq("
+              "2.02346618, 14.83980789, 0.03333333333) UNION "
+              "SELECT objID FROM dbo.fGetNearbyObjAllEq("
+              "2.02346618, 14.83980789, 0.03333333333))")
     query_payload = sdss.SDSS.query_region(coords_column,
                                            get_query_payload=True,
                                            data_release=dr)
@@ -360,6 +386,87 @@ def test_column_coordinates_payload(patch_get, dr):
     assert query_payload['format'] == 'csv'
 
 
+def test_query_region_batches(monkeypatch):
+    queries = []
+
+    def counting_mockreturn(method, url, params=None, **kwargs):
+        queries.append(params['cmd'])
+        return get_mockreturn(method, url, params=params, **kwargs)
+    monkeypatch.setattr(sdss.SDSS, '_request', counting_mockreturn)
+
+    targets = commons.ICRSCoordGenerator(ra=np.linspace(0, 10, 5),
+                                         dec=np.linspace(-5, 5, 5),
+                                         unit='deg')
+    with sdss.conf.set_temp('batch_size', 2):
+        xid = sdss.SDSS.query_region(targets)
+    searches = [query.count('fGetNearbyObjAllEq') for query in queries
+                if 'fGetNearbyObjAllEq' in query]
+    assert searches == [2, 2, 1]
+    # every query finds the same rows, which are kept once
+    data = Table.read(data_path(DATA_FILES['images_id']),
+                      format='ascii.csv', comment='#')
+    assert len(xid) == len(data)
+
+
+def test_unique_objects():
+    table = Table([[5, 3, 5, 1, 3], [10, 20, 11, 30, 20]],
+                  names=['objid', 'specobjid'])
+    result = sdss.core._unique_objects(table)
+    assert list(result['objid']) == [5, 3, 5, 1]
+    result = sdss.core._unique_objects(table[['objid']])
+    assert list(result['objid']) == [5, 3, 1]
+
+
+def test_parse_targets():
+    targets = sdss.core._parse_targets(coords_list)
+    assert targets.shape == (2,)
+    assert targets.frame.name == 'fk5'
+    assert sdss.core._parse_targets(coords).shape == (1,)
+    galactic = coords.galactic
+    mixed = sdss.core._parse_targets([coords, galactic])
+    assert mixed.separation(targets).max() < 1e-3 * u.arcsec
+
+
+def test_download_spectra(patch_get, monkeypatch, tmpdir):
+    downloaded = []
+
+    def download_mockreturn(url, local_filepath, **kwargs):
+        downloaded.append(url)
+        if url.endswith('0002.fits'):
+            raise IOError('not found')
+        with open(data_path(DATA_FILES['spectra']), 'rb') as source:
+            with open(local_filepath, 'wb') as target:
+                target.write(source.read())
+    monkeypatch.setattr(sdss.SDSS, '_download_file', download_mockreturn)
+
+    xid = sdss.SDSS.query_region(coords, spectro=True)
+    xid = vstack([xid, xid])
+    xid['fiberID'][0] = 2
+    manifest = sdss.SDSS.download_spectra(matches=xid,
+                                          download_dir=str(tmpdir))
+    assert sorted(downloaded) == sorted(manifest['URL'])
+    assert list(manifest['Status']) == ['ERROR'] + ['COMPLETE'] * (len(xid) - 1)
+    for url, path in zip(manifest['URL'], manifest['Local Path']):
+        relative = url[len(sdss.conf.sas_baseurl):].lstrip('/')
+        assert path == os.path.join(str(tmpdir), *relative.split('/'))
+
+    hdulists = list(hdulist[0].header for hdulist
+                    in sdss.SDSS.open_fits(manifest))
+    assert len(hdulists) == len(xid) - 1
+    assert hdulists[0] == fits.getheader(data_path(DATA_FILES['spectra']))
+
+
+def test_download_images_urls(patch_get, monkeypatch, tmpdir):
+    monkeypatch.setattr(sdss.SDSS, '_download_file',
+                        lambda url, local_filepath, **kwargs: None)
+    xid = sdss.SDSS.query_region(coords)
+    manifest = sdss.SDSS.download_images(matches=xid, band='gr',
+                                         download_dir=str(tmpdir))
+    assert list(manifest['URL']) == [obj._target for obj in
+                                     sdss.SDSS.get_images_async(matches=xid,
+                                                                band='gr')]
+
+
 def test_field_help_region(patch_get):
     valid_field = sdss.SDSS.query_region(coords, field_help=True)
     assert isinstance(valid_field, dict)
@@ -28,6 +28,31 @@ class Conf(_config.ConfigNamespace):
         0,
         'Maximum number of rows that will be fetched from the result.')
 
+    batch_size = _config.ConfigItem(
+        10000,
+        'Maximum number of objects or coordinates sent in a single script by '
+        'query_objects and query_region; larger queries are split into '
+        'batches of about equal size.')
+
+    batch_workers = _config.ConfigItem(
+        2,
+        'Number of batches of a large query sent concurrently.')
+
+    queries_per_second = _config.ConfigItem(
+        5.,
+        'Maximum rate of the batches sent to SIMBAD, which blacklists '
+        'clients exceeding about 6 queries per second.')
+
+    max_retries = _config.ConfigItem(
+        4,
+        'Number of times a batch refused by SIMBAD for exceeding its rate '
+        'limits is sent again.')
+
+    retry_backoff = _config.ConfigItem(
+        2.,
+        'Seconds to wait before sending a refused batch again, doubled at '
+        'each new attempt.')
+
 
 conf = Conf()
 
@@ -3,19 +3,24 @@
 Simbad query class for accessing the Simbad Service
 """
 from __future__ import print_function
+import codecs
 import copy
+import io
 import re
 import requests
 import json
 import os
+import threading
+import time
 from collections import namedtuple
 import warnings
+import numpy as np
 import astropy.units as u
 from astropy.utils.data import get_pkg_data_filename
 import astropy.coordinates as coord
-from astropy.table import Table
+from astropy.table import Table, vstack
 import astropy.io.votable as votable
-from six import BytesIO
+import six
 
 from ..query import BaseQuery
 from ..utils import commons
@@ -95,12 +100,52 @@ SimbadError = namedtuple('SimbadError', ('line', 'msg'))
 VersionInfo = namedtuple('VersionInfo', ('major', 'minor', 'micro', 'patch'))
 
 
+section_regex = re.compile(br'(?m)^::(?:(?P<name>[A-Za-z]+):+\r?$)?')
+
+
+class _SectionReader(io.RawIOBase):
+    """
+    Read-only binary file over a memoryview slice of a response, so that a
+    section can be parsed without copying it.
+    """
+
+    def __init__(self, view):
+        super(_SectionReader, self).__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._pos)
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
 class SimbadResult(object):
     __sections = ('script', 'console', 'error', 'data')
 
     def __init__(self, txt, verbose=False):
-        self.__txt = txt
-        self.__stringio = None
+        # the sections are found in the raw bytes and only decoded on access
+        if isinstance(txt, six.text_type):
+            txt = txt.encode('utf8')
+        self.__content = txt
         self.__indexes = {}
         self.verbose = verbose
         self.exectime = None
@@ -110,12 +155,20 @@ class SimbadResult(object):
         self.__warn()
 
     def __split_sections(self):
-        for section in self.__sections:
-            match = re.search(r'(?ims)^::%s:+?\r?$(?P<content>.*?)(^::|\Z)' %
-                              section, self.__txt)
-            if match:
-                self.__indexes[section] = (match.start('content'),
-                                           match.end('content'))
+        # a section runs from its header line up to the next line starting
+        # with '::'; all of them are found in a single pass
+        section = None
+        for match in section_regex.finditer(self.__content):
+            if section is not None:
+                self.__indexes[section[0]] = (section[1], match.start())
+                section = None
+            name = match.group('name')
+            if name is not None:
+                name = name.decode('ascii').lower()
+                if name in self.__sections and name not in self.__indexes:
+                    section = (name, match.end())
+        if section is not None:
+            self.__indexes[section[0]] = (section[1], len(self.__content))
 
     def __parse_console_section(self):
         if self.console is None:
@@ -137,10 +190,25 @@ class SimbadResult(object):
                           "of the result table): %s" %
                           (error.line, error.msg))
 
+    def _section_view(self, section_name):
+        """
+        Returns the stripped content of a section as a memoryview of the
+        response, or None if the section is missing.
+        """
+        if section_name not in self.__indexes:
+            return None
+        start, end = self.__indexes[section_name]
+        content = self.__content
+        while start < end and content[start:start + 1].isspace():
+            start += 1
+        while end > start and content[end - 1:end].isspace():
+            end -= 1
+        return memoryview(content)[start:end]
+
     def __get_section(self, section_name):
-        if section_name in self.__indexes:
-            return self.__txt[self.__indexes[section_name][0]:
-                              self.__indexes[section_name][1]].strip()
+        view = self._section_view(section_name)
+        if view is not None:
+            return codecs.decode(view, 'utf8', 'replace')
 
     @property
     def script(self):
@@ -188,7 +256,7 @@ class SimbadVOTableResult(SimbadResult):
     @property
     def table(self):
         if self.__table is None:
-            self.bytes = BytesIO(self.data.encode('utf8'))
+            self.bytes = _SectionReader(self._section_view('data'))
             tbl = votable.parse_single_table(self.bytes, pedantic=False)
             self.__table = tbl.to_table()
             self.__table.convert_bytestring_to_unicode()
@@ -223,6 +291,50 @@ class SimbadObjectIDsResult(SimbadResult):
         return table
 
 
+class _TokenBucket(object):
+    """
+    Process-wide limit on the rate of the batches sent to SIMBAD.
+
+    Tokens accumulate at ``conf.queries_per_second``, up to one second's
+    worth; each batch takes a token, waiting for it if none is left.  Tokens
+    are reserved in call order, so concurrent callers are served fairly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._last = None
+
+    def acquire(self):
+        rate = float(conf.queries_per_second)
+        with self._lock:
+            now = time.time()
+            if self._tokens is None:
+                self._tokens = rate
+            else:
+                self._tokens = min(rate, self._tokens +
+                                   (now - self._last) * rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+_rate_limiter = _TokenBucket()
+
+
+def _is_throttled(ex):
+    """
+    Whether a request error means that SIMBAD refused the query for exceeding
+    its rate limits, rather than that the query is wrong.
+    """
+    if isinstance(ex, requests.exceptions.ConnectionError):
+        return 'Errno 61' in str(ex) or 'Errno 111' in str(ex)
+    response = getattr(ex, 'response', None)
+    return response is not None and response.status_code in (403, 429, 503)
+
+
 class SimbadBaseQuery(BaseQuery):
     """
     SimbadBaseQuery overloads the base query because we know that SIMBAD will
@@ -254,7 +366,7 @@ class SimbadBaseQuery(BaseQuery):
             errmsg = ("Error 403: Forbidden.  You may get this error if you "
                       "exceed the SIMBAD server's rate limits.  Try again in "
                       "a few seconds or minutes.")
-            raise requests.exceptions.HTTPError(errmsg)
+            raise requests.exceptions.HTTPError(errmsg, response=response)
         else:
             response.raise_for_status()
 
@@ -603,8 +715,24 @@ class SimbadClass(SimbadBaseQuery):
         -------
         table : `~astropy.table.Table`
             Query results table
+
+        Notes
+        -----
+        Lists longer than ``conf.batch_size`` are sent as several scripts,
+        at no more than ``conf.queries_per_second``, and the results are
+        stacked in the order of the list.
         """
+        if not get_query_payload and len(object_names) > conf.batch_size:
+            object_names = list(object_names)
+            batches = commons.split_batches(len(object_names), conf.batch_size)
+            payloads = [self._args_to_payload('\n'.join(object_names[batch]),
+                                              wildcard=wildcard,
+                                              caller='query_object_async')
+                        for batch in batches]
+            return self._query_batches(payloads, batches, verbose=verbose)
+
         return self.query_object('\n'.join(object_names), wildcard=wildcard,
+                                 verbose=verbose,
                                  get_query_payload=get_query_payload)
 
     def query_objects_async(self, object_names, wildcard=False, cache=True,
@@ -633,6 +761,129 @@ class SimbadClass(SimbadBaseQuery):
                                        wildcard=wildcard, cache=cache,
                                        get_query_payload=get_query_payload)
 
+    def query_region(self, coordinates, radius=2*u.arcmin,
+                     equinox=2000.0, epoch='J2000', cache=True,
+                     get_query_payload=False, verbose=False):
+        """
+        Queries around a coordinate or a vector of coordinates and returns
+        the results as a `~astropy.table.Table`.
+
+        Parameters
+        ----------
+        coordinates : str or `astropy.coordinates` object
+            the identifier or coordinates around which to query.
+        radius : str or `~astropy.units.Quantity`, optional
+            the radius of the region, or one radius per coordinate. If
+            missing, set to default value of 2 arcmin.
+        equinox : float, optional
+            the equinox of the coordinates. If missing set to
+            default 2000.0.
+        epoch : str, optional
+            the epoch of the input coordinates. Must be specified as
+            [J|B] <epoch>. If missing, set to default J2000.
+        get_query_payload : bool, optional
+            When set to `True` the method returns the HTTP request parameters.
+            Defaults to `False`.
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            Query results table
+
+        Notes
+        -----
+        Vectors of more than ``conf.batch_size`` coordinates are sent as
+        several scripts, at no more than ``conf.queries_per_second``, and the
+        results are stacked in the order of the coordinates.
+        """
+        if not get_query_payload:
+            try:
+                c = commons.parse_coordinates(coordinates)
+            except (u.UnitsError, TypeError):
+                raise ValueError("Coordinates not specified correctly")
+            coordinates = c
+            if _has_length(c) and len(c) > conf.batch_size:
+                radius_vector = (_has_length(radius) and
+                                 not isinstance(radius, six.string_types) and
+                                 len(radius) == len(c))
+                batches = commons.split_batches(len(c), conf.batch_size)
+                payloads = [self.query_region_async(
+                    c[batch], radius[batch] if radius_vector else radius,
+                    equinox=equinox, epoch=epoch, get_query_payload=True)
+                    for batch in batches]
+                return self._query_batches(payloads, batches, cache=cache,
+                                           verbose=verbose)
+
+        response = self.query_region_async(coordinates, radius=radius,
+                                           equinox=equinox, epoch=epoch,
+                                           cache=cache,
+                                           get_query_payload=get_query_payload)
+        if get_query_payload:
+            return response
+
+        return self._parse_result(response, verbose=verbose)
+
+    def _query_batches(self, payloads, batches, cache=True, verbose=False):
+        """
+        Sends the scripts of a query split into batches and returns their
+        results as a single `~astropy.table.Table`, in the order of the
+        batches.
+
+        At most ``conf.batch_workers`` batches are in progress at once and
+        they are sent at no more than ``conf.queries_per_second``, a limit
+        shared by all the batched queries of the process.  A batch refused
+        by SIMBAD for exceeding its rate limits is sent again up to
+        ``conf.max_retries`` times, waiting ``conf.retry_backoff`` seconds,
+        doubled at each attempt.
+
+        Parameters
+        ----------
+        payloads : list of dict
+            the request parameters of each batch, as returned by the query
+            methods with ``get_query_payload=True``
+        batches : list of slice
+            the objects or coordinates of each batch
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            Query results table; the script line numbers of its ``errors``
+            are those of a single script with all the batches.
+        """
+        def send(payload):
+            attempt = 0
+            while True:
+                _rate_limiter.acquire()
+                try:
+                    return self._request("POST", self.SIMBAD_URL,
+                                         data=payload, timeout=self.TIMEOUT,
+                                         cache=cache)
+                except (requests.exceptions.HTTPError,
+                        requests.exceptions.ConnectionError) as ex:
+                    if attempt >= conf.max_retries or not _is_throttled(ex):
+                        raise
+                time.sleep(conf.retry_backoff * 2 ** attempt)
+                attempt += 1
+
+        tables = []
+        errors = []
+        offset = 0
+        responses = self.map_query(send, [(payload,) for payload in payloads],
+                                   max_workers=conf.batch_workers,
+                                   return_exceptions=False)
+        for batch, response in zip(batches, responses):
+            table = self._parse_result(response, verbose=verbose)
+            if table is not None:
+                tables.append(table)
+            errors.extend(SimbadError(error.line + offset, error.msg)
+                          for error in self.last_parsed_result.errors)
+            offset += batch.stop - batch.start
+        if not tables:
+            return None
+        result = vstack(tables, metadata_conflicts='silent')
+        result.errors = errors
+        return result
+
     def query_region_async(self, coordinates, radius=2*u.arcmin,
                            equinox=2000.0, epoch='J2000', cache=True,
                            get_query_payload=False):
@@ -691,19 +942,21 @@ class SimbadClass(SimbadBaseQuery):
             else:
                 frame = set(frame).pop()
 
-            if vector and _has_length(radius) and len(radius) == len(ra):
-                # all good, continue
-                pass
-            elif vector and _has_length(radius) and len(radius) != len(ra):
+            radius_vector = (_has_length(radius) and
+                             not isinstance(radius, six.string_types))
+            if vector and radius_vector and len(radius) == len(ra):
+                radius = _parse_radius(radius)
+            elif vector and radius_vector and len(radius) != len(ra):
                 raise ValueError("Mismatch between radii and coordinates")
-            elif vector and not _has_length(radius):
+            elif vector and not radius_vector:
                 radius = [_parse_radius(radius)] * len(ra)
 
             if vector:
-                query_str = "\n".join([base_query_str
-                                      .format(ra=ra_, dec=dec_, rad=rad_,
-                                              frame=frame, equinox=equinox)
-                                      for ra_, dec_, rad_ in zip(ra, dec, radius)])
+                suffix = " frame={frame} equi={equinox}".format(
+                    frame=frame, equinox=equinox)
+                query_str = "\n".join(["query coo " + ra_ + " " + dec_ +
+                                       " radius=" + rad_ + suffix
+                                       for ra_, dec_, rad_ in zip(ra, dec, radius)])
 
         else:
             radius = _parse_radius(radius)
@@ -1046,9 +1299,9 @@ class SimbadClass(SimbadBaseQuery):
         """
         self.last_response = result
         try:
-            content = result.text
+            content = result.content
             self.last_parsed_result = resultclass(content, verbose=verbose)
-            if self.last_parsed_result.data is None:
+            if self.last_parsed_result._section_view('data') is None:
                 return None
             resulttable = self.last_parsed_result.table
             if len(resulttable) == 0:
@@ -1085,7 +1338,14 @@ def _has_length(x):
         return False
 
 
+_FRAMES = {'icrs': 'ICRS', 'fk4': 'FK4', 'fk5': 'FK5', 'galactic': 'GAL'}
+
+
 def _get_frame_coords(c):
+    if isinstance(c, coord.SkyCoord) and not c.isscalar:
+        # whole arrays are formatted at once
+        ra, dec, frame = _get_frame_coords_vector(c.ravel())
+        return list(ra), list(dec), [frame] * len(ra)
     if _has_length(c):
         # deal with vectors differently
         parsed = [_get_frame_coords(cc) for cc in c]
@@ -1110,7 +1370,59 @@ def _get_frame_coords(c):
         raise ValueError("%s is not a valid coordinate" % c)
 
 
+def _get_frame_coords_vector(c):
+    """
+    Formats a one-dimensional coordinate array as `_get_frame_coords` does
+    for each coordinate, returning arrays of strings and the frame.
+    """
+    if c.frame.name not in _FRAMES:
+        raise ValueError("%s is not a valid coordinate" % c)
+    frame = _FRAMES[c.frame.name]
+    if frame == 'GAL':
+        lon = c.l.degree.astype(str)
+        lat = c.b.degree.astype(str)
+        signed = (np.char.startswith(lat, '-') |
+                  np.char.startswith(lat, '+'))
+        lat = np.where(signed, lat, np.char.add('+', lat))
+        return lon, lat, frame
+    return (_sexagesimal(c.ra.hour),
+            _sexagesimal(c.dec.degree, alwayssign=True), frame)
+
+
+def _sexagesimal(values, alwayssign=False):
+    """
+    Formats an array of hours or degrees as ``Angle.to_string(sep=':')``
+    formats each of them, with NumPy operations on the whole array.
+    """
+    values = np.asarray(values, dtype=float)
+    sign = np.copysign(1.0, values)
+    fraction, d = np.modf(np.fabs(values))
+    fraction, m = np.modf(fraction * 60.)
+    s = fraction * 60.
+    # carry rounded seconds and minutes, as astropy does
+    carry = s >= 60. - 1e-8
+    s[carry] = 0.
+    m += carry
+    carry = m >= 60.
+    m[carry] = 0.
+    d += carry
+
+    seconds = np.char.mod('%.8f', s)
+    seconds = np.char.rstrip(np.char.rstrip(seconds, '0'), '.')
+    short = (np.char.str_len(seconds) == 1) | (np.char.find(seconds, '.') == 1)
+    seconds = np.where(short, np.char.add('0', seconds), seconds)
+
+    result = np.char.add(np.char.mod('%.0f', np.copysign(d, sign)), ':')
+    result = np.char.add(result, np.char.mod('%02d', m.astype(int)))
+    result = np.char.add(np.char.add(result, ':'), seconds)
+    if alwayssign:
+        result = np.where(sign < 0, result, np.char.add('+', result))
+    return result
+
+
 def _to_simbad_format(ra, dec):
+    if not ra.isscalar:
+        return (_sexagesimal(ra.hour), _sexagesimal(dec.degree, True))
     # This irrelevantly raises the exception
     # "AttributeError: Angle instance has no attribute 'hour'"
     ra = ra.to_string(u.hour, sep=':')
@@ -1119,24 +1431,27 @@ def _to_simbad_format(ra, dec):
 
 
 def _parse_radius(radius):
+    """
+    Formats a radius, or an array of radii, in the most appropriate unit
+    among degrees, arcminutes and arcseconds.
+    """
     try:
         angle = coord.Angle(radius)
-        # find the most appropriate unit - d, m or s
-        nonzero_indices = [i for (i, val) in enumerate(angle.dms)
-                           if int(val) > 0]
-        if len(nonzero_indices) > 0:
-            index = min(nonzero_indices)
-        else:
-            index = 2  # use arcseconds when radius smaller than 1 arcsecond
-        unit = ('d', 'm', 's')[index]
-        if unit == 'd':
-            return str(angle.degree) + unit
-        if unit == 'm':
-            return str(angle.arcmin) + unit
-        if unit == 's':
-            return str(angle.arcsec) + unit
+        dms = angle.dms
     except (coord.errors.UnitsError, AttributeError):
         raise ValueError("Radius specified incorrectly")
+    # use arcseconds when radius smaller than 1 arcsecond
+    degree, arcmin = dms.d >= 1, dms.m >= 1
+    if angle.isscalar:
+        if degree:
+            return str(angle.degree) + 'd'
+        if arcmin:
+            return str(angle.arcmin) + 'm'
+        return str(angle.arcsec) + 's'
+    values = np.where(degree, angle.degree,
+                      np.where(arcmin, angle.arcmin, angle.arcsec))
+    units = np.where(degree, 'd', np.where(arcmin, 'm', 's'))
+    return list(np.char.add(values.astype(str), units))
 
 
 Simbad = SimbadClass()
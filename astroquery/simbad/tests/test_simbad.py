@@ -1,9 +1,12 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 import os
 import re
+import time
 
+import requests
 import six
 import pytest
+import astropy.coordinates as coord
 import astropy.units as u
 from astropy.table import Table
 import numpy as np
@@ -118,6 +121,54 @@ def test_get_frame_coordinates(coordinates, expected_frame):
         np.testing.assert_almost_equal(float(b), -29.75447)
 
 
+@pytest.mark.parametrize('frame', ['icrs', 'fk4', 'fk5', 'galactic'])
+def test_get_frame_coords_vector(frame):
+    # whole arrays are formatted as each coordinate on its own
+    lon = [0, 359.99999999999, 15.0, 0.0041666666, 83.82207, 266.835]
+    lat = [-0.0, -1e-9, 89.9999999999, -0.5, -80.86667, -28.385]
+    if frame == 'galactic':
+        coordinates = coord.SkyCoord(l=lon, b=lat, unit=u.deg, frame=frame)
+    else:
+        coordinates = coord.SkyCoord(ra=lon, dec=lat, unit=u.deg, frame=frame)
+    vector = simbad.core._get_frame_coords(coordinates)
+    assert list(zip(*vector)) == [simbad.core._get_frame_coords(c)
+                                  for c in coordinates]
+
+
+def test_parse_radius_vector():
+    radius = [1.2, 0.5, 0.003, 0.1 / 3600] * u.deg
+    assert (simbad.core._parse_radius(radius) ==
+            [simbad.core._parse_radius(r) for r in radius] ==
+            ['1.2d', '30.0m', '10.8s', '0.1s'])
+
+
+def test_query_region_vector_payload():
+    payload = simbad.core.Simbad.query_region(
+        multicoords, radius=[0.5, 2] * u.arcsec, get_query_payload=True)
+    assert payload['script'].split('\n')[2:4] == [
+        'query coo 5:35:17.3 -80:52:00 radius=0.5s frame=ICRS equi=2000.0',
+        'query coo 17:47:20.4 -28:23:07.008 radius=2.0s frame=ICRS equi=2000.0']
+
+
+def test_simbad_result_sections():
+    content = (b'::script::::\r\nquery id m1\r\n'
+               b'::console::\n\nSIMBAD4 rel 1.207\ntotal execution time: 0.143 secs\n'
+               b'::ERROR:::::\n[3] not found: \xc3\xa9\n'
+               b'::data::::::::::\n\n  <VOTABLE/>  \n')
+    for txt in (content, content.decode('utf8')):
+        with pytest.warns(UserWarning):
+            result = simbad.core.SimbadResult(txt)
+        assert result.script == 'query id m1'
+        assert result.exectime == 0.143
+        assert result.sim_version[:3] == ('4', '1', '207')
+        assert result.errors == [(3, u'not found: \xe9')]
+        assert result.data == '<VOTABLE/>'
+        # the data are not copied out of the response
+        view = result._section_view('data')
+        assert isinstance(view, memoryview) and view.tobytes() == b'<VOTABLE/>'
+    assert simbad.core.SimbadResult(b'::script::\nquery').data is None
+
+
 def test_parse_result():
     result1 = simbad.core.Simbad._parse_result(
         MockResponseSimbad('query id '), simbad.core.SimbadVOTableResult)
@@ -436,3 +487,67 @@ def test_regression_issue388():
     truth = b'M   1' if commons.ASTROPY_LT_4_1 else 'M   1'
     assert parsed_table['MAIN_ID'][0] == truth
     assert len(parsed_table) == 1
+
+
+def test_query_objects_batches(patch_post):
+    scripts = []
+    throttled = []
+
+    def batch_mockreturn(self, method, url, data, timeout, **kwargs):
+        if not throttled:
+            # the first batch is refused once for exceeding the rate limit
+            response = MockResponse(status_code=403)
+            throttled.append(response)
+            raise requests.exceptions.HTTPError("Error 403", response=response)
+        scripts.append(data['script'])
+        return MockResponseSimbad(data['script'])
+
+    patch_post.setattr(simbad.SimbadClass, '_request', batch_mockreturn)
+    names = ['m{0}'.format(i) for i in range(1, 8)]
+    with simbad.conf.set_temp('batch_size', 3):
+        with simbad.conf.set_temp('retry_backoff', 0):
+            result = simbad.core.Simbad.query_objects(names)
+    assert len(scripts) == 3
+    assert [script.count('\n') for script in scripts] == [6, 5, 5]
+    assert 'query id  m1\nm2\nm3' in scripts[0]
+    assert 'query id  m6\nm7' in scripts[-1]
+    # one row per batch in the mocked responses
+    assert len(result) == 3
+
+    payload = simbad.core.Simbad.query_objects(names, get_query_payload=True)
+    assert 'm1\nm2\nm3\nm4\nm5\nm6\nm7' in payload['script']
+
+
+def test_query_region_batches(patch_post):
+    scripts = []
+    with open(data_path(DATA_FILES['id']), 'rb') as f:
+        content = f.read().replace(
+            b'::data::', b'::error::::\n\n[3] an error\n\n::data::')
+
+    def batch_mockreturn(self, method, url, data, timeout, **kwargs):
+        scripts.append(data['script'])
+        return MockResponse(content)
+
+    patch_post.setattr(simbad.SimbadClass, '_request', batch_mockreturn)
+    coordinates = coord.SkyCoord(ra=np.arange(5), dec=np.arange(5),
+                                 unit=u.deg)
+    with simbad.conf.set_temp('batch_size', 3):
+        with pytest.warns(UserWarning):
+            result = simbad.core.Simbad.query_region(coordinates,
+                                                     radius=2 * u.arcmin)
+    assert [script.count('query coo') for script in scripts] == [3, 2]
+    assert 'query coo 0:08:00 +2:00:00 radius=2.0m' in scripts[0]
+    assert 'query coo 0:12:00 +3:00:00 radius=2.0m' in scripts[1]
+    # the error lines of the second batch are renumbered
+    assert [error.line for error in result.errors] == [3, 6]
+    assert len(result) == 2
+
+
+def test_token_bucket():
+    bucket = simbad.core._TokenBucket()
+    with simbad.conf.set_temp('queries_per_second', 20.):
+        start = time.time()
+        for i in range(30):
+            bucket.acquire()
+    # 20 queries at once, then 10 at 20 per second
+    assert 0.4 < time.time() - start < 1
@@ -0,0 +1,159 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import io
+import pickle
+import time
+
+import pytest
+import requests
+
+from .. import cache
+from ..query import BaseQuery
+from ..utils import commons
+
+
+def make_response(content=b'abc', status_code=200, url='http://a.b/c'):
+    response = requests.Response()
+    response._content = content
+    response.status_code = status_code
+    response.url = url
+    response.headers['Content-Type'] = 'text/plain'
+    response.encoding = 'utf-8'
+    request = requests.Request('POST', url, data={'q': 'x'}).prepare()
+    response.request = request
+    return response
+
+
+@pytest.fixture(params=['directory', 'sqlite', 'memory'])
+def backend(request, tmpdir):
+    if request.param == 'directory':
+        return cache.DirectoryCacheBackend(tmpdir.strpath, max_bytes=10)
+    elif request.param == 'sqlite':
+        return cache.SQLiteCacheBackend(tmpdir.strpath, max_bytes=10)
+    return cache.MemoryCacheBackend(max_bytes=10)
+
+
+def test_roundtrip(backend):
+    backend.put('k', cache.CacheEntry.from_response(make_response()))
+    response = backend.get('k').to_response()
+    assert response.content == b'abc'
+    assert response.text == 'abc'
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/plain'
+    assert response.request.body == 'q=x'
+    assert backend.stats.hits == 1
+    assert backend.get('missing') is None
+    assert backend.stats.misses == 1
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+def test_put_streamed_response(backend, method):
+    backend.max_bytes = None
+    response = requests.Response()
+    response.raw = io.BytesIO(b'abc')
+    response.status_code = 200
+    response.url = 'http://a.b/c'
+    response.request = requests.Request(
+        method, 'http://a.b/c',
+        data={'q': 'x'} if method == 'POST' else None).prepare()
+
+    returned = backend.put_response('k', response)
+    assert returned.content == b'abc'
+    entry = backend.get('k')
+    assert entry.size == 3
+    assert entry.body == b'abc'
+    assert entry.request['method'] == method
+    assert entry.to_response().request.body == response.request.body
+
+
+def test_lru_eviction(backend):
+    for key in 'abc':
+        backend.put(key, cache.CacheEntry(b'1234'))
+        # directory backend LRU order relies on file modification times
+        time.sleep(0.01)
+    assert 'a' not in backend
+    assert 'b' in backend and 'c' in backend
+    assert backend.stats.evictions == 1
+    assert backend.total_bytes() == 8
+
+    # an entry larger than the whole cache is never stored
+    backend.put('big', cache.CacheEntry(b'x' * 11))
+    assert 'big' not in backend
+
+
+def test_ttl(backend):
+    backend.put('k', cache.CacheEntry(b'1', created=time.time() - 100))
+    assert backend.get('k', ttl=1000) is not None
+    assert backend.get('k', ttl=10) is None
+    assert 'k' not in backend
+    assert backend.stats.expirations == 1
+
+
+def test_tiered(tmpdir):
+    memory = cache.MemoryCacheBackend()
+    disk = cache.DirectoryCacheBackend(tmpdir.strpath)
+    tiered = cache.TieredCacheBackend(memory, disk)
+    disk.put('k', cache.CacheEntry(b'1'))
+    assert tiered.get('k').body == b'1'
+    assert 'k' in memory
+    assert tiered.stats.hits == 1
+
+
+def test_legacy_pickle(tmpdir):
+    with open(tmpdir.join('k.pickle').strpath, 'wb') as f:
+        pickle.dump(make_response(), f)
+    backend = cache.DirectoryCacheBackend(tmpdir.strpath)
+    assert backend.get('k').body == b'abc'
+
+
+def test_request_uses_cache(monkeypatch, tmpdir):
+    calls = []
+
+    def mock_request(self, method, url, **kwargs):
+        calls.append(url)
+        return make_response(url=url)
+
+    monkeypatch.setattr(requests.Session, 'request', mock_request)
+    query = BaseQuery()
+    query.cache_location = tmpdir.strpath
+
+    first = query._request('GET', 'http://a.b/c')
+    second = query._request('GET', 'http://a.b/c')
+    assert first.content == second.content == b'abc'
+    assert len(calls) == 1
+    assert query.cache_stats.hits == 1
+
+    query.cache_ttl = 1e-9
+    time.sleep(0.01)
+    query._request('GET', 'http://a.b/c')
+    assert len(calls) == 2
+
+    query.clear_cache()
+    assert len(query._cache) == 0
+
+
+def test_streamed_response_written_to_disk(monkeypatch, tmpdir):
+    def mock_request(self, method, url, stream=False, **kwargs):
+        assert stream
+        response = requests.Response()
+        response.raw = io.BytesIO(b'<?xml body')
+        response.status_code = 200
+        response.url = url
+        return response
+
+    monkeypatch.setattr(requests.Session, 'request', mock_request)
+    query = BaseQuery()
+    query.cache_backend = cache.DirectoryCacheBackend(tmpdir.strpath)
+
+    for _ in range(2):
+        response = query._request('GET', 'http://a.b/c')
+        assert isinstance(response, cache.CachedResponse)
+        # the body stays on disk until it is accessed
+        assert response._content is False
+        with commons.response_fileobj(response) as f:
+            assert f.read(5) == b'<?xml'
+        assert response._content is False
+        assert response.content == b'<?xml body'
+        assert response.text == '<?xml body'
+
+    entry = query._cache.get(query._last_query.hash())
+    assert entry.mmap()[:5] == b'<?xml'
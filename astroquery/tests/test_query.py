@@ -0,0 +1,74 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import threading
+import time
+
+import pytest
+import requests
+
+from .. import query
+from ..query import BaseQuery
+
+
+def make_response(url):
+    response = requests.Response()
+    response._content = url.encode()
+    response.status_code = 200
+    response.url = url
+    return response
+
+
+@pytest.fixture
+def base_query(tmpdir):
+    base_query = BaseQuery()
+    base_query.cache_location = tmpdir.strpath
+    return base_query
+
+
+def test_request_many(monkeypatch, base_query):
+    calls = []
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def mock_request(self, method, url, **kwargs):
+        with lock:
+            calls.append(url)
+            active.append(url)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(url)
+        if url.endswith('/3'):
+            raise requests.exceptions.ConnectionError('refused')
+        return make_response(url)
+
+    monkeypatch.setattr(requests.Session, 'request', mock_request)
+    monkeypatch.setattr(query.conf, 'max_connections_per_host', 2)
+
+    payloads = [dict(method='GET', url='http://a.b/{0}'.format(i))
+                for i in range(8)]
+    responses = base_query.request_many(payloads, max_workers=8)
+
+    assert [r.content for i, r in enumerate(responses) if i != 3] == [
+        'http://a.b/{0}'.format(i).encode() for i in range(8) if i != 3]
+    assert isinstance(responses[3], requests.exceptions.ConnectionError)
+    assert peak[0] <= 2
+
+    # cached responses never touch the network
+    del calls[:]
+    payloads.pop(3)
+    responses = base_query.request_many(payloads)
+    assert calls == []
+    assert len(responses) == 7
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        base_query.request_many([dict(method='GET', url='http://a.b/3')],
+                                return_exceptions=False)
+
+
+def test_map_query(base_query):
+    def method(a, b=0, c=0):
+        return a + b + c
+
+    results = base_query.map_query(method, [1, (1, 2), dict(a=1, b=2)], c=10)
+    assert results == [11, 13, 13]
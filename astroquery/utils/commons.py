@@ -8,6 +8,7 @@ import warnings
 import os
 import shutil
 import socket
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
@@ -51,6 +52,7 @@ __all__ = ['send_request',
            'TableList',
            'suppress_vo_warnings',
            'validate_email',
+           'response_fileobj',
            'ASTROPY_LT_4_1']
 
 ASTROPY_LT_4_1 = not minversion('astropy', '4.1')
@@ -296,6 +298,48 @@ class TableList(list):
         self.print_table_list()
 
 
+def split_batches(n_entries, batch_size):
+    """
+    Returns the slices splitting ``n_entries`` into batches of about equal
+    size, none larger than ``batch_size``.
+    """
+    n_batches = max(1, -(-n_entries // batch_size))
+    size, extra = divmod(n_entries, n_batches)
+    batches = []
+    start = 0
+    for i in range(n_batches):
+        stop = start + size + (1 if i < extra else 0)
+        batches.append(slice(start, stop))
+        start = stop
+    return batches
+
+
+def map_concurrent(function, arguments, max_workers,
+                   return_exceptions=True):
+    """
+    Calls ``function`` on each item of ``arguments`` in a pool of
+    ``max_workers`` threads.
+
+    Returns the results in the order of ``arguments``.  If
+    ``return_exceptions`` is True, a call that raises puts its exception in
+    the results in place of a result; otherwise the first error is raised
+    and the calls not started yet are cancelled.
+    """
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(function, item) for item in arguments]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as ex:
+                if not return_exceptions:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                results.append(ex)
+    return results
+
+
 def _is_coordinate(coordinates):
     """
     Returns `True` if coordinates can be parsed via `astropy.coordinates`
@@ -464,11 +508,25 @@ def get_readable_fileobj(*args, **kwargs):
     return aud.get_readable_fileobj(*args, **kwargs)
 
 
+def response_fileobj(response):
+    """
+    Return a binary file object over the body of an HTTP response.
+
+    Responses served from the astroquery cache are streamed from disk rather
+    than loaded in memory.
+    """
+    if hasattr(response, 'open_body'):
+        return response.open_body()
+    return six.BytesIO(response.content)
+
+
 def parse_votable(content):
     """
-    Parse a votable in string format
+    Parse a votable in string format, or from a binary file object
     """
-    tables = votable.parse(six.BytesIO(content), pedantic=False)
+    if not hasattr(content, 'read'):
+        content = six.BytesIO(content)
+    tables = votable.parse(content, pedantic=False)
     return tables
 
 
@@ -0,0 +1,252 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+Concurrent, resumable download of many files through the HTTP session of a
+query object.
+"""
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from astropy.logger import log
+from astropy.table import Table
+from astropy.utils.console import ProgressBarOrSpinner
+import astropy.utils.data
+
+from ..query import conf, _host_limiter
+
+__all__ = ['Download', 'DownloadManager']
+
+MANIFEST_COLUMNS = ('Local Path', 'Status', 'Message', 'URL')
+
+
+class Download(object):
+    """
+    A file to download.
+
+    Parameters
+    ----------
+    url : str
+    local_filepath : str
+    size : int, optional
+        Expected size in bytes, checked once the file is downloaded.
+    checksum : str, optional
+        Expected checksum of the file, as ``'<algorithm>:<hexdigest>'`` with
+        any `hashlib` algorithm, e.g. ``'md5:0cc175b9...'``.  A bare digest is
+        taken to be MD5.
+    **kwargs
+        Extra arguments of the request, e.g. ``auth`` or ``headers``.
+    """
+
+    def __init__(self, url, local_filepath, size=None, checksum=None,
+                 **kwargs):
+        self.url = url
+        self.local_filepath = local_filepath
+        self.size = size
+        self.checksum = checksum
+        self.kwargs = kwargs
+
+
+class _Progress(object):
+    """
+    Thread-safe aggregate progress of all downloads of a manager.
+    """
+
+    def __init__(self, bar):
+        self._bar = bar
+        self._lock = threading.Lock()
+        self.bytes_read = 0
+
+    def update(self, nbytes):
+        with self._lock:
+            self.bytes_read += nbytes
+            self._bar.update(self.bytes_read)
+
+
+class DownloadManager(object):
+    """
+    Download lists of files concurrently through ``query._download_file``.
+
+    Downloads share the query object's session, so its authentication and
+    connection pool are used, and are limited to
+    ``astroquery.query.conf.max_connections_per_host`` concurrent requests
+    per host.  Partial files are resumed with per-request ``Range`` headers.
+    Large files can also be fetched as several ranges in parallel.
+
+    Parameters
+    ----------
+    query : `~astroquery.query.BaseQuery`
+        The query object whose session and ``_download_file`` are used.
+    max_workers : int, optional
+        Number of files downloaded at once; defaults to
+        ``astroquery.query.conf.max_workers``.
+    segments : int
+        Number of byte ranges fetched in parallel for a single file of at
+        least ``segment_threshold`` bytes, if the server accepts ranges.  The
+        default, 1, disables segmented downloads.
+    segment_threshold : int
+        Minimum size in bytes of the files downloaded in segments.
+    """
+
+    def __init__(self, query, max_workers=None, segments=1,
+                 segment_threshold=64 * 2 ** 20):
+        self.query = query
+        self.max_workers = max_workers or conf.max_workers
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+
+    def download(self, downloads, cache=True, continuation=True, **kwargs):
+        """
+        Download files concurrently.
+
+        Parameters
+        ----------
+        downloads : iterable
+            `Download` objects or ``(url, local_filepath)`` pairs.
+        cache : bool
+            Skip files already present with the expected size.
+        continuation : bool
+            Resume partially downloaded files if the server supports ranges.
+        **kwargs
+            Arguments of ``_download_file`` shared by all downloads, e.g.
+            ``timeout``, ``auth`` or ``head_safe``.
+
+        Returns
+        -------
+        manifest : `~astropy.table.Table`
+            One row per download, in input order, with the columns
+            ``Local Path``, ``Status`` (``COMPLETE`` or ``ERROR``),
+            ``Message`` and ``URL``.
+        """
+        downloads = [item if isinstance(item, Download) else Download(*item)
+                     for item in downloads]
+        for item in downloads:
+            dirname = os.path.dirname(item.local_filepath)
+            if dirname and not os.path.exists(dirname):
+                os.makedirs(dirname, exist_ok=True)
+
+        sizes = [item.size for item in downloads]
+        total = sum(sizes) if None not in sizes else None
+
+        # Only show progress bar if logging level is INFO or lower.
+        if log.getEffectiveLevel() <= 20:
+            progress_stream = None  # Astropy default
+        else:
+            progress_stream = io.StringIO()
+
+        with ProgressBarOrSpinner(total, 'Downloading {0} files ...'
+                                  .format(len(downloads)),
+                                  file=progress_stream) as bar:
+            progress = _Progress(bar)
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                futures = [executor.submit(self._fetch, item, progress,
+                                           cache=cache,
+                                           continuation=continuation,
+                                           **kwargs)
+                           for item in downloads]
+                rows = [future.result() for future in futures]
+
+        if not rows:
+            return Table(names=MANIFEST_COLUMNS, dtype=(str,) * 4)
+        return Table(rows=rows, names=MANIFEST_COLUMNS)
+
+    def _fetch(self, item, progress, **kwargs):
+        kwargs.update(item.kwargs)
+        try:
+            length = None
+            if self.segments > 1 and not os.path.exists(item.local_filepath):
+                length = self._range_length(item.url, **kwargs)
+            if length is not None and length >= self.segment_threshold:
+                self._fetch_segmented(item, length, progress, **kwargs)
+                expected_size = item.size or length
+            else:
+                with _host_limiter.slot(item.url):
+                    self.query._download_file(item.url, item.local_filepath,
+                                              progress_hook=progress.update,
+                                              **kwargs)
+                expected_size = item.size
+            message = self._verify(item, expected_size)
+        except (requests.exceptions.RequestException, IOError, OSError) as ex:
+            message = "{0}: {1}".format(ex.__class__.__name__, ex)
+        if message is not None:
+            log.warning("Download of {0} failed: {1}".format(item.url, message))
+            return [item.local_filepath, 'ERROR', message, item.url]
+        return [item.local_filepath, 'COMPLETE', None, item.url]
+
+    def _range_length(self, url, timeout=None, auth=None, headers=None,
+                      **kwargs):
+        """
+        Length of the resource, if the server supports byte ranges for it.
+        """
+        with _host_limiter.slot(url):
+            response = self.query._session.request(
+                'HEAD', url, timeout=timeout, auth=auth, headers=headers,
+                allow_redirects=True)
+        response.raise_for_status()
+        if (response.headers.get('Accept-Ranges') != 'bytes' or
+                'Content-Length' not in response.headers):
+            return None
+        return int(response.headers['Content-Length'])
+
+    def _fetch_segmented(self, item, length, progress, **kwargs):
+        segment_size = -(-length // self.segments)
+        with open(item.local_filepath, 'wb') as f:
+            f.truncate(length)
+        ranges = [(start, min(start + segment_size, length) - 1)
+                  for start in range(0, length, segment_size)]
+        try:
+            with ThreadPoolExecutor(len(ranges)) as executor:
+                futures = [executor.submit(self._fetch_range, item, start,
+                                           end, progress, **kwargs)
+                           for start, end in ranges]
+                for future in futures:
+                    future.result()
+        except Exception:
+            # a preallocated file with holes cannot be resumed
+            os.remove(item.local_filepath)
+            raise
+
+    def _fetch_range(self, item, start, end, progress, timeout=None,
+                     auth=None, headers=None, method='GET', **kwargs):
+        headers = dict(headers or {}, Range='bytes={0}-{1}'.format(start, end))
+        blocksize = astropy.utils.data.conf.download_block_size
+        with _host_limiter.slot(item.url):
+            response = self.query._session.request(
+                method, item.url, timeout=timeout, auth=auth, headers=headers,
+                stream=True)
+            response.raise_for_status()
+            if response.status_code != 206:
+                response.close()
+                raise IOError("Server ignored the range request for {0}"
+                              .format(item.url))
+            with open(item.local_filepath, 'r+b') as f:
+                f.seek(start)
+                for block in response.iter_content(blocksize):
+                    f.write(block)
+                    progress.update(len(block))
+            response.close()
+
+    def _verify(self, item, expected_size):
+        """
+        Check the size and checksum of a downloaded file; return an error
+        message or `None`.
+        """
+        if not os.path.isfile(item.local_filepath):
+            return "File was not downloaded"
+        size = os.path.getsize(item.local_filepath)
+        if expected_size is not None and size != expected_size:
+            return ("File size {0} differs from expected size {1}"
+                    .format(size, expected_size))
+        if item.checksum is not None:
+            algorithm, _, digest = item.checksum.rpartition(':')
+            checksum = hashlib.new(algorithm or 'md5')
+            with open(item.local_filepath, 'rb') as f:
+                for block in iter(lambda: f.read(2 ** 20), b''):
+                    checksum.update(block)
+            if checksum.hexdigest() != digest.lower():
+                os.remove(item.local_filepath)
+                return ("Checksum mismatch: expected {0}, got {1}"
+                        .format(digest, checksum.hexdigest()))
+        return None
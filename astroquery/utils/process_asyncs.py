@@ -2,15 +2,41 @@
 """
 Process all "async" methods into direct methods.
 """
+import asyncio
 import textwrap
 import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from .class_or_instance import class_or_instance
 from .docstr_chompers import remove_sections
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Shared, bounded thread pool running the blocking queries awaited through
+    the ``a``-prefixed coroutine methods.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from ..query import conf
+            _executor = ThreadPoolExecutor(conf.max_workers,
+                                           thread_name_prefix='astroquery')
+        return _executor
+
 
 def async_to_sync(cls):
     """
-    Convert all query_x_async methods to query_x methods
+    Convert all query_x_async methods to query_x methods, and add awaitable
+    aquery_x coroutine methods
+
+    The coroutines run query_x in a shared, bounded thread pool, so that many
+    queries can be awaited concurrently from an `asyncio` event loop without
+    blocking it, e.g. ``await Simbad.aquery_object('m1')``.
 
     (see
     http://stackoverflow.com/questions/18048341/add-methods-to-a-class-generated-from-other-methods
@@ -32,6 +58,18 @@ def async_to_sync(cls):
 
         return newmethod
 
+    def create_coroutine(sync_method_name):
+
+        @class_or_instance
+        async def newcoroutine(self, *args, **kwargs):
+            method = functools.partial(getattr(self, sync_method_name),
+                                       *args, **kwargs)
+            # the running loop; get_running_loop needs Python 3.7
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(_get_executor(), method)
+
+        return newcoroutine
+
     methods = list(cls.__dict__.keys())
 
     for k in list(methods):
@@ -50,9 +88,32 @@ def async_to_sync(cls):
 
             setattr(cls, newmethodname, newmethod)
 
+        coroutinename = 'a' + newmethodname
+        if 'async' in k and coroutinename not in methods:
+
+            newcoroutine = create_coroutine(newmethodname)
+
+            newcoroutine.fn.__doc__ = async_to_await_docstr(newmethodname)
+
+            newcoroutine.fn.__name__ = coroutinename
+            newcoroutine.__name__ = coroutinename
+
+            functools.update_wrapper(newcoroutine, newcoroutine.fn)
+
+            setattr(cls, coroutinename, newcoroutine)
+
     return cls
 
 
+def async_to_await_docstr(sync_method_name):
+    """
+    Docstring of the awaitable version of a query method
+    """
+    return ("\n    Awaitable version of ``{0}``, taking the same arguments.\n\n"
+            "    The query runs in a shared thread pool, so that it does not "
+            "block the\n    event loop.\n".format(sync_method_name))
+
+
 def async_to_sync_docstr(doc, returntype='table'):
     """
     Strip of the "Returns" component of a docstr and replace it with "Returns a
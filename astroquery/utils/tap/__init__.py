@@ -19,5 +19,6 @@ from astroquery.utils.tap.core import Tap
 from astroquery.utils.tap.core import TapPlus
 from astroquery.utils.tap.model.taptable import TapTableMeta
 from astroquery.utils.tap.model.tapcolumn import TapColumn
+from astroquery.utils.tap.scheduler import JobScheduler
 
-__all__ = ['Tap', 'TapPlus', 'TapTableMeta', 'TapColumn']
+__all__ = ['Tap', 'TapPlus', 'TapTableMeta', 'TapColumn', 'JobScheduler']
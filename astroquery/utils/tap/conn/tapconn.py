@@ -22,12 +22,14 @@ except ImportError:
     # python 2
     import httplib
 import mimetypes
+import threading
 import time
 
 from six.moves.urllib.parse import urlencode
 
 from astroquery.utils.tap.xmlparser import utils
 from astroquery.utils.tap import taputils
+from astroquery.query import conf
 
 import requests
 
@@ -171,7 +173,7 @@ class TapConn(object):
     def __get_server_context(self, subContext):
         return self.__serverContext + "/" + subContext
 
-    def execute_tapget(self, subcontext, verbose=False):
+    def execute_tapget(self, subcontext, verbose=False, headers=None):
         """Executes a TAP GET request
         The connection is done through HTTP or HTTPS depending on the login
         status (logged in -> HTTPS)
@@ -183,6 +185,8 @@ class TapConn(object):
             TAP list name
         verbose : bool, optional, default 'False'
             flag to display information about the process
+        headers : dict, optional, default None
+            additional request headers, e.g. of a conditional request
 
         Returns
         -------
@@ -190,10 +194,10 @@ class TapConn(object):
         """
         if subcontext.startswith("http"):
             # absolute url
-            return self.__execute_get(subcontext, verbose)
+            return self.__execute_get(subcontext, verbose, headers)
         else:
             context = self.__get_tap_context(subcontext)
-            return self.__execute_get(context, verbose)
+            return self.__execute_get(context, verbose, headers)
 
     def execute_dataget(self, query, verbose=False):
         """Executes a data GET request
@@ -235,12 +239,16 @@ class TapConn(object):
         context = self.__get_datalink_context(subcontext, query)
         return self.__execute_get(context, verbose)
 
-    def __execute_get(self, context, verbose=False):
+    def __execute_get(self, context, verbose=False, headers=None):
         conn = self.__get_connection(verbose)
         if verbose:
             print("host = " + str(conn.host) + ":" + str(conn.port))
             print("context = " + context)
-        conn.request("GET", context, None, self.__getHeaders)
+        if headers:
+            headers = dict(self.__getHeaders, **headers)
+        else:
+            headers = self.__getHeaders
+        conn.request("GET", context, None, headers)
         response = conn.getresponse()
         self.__currentReason = response.reason
         self.__currentStatus = response.status
@@ -399,8 +407,10 @@ class TapConn(object):
             print("host = " + str(conn.host) + ":" + str(conn.port))
             print("context = " + context)
             print("Content-type = " + str(content_type))
-        self.__postHeaders["Content-type"] = content_type
-        conn.request("POST", context, data, self.__postHeaders)
+        # per-request copy, as jobs may be submitted from several threads
+        headers = dict(self.__postHeaders)
+        headers["Content-type"] = content_type
+        conn.request("POST", context, data, headers)
         response = conn.getresponse()
         self.__currentReason = response.reason
         self.__currentStatus = response.status
@@ -425,8 +435,9 @@ class TapConn(object):
         """
         conn = self.__get_connection_secure(verbose)
         context = self.__get_server_context(subcontext)
-        self.__postHeaders["Content-type"] = CONTENT_TYPE_POST_DEFAULT
-        conn.request("POST", context, data, self.__postHeaders)
+        headers = dict(self.__postHeaders)
+        headers["Content-type"] = CONTENT_TYPE_POST_DEFAULT
+        conn.request("POST", context, data, headers)
         response = conn.getresponse()
         self.__currentReason = response.reason
         self.__currentStatus = response.status
@@ -488,7 +499,7 @@ class TapConn(object):
         """
         with open(output, "wb") as f:
             while True:
-                data = response.read(4096)
+                data = response.read(65536)
                 if len(data) < 1:
                     break
                 f.write(data)
@@ -693,6 +704,16 @@ class TapConn(object):
 
 
 class ConnectionHandler(object):
+    """Provides HTTP(S) connections to a TAP host
+
+    Connections are kept alive and reused: a connection is handed out again
+    once the response of its previous request has been fully read.  The
+    connections of each host are shared by all handlers; at most
+    ``astroquery.query.conf.max_connections_per_host`` of them are kept, and
+    those idle for more than ``astroquery.query.conf.keep_alive_timeout``
+    seconds are closed.
+    """
+
     def __init__(self, host, port, sslport):
         self.__connHost = host
         self.__connPort = port
@@ -706,7 +727,199 @@ class ConnectionHandler(object):
         else:
             if verbose:
                 print("------>http")
-            return httplib.HTTPConnection(self.__connHost, self.__connPort)
+            return _get_pool(_PooledHTTPConnection, self.__connHost,
+                             self.__connPort).get()
 
     def get_connection_secure(self, verbose):
-        return httplib.HTTPSConnection(self.__connHost, self.__connPortSsl)
+        return _get_pool(_PooledHTTPSConnection, self.__connHost,
+                         self.__connPortSsl).get()
+
+
+# Errors raised when a server has closed an idle keep-alive connection
+_STALE_CONNECTION_ERRORS = (httplib.RemoteDisconnected, ConnectionResetError,
+                            BrokenPipeError)
+
+
+class _PooledHTTPResponse(httplib.HTTPResponse):
+    """HTTP response that releases its connection when it is fully read
+
+    Closing the response before the end of its body discards the connection
+    too, as the unread data would otherwise be taken as the next response.
+    """
+
+    _pooled_connection = None
+
+    def close(self):
+        connection, self._pooled_connection = self._pooled_connection, None
+        if self.fp is not None and connection is not None:
+            # the connection leaves its pool before the response reports
+            # closed, so that no other thread can check it out meanwhile
+            connection._discard()
+        super(_PooledHTTPResponse, self).close()
+
+
+class _PooledConnectionMixin(object):
+    """Keep-alive connection managed by a `_ConnectionPool`
+
+    A request sent on a reused connection that the server has meanwhile
+    closed is sent again once on a new connection.
+    """
+
+    response_class = _PooledHTTPResponse
+
+    def __init__(self, *args, **kwargs):
+        super(_PooledConnectionMixin, self).__init__(*args, **kwargs)
+        self._checked_out = False
+        self._reused = False
+        self._response = None
+        self._pool = None
+        self._last_used = time.time()
+        self.__lastRequest = None
+
+    def _available(self):
+        return not self._checked_out and (self._response is None or
+                                          self._response.isclosed())
+
+    def _checkout(self):
+        self._checked_out = True
+        self._reused = self.sock is not None
+
+    def request(self, method, url, body=None, headers={}, **kwargs):
+        self.__lastRequest = (method, url, body, headers, kwargs)
+        try:
+            super(_PooledConnectionMixin, self).request(method, url, body,
+                                                        headers, **kwargs)
+        except _STALE_CONNECTION_ERRORS:
+            self.__resend()
+        except Exception:
+            self.close()
+            raise
+
+    def getresponse(self):
+        try:
+            try:
+                response = super(_PooledConnectionMixin, self).getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                self.__resend()
+                response = super(_PooledConnectionMixin, self).getresponse()
+        except Exception:
+            self.close()
+            raise
+        response._pooled_connection = self
+        self._response = response
+        self._checked_out = False
+        self._last_used = time.time()
+        return response
+
+    def close(self):
+        super(_PooledConnectionMixin, self).close()
+        self._checked_out = False
+
+    def _discard(self):
+        """Removes the connection from its pool and closes it"""
+        if self._pool is not None:
+            self._pool.discard(self)
+        self.close()
+
+    def __resend(self):
+        method, url, body, headers, kwargs = self.__lastRequest
+        self.close()
+        # only requests on a reused connection, with a body that can be sent
+        # again, are retried; any other error is genuine
+        if not self._reused or not (body is None or
+                                    isinstance(body, (str, bytes))):
+            raise
+        self._reused = False
+        self._checked_out = True
+        super(_PooledConnectionMixin, self).request(method, url, body,
+                                                    headers, **kwargs)
+
+
+class _PooledHTTPConnection(_PooledConnectionMixin, httplib.HTTPConnection):
+    pass
+
+
+class _PooledHTTPSConnection(_PooledConnectionMixin, httplib.HTTPSConnection):
+    pass
+
+
+class _ConnectionPool(object):
+    """Thread-safe pool of keep-alive connections to a single host
+
+    Parameters
+    ----------
+    connection_class : class
+        `_PooledHTTPConnection` or `_PooledHTTPSConnection`
+    host : str
+        host name
+    port : int
+        port
+    maxsize : int
+        number of connections kept in the pool; when all of them are busy,
+        extra connections are created but not kept
+    idle_timeout : float
+        seconds after which an idle connection is closed
+    """
+
+    def __init__(self, connection_class, host, port, maxsize, idle_timeout):
+        self.connection_class = connection_class
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.connections = []
+        self.__lock = threading.Lock()
+
+    def get(self):
+        """Checks out a connection, reusing an idle one if possible"""
+        now = time.time()
+        with self.__lock:
+            connection = None
+            for conn in list(self.connections):
+                expired = now - conn._last_used > self.idle_timeout
+                if not conn._available():
+                    if expired:
+                        # response left unread for too long: stop tracking
+                        # the connection, its owner may still be using it
+                        self.connections.remove(conn)
+                elif expired:
+                    conn.close()
+                    self.connections.remove(conn)
+                elif (connection is None or
+                        conn._last_used > connection._last_used):
+                    connection = conn
+            if connection is None:
+                connection = self.connection_class(self.host, self.port)
+                connection._pool = self
+                if len(self.connections) < self.maxsize:
+                    self.connections.append(connection)
+            connection._checkout()
+            return connection
+
+    def discard(self, connection):
+        """Stops tracking a connection"""
+        with self.__lock:
+            if connection in self.connections:
+                self.connections.remove(connection)
+
+    def close(self):
+        """Closes and forgets all idle connections"""
+        with self.__lock:
+            for conn in list(self.connections):
+                if conn._available():
+                    conn.close()
+                    self.connections.remove(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(connection_class, host, port):
+    key = (connection_class, host, port)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = _ConnectionPool(connection_class, host, port,
+                                          conf.max_connections_per_host,
+                                          conf.keep_alive_timeout)
+        return _pools[key]
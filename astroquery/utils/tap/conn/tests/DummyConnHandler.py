@@ -34,6 +34,8 @@ class DummyConnHandler(object):
         self.contentType = None
         self.verbose = None
         self.query = None
+        self.headers = None
+        self.host_url = "test:1111/tap/"
 
     def set_default_response(self, defaultResponse):
         self.defaultResponse = defaultResponse
@@ -50,6 +52,12 @@ class DummyConnHandler(object):
     def get_last_query(self):
         return self.query
 
+    def get_last_headers(self):
+        return self.headers
+
+    def get_host_url(self):
+        return self.host_url
+
     def get_error_file_output(self):
         return self.errorFileOutput
 
@@ -59,7 +67,8 @@ class DummyConnHandler(object):
     def set_response(self, request, response):
         self.responses[str(request)] = response
 
-    def execute_tapget(self, request=None, verbose=False):
+    def execute_tapget(self, request=None, verbose=False, headers=None):
+        self.headers = headers
         return self.__execute_get(request, verbose)
 
     def execute_dataget(self, query, verbose=False):
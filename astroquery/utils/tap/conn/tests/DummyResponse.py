@@ -54,23 +54,17 @@ class DummyResponse(object):
         if v is None:
             return None
         else:
+            if isinstance(v, str):
+                v = v.encode(encoding='utf_8', errors='strict')
             if size is None or size < 0:
                 # read all
-                return v.encode(encoding='utf_8', errors='strict')
+                return v
             else:
-                bodyLength = len(v)
-                if self.index < 0:
-                    return ""
-                if size >= bodyLength:
-                    size = bodyLength - 1
-                if size <= 0:
-                    return ""
-                endPos = self.index + size
-                tmp = v[self.index:endPos]
-                self.index = endPos
-                if endPos >= (bodyLength - 1):
-                    self.index = -1
-                return tmp.encode(encoding='utf_8', errors='strict')
+                tmp = v[self.index:self.index + size]
+                # once read to the end, the response is served again from
+                # the start, as the same object answers repeated requests
+                self.index = self.index + len(tmp) if tmp else 0
+                return tmp
 
     def close(self):
         self.index = 0
@@ -16,7 +16,12 @@ Created on 30 jun. 2016
 """
 import unittest
 import os
+import threading
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from astroquery.utils.tap.conn import tapconn
 from astroquery.utils.tap.conn.tapconn import TapConn
 from astroquery.utils.tap.conn.tests.DummyConn import DummyConn
 
@@ -155,3 +160,78 @@ class ConnTest(unittest.TestCase):
         assert r.get_body() == data, \
             "Request body. Expected %s, found %s" % (data,
                                                      str(r.get_body()))
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b'x' * 10000
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+        # simulate a server dropping idle connections without notice
+        self.close_connection = self.server.drop_connections
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    drop_connections = False
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def _serve():
+    server = _Server(('127.0.0.1', 0), _KeepAliveHandler)
+    server.client_ports = []
+    threading.Thread(target=server.serve_forever).start()
+    tap = TapConn(ishttps=False, host='127.0.0.1', server_context='tap',
+                  port=server.server_address[1])
+    return server, tap
+
+
+def test_keep_alive_reuse():
+    server, tap = _serve()
+    try:
+        for i in range(3):
+            assert len(tap.execute_tapget('sync').read()) == 10000
+        # a response still being read holds its connection
+        pending = tap.execute_tapget('sync')
+        assert len(tap.execute_tapget('sync').read()) == 10000
+        assert len(pending.read()) == 10000
+        # closing a partially read response discards its connection
+        pool = tapconn._get_pool(tapconn._PooledHTTPConnection, '127.0.0.1',
+                                 server.server_address[1])
+        partial = tap.execute_tapget('sync')
+        partial.read(10)
+        assert len(pool.connections) == 2
+        partial.close()
+        assert len(pool.connections) == 1
+        assert len(tap.execute_tapget('sync').read()) == 10000
+    finally:
+        server.shutdown()
+        server.server_close()
+    ports = server.client_ports
+    assert ports[:3] == [ports[0]] * 3
+    assert ports[3] == ports[0] and ports[4] != ports[0]
+    assert ports[5] in ports[:5]
+    # the other idle connection is reused
+    assert ports[6] != ports[5] and ports[6] in ports[:5]
+
+
+def test_keep_alive_stale_connection():
+    server, tap = _serve()
+    server.drop_connections = True
+    try:
+        for i in range(3):
+            assert len(tap.execute_tapget('sync').read()) == 10000
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(set(server.client_ports)) == 3
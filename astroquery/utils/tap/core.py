@@ -26,12 +26,14 @@ from astroquery.utils.tap.xmlparser.groupSaxParser import GroupSaxParser
 from astroquery.utils.tap.xmlparser.sharedItemsSaxParser import SharedItemsSaxParser  # noqa
 from astroquery.utils.tap.xmlparser import utils
 from astroquery.utils.tap.model.filter import Filter
+from astroquery.utils.tap.schemacache import SchemaCache, TableIndex
 import six
 import requests
 from astropy.logger import log
 import getpass
 import os
 from astropy.table.table import Table
+import shutil
 import tempfile
 
 
@@ -143,6 +145,7 @@ class Tap(object):
 
     def __internalInit(self):
         self.__connHandler = None
+        self.schema_cache = SchemaCache()
 
     def load_tables(self, verbose=False):
         """Loads all public tables
@@ -175,18 +178,26 @@ class Tap(object):
         if table is None:
             raise ValueError("Table name is required")
         print("Retrieving table '{}'".format(table))
-        response = self.__connHandler.execute_tapget("tables?tables=" + table,
-                                                     verbose=verbose)
-        if verbose:
-            print(response.status, response.reason)
-        self.__connHandler.check_launch_response_status(response,
-                                                        verbose,
-                                                        200)
-        print("Parsing table '{}'...".format(table))
-        tsp = TableSaxParser()
-        tsp.parseData(response)
+        tables = self.__get_tables("tables?tables=" + table, verbose=verbose)
         print("Done.")
-        return tsp.get_table()
+        if len(tables) < 1:
+            return None
+        return tables[0]
+
+    def load_table_index(self, verbose=False):
+        """Loads all public tables into an index
+
+        Parameters
+        ----------
+        verbose : bool, optional, default 'False'
+            flag to display information about the process
+
+        Returns
+        -------
+        A `~astroquery.utils.tap.schemacache.TableIndex`, to look up the
+        tables by name and their columns by name or UCD
+        """
+        return TableIndex(self.load_tables(verbose=verbose))
 
     def __load_tables(self, only_names=False, include_shared_tables=False,
                       verbose=False):
@@ -218,30 +229,57 @@ class Tap(object):
             addedItem = True
         log.info("Retrieving tables...")
         if flags != "":
-            response = self.__connHandler.execute_tapget("tables?"+flags,
-                                                         verbose=verbose)
+            tables = self.__get_tables("tables?"+flags, verbose=verbose)
+        else:
+            tables = self.__get_tables("tables", verbose=verbose)
+        log.info("Done.")
+        return tables
+
+    def __get_tables(self, subcontext, verbose=False):
+        """Requests and parses a tables resource, unless the copy in the
+        schema cache is still valid"""
+        url = None
+        headers = {}
+        if self.schema_cache is not None and \
+                hasattr(self.__connHandler, 'get_host_url'):
+            url = self.__connHandler.get_host_url() + subcontext
+            headers = self.schema_cache.validators(url)
+        if headers:
+            response = self.__connHandler.execute_tapget(subcontext,
+                                                         verbose=verbose,
+                                                         headers=headers)
         else:
-            response = self.__connHandler.execute_tapget("tables",
+            response = self.__connHandler.execute_tapget(subcontext,
                                                          verbose=verbose)
         if verbose:
             print(response.status, response.reason)
+        if headers and response.status == 304:
+            response.read()
+            log.info("Tables not modified, using the cached copy")
+            return list(self.schema_cache.get(url)['tables'])
         isError = self.__connHandler.check_launch_response_status(response,
                                                                   verbose,
                                                                   200)
         if isError:
             log.info("{} {}".format(response.status, response.reason))
             raise requests.exceptions.HTTPError(response.reason)
-            return None
         log.info("Parsing tables...")
         tsp = TableSaxParser()
         tsp.parseData(response)
-        log.info("Done.")
-        return tsp.get_tables()
+        tables = tsp.get_tables()
+        if url is not None:
+            responseHeaders = response.getheaders() or []
+            self.schema_cache.put(
+                url, list(tables),
+                etag=taputils.taputil_find_header(responseHeaders, 'ETag'),
+                last_modified=taputils.taputil_find_header(responseHeaders,
+                                                           'Last-Modified'))
+        return tables
 
     def launch_job(self, query, name=None, output_file=None,
                    output_format="votable", verbose=False,
                    dump_to_file=False, upload_resource=None,
-                   upload_table_name=None):
+                   upload_table_name=None, stream=False):
         """Launches a synchronous job
 
         Parameters
@@ -262,6 +300,10 @@ class Tap(object):
         upload_table_name : str, optional, default None
             resource temporary table name associated to the uploaded resource.
             This argument is required if upload_resource is provided.
+        stream : bool, optional, default 'False'
+            if True, the results are not read when the job is launched; they
+            are read in chunks by the iter_results method of the job, or in
+            full by get_results
 
         Returns
         -------
@@ -335,6 +377,8 @@ class Tap(object):
                 print("Retrieving sync. results...")
             if dump_to_file:
                 self.__connHandler.dump_to_file(suitableOutputFile, response)
+            elif stream:
+                job.set_response(response)
             else:
                 results = utils.read_http_response(response, output_format)
                 job.set_results(results)
@@ -841,9 +885,9 @@ class TapPlus(Tap):
                                                  200)
         print("Done.")
         if output_file is not None:
-            file = open(output_file, "wb")
-            file.write(response.read())
-            file.close()
+            # copied a block at a time, the data may be large
+            with open(output_file, "wb") as file:
+                shutil.copyfileobj(response, file, 2 ** 20)
             return None
         else:
             if 'format' in params_dict:
@@ -16,7 +16,10 @@ Created on 30 jun. 2016
 """
 
 import time
+from concurrent.futures import CancelledError
+from xml.etree import ElementTree
 
+from astroquery.exceptions import TimeoutError
 from astroquery.utils.tap.model import modelutils
 from astroquery.utils.tap.xmlparser import utils
 from astroquery.utils.tap import taputils
@@ -25,6 +28,15 @@ import sys
 
 __all__ = ['Job']
 
+# Phase polling: the delay between phase requests starts at POLL_INTERVAL
+# seconds and is multiplied by POLL_BACKOFF after each poll, up to
+# POLL_MAX_INTERVAL seconds.
+POLL_INTERVAL = 0.2
+POLL_BACKOFF = 1.5
+POLL_MAX_INTERVAL = 10.
+
+ACTIVE_PHASES = ('PENDING', 'QUEUED', 'EXECUTING')
+
 
 class Job(object):
     """Job class
@@ -55,6 +67,7 @@ class Job(object):
         self.responseMsg = None
         self.results = None
         self.__resultInMemory = False    # only used within class
+        self.__syncResponse = None    # unread results of a sync job
         self.failed = False
         self.runid = None
         self.ownerid = None
@@ -96,7 +109,7 @@ class Job(object):
         self.__change_phase(phase="RUN", verbose=verbose)
 
     def abort(self, verbose=False):
-        """Aborts the job (allowed in PENDING phase only)
+        """Aborts the job (allowed in PENDING, QUEUED and EXECUTING phases)
 
         Parameters
         ----------
@@ -106,7 +119,8 @@ class Job(object):
         self.__change_phase(phase="ABORT", verbose=verbose)
 
     def __change_phase(self, phase, verbose=False):
-        if self._phase == 'PENDING':
+        if self._phase == 'PENDING' or (phase == 'ABORT' and
+                                        self._phase in ACTIVE_PHASES):
             context = "async/"+str(self.jobid)+"/phase"
             args = {
                 "PHASE": str(phase)}
@@ -168,7 +182,7 @@ class Job(object):
             raise ValueError("Cannot start a job in phase: " +
                              str(self._phase))
 
-    def get_phase(self, update=False):
+    def get_phase(self, update=False, wait=None):
         """Returns the job phase. May optionally update the job's phase.
 
         Parameters
@@ -176,13 +190,23 @@ class Job(object):
         update : bool
             if True, the phase will by updated by querying the server before
             returning.
+        wait : int, optional
+            if provided with update, use a UWS 1.1 blocking request: the
+            server answers when the phase changes, or after at most 'wait'
+            seconds. Servers without blocking support answer at once.
 
         Returns
         -------
         The job phase
         """
         if update:
-            phase_request = "async/"+str(self.jobid)+"/phase"
+            if wait is not None:
+                phase_request = "async/" + str(self.jobid) + \
+                    "?WAIT=" + str(int(wait))
+                if self._phase in ACTIVE_PHASES:
+                    phase_request += "&PHASE=" + str(self._phase)
+            else:
+                phase_request = "async/"+str(self.jobid)+"/phase"
             response = self.connHandler.execute_tapget(phase_request)
 
             self.__last_phase_response_status = response.status
@@ -191,9 +215,20 @@ class Job(object):
                 print(response.status, errMsg)
                 raise requests.exceptions.HTTPError(errMsg)
 
-            self._phase = str(response.read().decode('utf-8'))
+            if wait is not None:
+                self._phase = self.__parse_phase(response.read())
+            else:
+                self._phase = str(response.read().decode('utf-8'))
         return self._phase
 
+    @staticmethod
+    def __parse_phase(job_xml):
+        # phase element of a UWS job document, whatever its namespace prefix
+        for element in ElementTree.fromstring(job_xml).iter():
+            if element.tag.rpartition('}')[2].lower() == 'phase':
+                return element.text.strip()
+        raise ValueError("No phase found in UWS job document")
+
     def set_response_status(self, status, msg):
         """Sets the HTTP(s) connection status
 
@@ -240,8 +275,14 @@ class Job(object):
             return results
         # Try to load from server: only async
         if not self.async_:
-            # sync: result is in a file
-            return None
+            # sync: result is in a file, or in a response not read yet
+            if self.__syncResponse is None:
+                return None
+            response = self.__syncResponse
+            self.__syncResponse = None
+            self.set_results(utils.read_http_response(response,
+                                                      outputFormat))
+            return self.results
         else:
             # async: result is in the server once the job is finished
             self.__load_async_job_results()
@@ -258,6 +299,17 @@ class Job(object):
         self.results = results
         self.__resultInMemory = True
 
+    def set_response(self, response):
+        """Sets the response of a synchronous job, whose results are read
+        later by `get_results`, `save_results` or `iter_results`
+
+        Parameters
+        ----------
+        response : HTTP response, mandatory
+            unread response
+        """
+        self.__syncResponse = response
+
     def save_results(self, verbose=False):
         """Saves job results
         If the job is asynchronous, this method will block until the results
@@ -273,8 +325,13 @@ class Job(object):
             self.results.to_xml(output)
         else:
             if not self.async_:
-                # sync: cannot access server again
-                print("No results to save")
+                if self.__syncResponse is None:
+                    # sync: cannot access server again
+                    print("No results to save")
+                else:
+                    response = self.__syncResponse
+                    self.__syncResponse = None
+                    self.connHandler.dump_to_file(output, response)
             else:
                 # Async
                 self.wait_for_job_end(verbose)
@@ -283,6 +340,8 @@ class Job(object):
                 if verbose:
                     print(response.status, response.reason)
                     print(response.getheaders())
+                response = self.__handle_redirect_if_required(response,
+                                                              verbose)
                 isError = self.connHandler.\
                     check_launch_response_status(response,
                                                  verbose,
@@ -292,13 +351,67 @@ class Job(object):
                     raise Exception(response.reason)
                 self.connHandler.dump_to_file(output, response)
 
-    def wait_for_job_end(self, verbose=False):
+    def iter_results(self, chunk_size=100000, verbose=False):
+        """Returns the job results as a sequence of tables
+        The results are written to the output file (see `save_results`)
+        without being held in memory, and the file is then read a chunk at a
+        time, so that memory use is bounded by the chunk size whatever the
+        size of the results. The results of a synchronous job are streamed
+        this way if it was launched with 'stream' set. This method will block
+        if the job is asynchronous and the job has not finished yet.
+
+        Parameters
+        ----------
+        chunk_size : int, optional, default 100000
+            maximum number of rows per table
+        verbose : bool, optional, default 'False'
+            flag to display information about the process
+
+        Returns
+        -------
+        An iterator of tables (astropy.table)
+        """
+        outputFormat = self.parameters['format']
+        if not modelutils.check_file_exists(self.outputFile):
+            if self.results is not None or (not self.async_ and
+                                            self.__syncResponse is None):
+                # results are in memory or unavailable
+                results = self.get_results()
+                if results is None:
+                    return
+                for i in range(0, max(len(results), 1), chunk_size):
+                    yield results[i:i + chunk_size]
+                return
+            self.save_results(verbose)
+        for chunk in utils.read_results_chunks(self.outputFile, outputFormat,
+                                               chunk_size):
+            yield chunk
+
+    def wait_for_job_end(self, verbose=False, timeout=None, wait=None,
+                         cancel_event=None):
         """Waits until a job is finished
 
+        The phase is polled with an exponential backoff, from POLL_INTERVAL
+        to POLL_MAX_INTERVAL seconds between requests.
+
         Parameters
         ----------
         verbose : bool, optional, default 'False'
             flag to display information about the process
+        timeout : float, optional, default None
+            maximum number of seconds to wait, after which
+            `~astroquery.exceptions.TimeoutError` is raised
+        wait : int, optional, default None
+            if provided, poll with UWS 1.1 blocking requests of up to 'wait'
+            seconds instead of sleeping between requests, where the server
+            supports them
+        cancel_event : `threading.Event`, optional, default None
+            when set, waiting stops with
+            `concurrent.futures.CancelledError`
+
+        Returns
+        -------
+        The last phase response status and the job phase
         """
         currentResponse = None
         responseData = None
@@ -312,23 +425,52 @@ class Job(object):
                 # ignore
                 if verbose:
                     print("Exception when trying to start job", ex)
+        start = time.time()
+        delay = POLL_INTERVAL
         while True:
-            responseData = self.get_phase(update=True)
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError("Job " + str(self.jobid) + " cancelled")
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    raise TimeoutError("Job " + str(self.jobid) +
+                                       " not finished after " +
+                                       str(timeout) + " s")
+            pollWait = wait
+            if wait is not None and remaining is not None:
+                pollWait = max(1, min(wait, int(remaining)))
+            pollStart = time.time()
+            responseData = self.get_phase(update=True, wait=pollWait)
             currentResponse = self.__last_phase_response_status
 
             lphase = responseData.upper().strip()
             if verbose:
                 print("Job " + self.jobid + " status: " + lphase)
-            if ("PENDING" != lphase and "QUEUED" != lphase and
-                    "EXECUTING" != lphase):
+            if lphase not in ACTIVE_PHASES:
                 break
             # PENDING, QUEUED, EXECUTING, COMPLETED, ERROR, ABORTED, UNKNOWN,
             # HELD, SUSPENDED, ARCHIVED:
-            time.sleep(0.5)
+            if pollWait is not None and \
+                    time.time() - pollStart >= 0.9 * pollWait:
+                # the server blocked: ask again at once
+                continue
+            sleep = delay
+            if remaining is not None:
+                sleep = min(sleep, max(remaining - (time.time() - pollStart),
+                                       0))
+            if cancel_event is not None:
+                cancel_event.wait(sleep)
+            else:
+                time.sleep(sleep)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_INTERVAL)
         return currentResponse, lphase
 
     def __load_async_job_results(self, debug=False):
-        wjResponse, phase = self.wait_for_job_end()
+        if self.is_finished():
+            phase = self._phase
+        else:
+            wjResponse, phase = self.wait_for_job_end()
         subContext = "async/" + str(self.jobid) + "/results/result"
         resultsResponse = self.connHandler.execute_tapget(subContext)
         # resultsResponse = self.__readAsyncResults(self.__jobid, debug)
@@ -16,14 +16,25 @@ Created on 30 jun. 2016
 """
 import unittest
 import os
+import threading
 import pytest
 
+from concurrent.futures import CancelledError
+
+from astroquery.exceptions import TimeoutError
 from astroquery.utils.tap.model.job import Job
 from astroquery.utils.tap.conn.tests.DummyConnHandler import DummyConnHandler
 from astroquery.utils.tap.conn.tests.DummyResponse import DummyResponse
 from astroquery.utils.tap.xmlparser import utils
 
 
+class FileConnHandler(DummyConnHandler):
+
+    def dump_to_file(self, output, response):
+        with open(output, 'wb') as f:
+            f.write(response.read())
+
+
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
     return os.path.join(data_dir, filename)
@@ -115,6 +126,120 @@ class TestJob(unittest.TestCase):
             # ok
             pass
 
+    def test_job_wait_timeout(self):
+        job = Job(async_job=True)
+        job.jobid = "12345"
+        job.set_phase("EXECUTING")
+        responsePhase = DummyResponse()
+        responsePhase.set_status_code(200)
+        responsePhase.set_message("OK")
+        responsePhase.set_data(method='GET', context=None,
+                               body='EXECUTING', headers=None)
+        connHandler = DummyConnHandler()
+        connHandler.set_response("async/12345/phase", responsePhase)
+        job.connHandler = connHandler
+
+        with pytest.raises(TimeoutError):
+            job.wait_for_job_end(timeout=0.3)
+
+        cancel = threading.Event()
+        cancel.set()
+        with pytest.raises(CancelledError):
+            job.wait_for_job_end(cancel_event=cancel)
+
+    def test_job_wait_uws_blocking(self):
+        job = Job(async_job=True)
+        job.jobid = "12345"
+        job.set_phase("EXECUTING")
+        responseJob = DummyResponse()
+        responseJob.set_status_code(200)
+        responseJob.set_message("OK")
+        responseJob.set_data(method='GET', context=None,
+                             body='<uws:job xmlns:uws="http://www.ivoa.net/'
+                             'xml/UWS/v1.0"><uws:jobId>12345</uws:jobId>'
+                             '<uws:phase>COMPLETED</uws:phase></uws:job>',
+                             headers=None)
+        connHandler = DummyConnHandler()
+        connHandler.set_response("async/12345?WAIT=5&PHASE=EXECUTING",
+                                 responseJob)
+        job.connHandler = connHandler
+
+        status, phase = job.wait_for_job_end(wait=5)
+        assert status == 200
+        assert phase == 'COMPLETED'
+        assert job.is_finished()
+
+    def test_job_abort_executing(self):
+        job = Job(async_job=True)
+        job.jobid = "12345"
+        job.set_phase("EXECUTING")
+        responseAbort = DummyResponse()
+        responseAbort.set_status_code(200)
+        responseAbort.set_message("OK")
+        connHandler = DummyConnHandler()
+        connHandler.set_response("async/12345/phase?PHASE=ABORT",
+                                 responseAbort)
+        job.connHandler = connHandler
+
+        job.abort()
+        assert job.get_phase() == 'ABORT'
+        with pytest.raises(ValueError):
+            job.abort()
+
+    def test_job_iter_results(self):
+        job = Job(async_job=True)
+        job.jobid = "12345"
+        job.parameters['format'] = 'votable'
+        job.set_phase("COMPLETED")
+        responseGetData = DummyResponse()
+        responseGetData.set_status_code(200)
+        responseGetData.set_message("OK")
+        responseGetData.set_data(method='GET', context=None,
+                                 body=utils.read_file_content(
+                                     data_path('result_1.vot')),
+                                 headers=None)
+        connHandler = FileConnHandler()
+        connHandler.set_response("async/12345/phase", responseGetData)
+        connHandler.set_response("async/12345/results/result",
+                                 responseGetData)
+        job.connHandler = connHandler
+        job.outputFile = data_path('result_1_iter.vot')
+
+        try:
+            chunks = list(job.iter_results(chunk_size=2))
+        finally:
+            os.remove(job.outputFile)
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert job.results is None
+
+    def test_job_iter_results_sync(self):
+        job = Job(async_job=False)
+        job.parameters['format'] = 'votable'
+        response = DummyResponse()
+        response.set_status_code(200)
+        response.set_message("OK")
+        response.set_data(method='POST', context=None,
+                          body=utils.read_file_content(
+                              data_path('result_1.vot')),
+                          headers=None)
+        job.connHandler = FileConnHandler()
+        job.outputFile = data_path('result_1_iter_sync.vot')
+        job.set_response(response)
+
+        try:
+            chunks = list(job.iter_results(chunk_size=2))
+            assert [len(chunk) for chunk in chunks] == [2, 1]
+            assert job.results is None
+            # the results are then read from the output file
+            assert len(job.get_results()) == 3
+        finally:
+            os.remove(job.outputFile)
+
+        job = Job(async_job=False)
+        job.parameters['format'] = 'votable'
+        job.set_response(response)
+        assert len(job.get_results()) == 3
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
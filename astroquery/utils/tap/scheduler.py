@@ -0,0 +1,211 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+=============
+TAP plus
+=============
+
+Concurrent execution of asynchronous TAP jobs.
+
+"""
+import threading
+from concurrent.futures import (ThreadPoolExecutor, CancelledError,
+                                as_completed)
+
+from astroquery.exceptions import TimeoutError
+from astroquery.query import conf
+
+__all__ = ['JobScheduler']
+
+
+class JobScheduler(object):
+    """Submits many asynchronous TAP jobs and waits on them together
+
+    Each job is launched, polled (with exponential backoff, or with UWS
+    blocking requests when 'wait' is given) and its results are fetched as
+    soon as it finishes, in a pool of worker threads.
+
+    Examples
+    --------
+    >>> from astroquery.gaia import Gaia  # doctest: +SKIP
+    >>> with JobScheduler(Gaia, timeout=600) as scheduler:  # doctest: +SKIP
+    ...     scheduler.submit_many(queries)
+    ...     for future in scheduler.as_completed():
+    ...         print(future.result().get_results())
+
+    Parameters
+    ----------
+    tap : `~astroquery.utils.tap.Tap`, mandatory
+        TAP service used to launch the jobs, e.g. ``Gaia``
+    max_workers : int, optional, default None
+        maximum number of jobs in progress at once, by default
+        ``astroquery.query.conf.max_workers``
+    timeout : float, optional, default None
+        maximum number of seconds a job may run once launched
+    abort_on_timeout : bool, optional, default True
+        if 'True', jobs exceeding the timeout are aborted on the server
+    wait : int, optional, default None
+        if provided, the phase of a job is polled with UWS 1.1 blocking
+        requests of up to 'wait' seconds
+    callback : callable, optional, default None
+        called with the `~concurrent.futures.Future` of each job when it is
+        done, from the worker thread
+    """
+
+    def __init__(self, tap, max_workers=None, timeout=None,
+                 abort_on_timeout=True, wait=None, callback=None):
+        self.tap = tap
+        self.timeout = timeout
+        self.abort_on_timeout = abort_on_timeout
+        self.wait = wait
+        self.callback = callback
+        self.futures = []
+        self.__cancelled = threading.Event()
+        self.__executor = ThreadPoolExecutor(max_workers or conf.max_workers)
+
+    def submit(self, query, **kwargs):
+        """Launches an asynchronous job
+
+        Parameters
+        ----------
+        query : str, mandatory
+            query to be executed
+        **kwargs
+            arguments of ``launch_job_async``, e.g. 'output_format',
+            'dump_to_file' or 'upload_resource'
+
+        Returns
+        -------
+        A `~concurrent.futures.Future` whose result is the finished Job, with
+        its results loaded (or saved, if 'dump_to_file' is set). A job ending
+        in ERROR phase raises its error, a job exceeding the timeout raises
+        `~astroquery.exceptions.TimeoutError`.
+        """
+        future = self.__executor.submit(self.__run, query, kwargs)
+        if self.callback is not None:
+            future.add_done_callback(self.callback)
+        self.futures.append(future)
+        return future
+
+    def submit_many(self, queries, **kwargs):
+        """Launches many asynchronous jobs
+
+        Parameters
+        ----------
+        queries : iterable, mandatory
+            queries to be executed; a dictionary item holds the arguments of
+            a single ``launch_job_async`` call
+        **kwargs
+            arguments of ``launch_job_async`` shared by all jobs
+
+        Returns
+        -------
+        A list of `~concurrent.futures.Future`, in input order
+        """
+        futures = []
+        for query in queries:
+            if isinstance(query, dict):
+                futures.append(self.submit(**dict(kwargs, **query)))
+            else:
+                futures.append(self.submit(query, **kwargs))
+        return futures
+
+    def as_completed(self, futures=None, timeout=None):
+        """Iterates over the jobs as they finish
+
+        Parameters
+        ----------
+        futures : list, optional, default None
+            futures returned by `submit`, by default all of them
+        timeout : float, optional, default None
+            maximum number of seconds to wait for all jobs
+
+        Returns
+        -------
+        An iterator of `~concurrent.futures.Future`, in completion order
+        """
+        if futures is None:
+            futures = list(self.futures)
+        return as_completed(futures, timeout=timeout)
+
+    def results(self, return_exceptions=True):
+        """Waits for all jobs and returns their results
+
+        Parameters
+        ----------
+        return_exceptions : bool, optional, default 'True'
+            if 'True', the error of a failed job is returned in place of its
+            results; otherwise the first error is raised
+
+        Returns
+        -------
+        A list with the results table of each job, in submission order
+        """
+        results = []
+        for future in self.futures:
+            try:
+                results.append(future.result().get_results())
+            except Exception as ex:
+                if not return_exceptions:
+                    raise
+                results.append(ex)
+        return results
+
+    def cancel(self):
+        """Cancels all jobs
+
+        Jobs not launched yet are dropped and running jobs are aborted on
+        the server; their futures raise
+        `~concurrent.futures.CancelledError`.
+        """
+        self.__cancelled.set()
+        for future in self.futures:
+            future.cancel()
+
+    def shutdown(self, wait=True):
+        """Releases the worker threads
+
+        Parameters
+        ----------
+        wait : bool, optional, default 'True'
+            if 'True', wait for the jobs in progress to finish
+        """
+        self.__executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.cancel()
+        self.shutdown()
+        return False
+
+    def __run(self, query, kwargs):
+        if self.__cancelled.is_set():
+            raise CancelledError("Job cancelled before launch")
+        kwargs = dict(kwargs, background=True)
+        job = self.tap.launch_job_async(query, **kwargs)
+        try:
+            job.wait_for_job_end(verbose=kwargs.get('verbose', False),
+                                 timeout=self.timeout, wait=self.wait,
+                                 cancel_event=self.__cancelled)
+        except CancelledError:
+            self.__abort(job)
+            raise
+        except TimeoutError:
+            if self.abort_on_timeout:
+                self.__abort(job)
+            raise
+        if kwargs.get('dump_to_file', False):
+            job.save_results(kwargs.get('verbose', False))
+        else:
+            job.get_results()
+        return job
+
+    @staticmethod
+    def __abort(job):
+        try:
+            job.abort()
+        except Exception:
+            # the job may have finished meanwhile
+            pass
@@ -0,0 +1,262 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+=============
+TAP plus
+=============
+
+On-disk cache of the table metadata of TAP services, and indexed lookup of
+tables and columns.
+
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from astropy.config import paths
+
+from astroquery.utils.tap.model.taptable import TapTableMeta
+from astroquery.utils.tap.model.tapcolumn import TapColumn
+
+__all__ = ['SchemaCache', 'TableIndex']
+
+# changed whenever the layout of the cache files changes
+CACHE_VERSION = 2
+
+COLUMN_FIELDS = ('name', 'description', 'unit', 'ucd', 'utype', 'data_type',
+                 'flag')
+
+
+class SchemaCache(object):
+    """Keeps the table metadata returned by TAP services on disk
+
+    An entry is stored per request URL along with the ``ETag`` and
+    ``Last-Modified`` headers of the response, and is only used again once
+    the service confirms, with a conditional request, that the metadata did
+    not change. Responses without any of these headers are not cached.
+    Entries are stored as JSON files; unreadable files are ignored.
+
+    Parameters
+    ----------
+    directory : str, optional, default None
+        cache directory, by default the ``tap_tables`` directory of the
+        astroquery cache
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(paths.get_cache_dir(), 'astroquery',
+                                     'tap_tables')
+        self.directory = directory
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def get(self, url):
+        """Returns the cached entry of a request URL
+
+        Parameters
+        ----------
+        url : str, mandatory
+            request URL
+
+        Returns
+        -------
+        A dictionary with the 'tables' list and the 'etag' and
+        'last_modified' validators, or None
+        """
+        with self.__lock:
+            entry = self.__entries.get(url)
+        if entry is not None:
+            return entry
+        try:
+            with open(self.__file_name(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception:
+            # missing, unreadable or written by another version
+            return None
+        if not isinstance(entry, dict) or \
+                entry.get('version') != CACHE_VERSION or \
+                entry.get('url') != url:
+            return None
+        entry['tables'] = [_table_from_record(record)
+                           for record in entry['tables']]
+        with self.__lock:
+            self.__entries[url] = entry
+        return entry
+
+    def put(self, url, tables, etag=None, last_modified=None):
+        """Stores the tables of a request URL
+
+        Parameters
+        ----------
+        url : str, mandatory
+            request URL
+        tables : list, mandatory
+            table objects
+        etag : str, optional, default None
+            ``ETag`` header of the response
+        last_modified : str, optional, default None
+            ``Last-Modified`` header of the response
+        """
+        if etag is None and last_modified is None:
+            return
+        entry = {'version': CACHE_VERSION, 'url': url, 'etag': etag,
+                 'last_modified': last_modified}
+        with self.__lock:
+            self.__entries[url] = dict(entry, tables=tables)
+        entry['tables'] = [_table_to_record(table) for table in tables]
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory, exist_ok=True)
+            # written to a temporary file first, so that other processes
+            # never read a partial entry
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory,
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_name, self.__file_name(url))
+        except (IOError, OSError):
+            # the entry is kept in memory only
+            pass
+
+    def validators(self, url):
+        """Returns the headers of a conditional request for a URL
+
+        Parameters
+        ----------
+        url : str, mandatory
+            request URL
+
+        Returns
+        -------
+        A dictionary of ``If-None-Match`` and ``If-Modified-Since`` headers,
+        empty if the URL is not cached
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if entry['etag'] is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified'] is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def clear(self):
+        """Removes all cached entries"""
+        with self.__lock:
+            self.__entries.clear()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def __file_name(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json')
+
+
+def _table_to_record(table):
+    return (table.schema, table.name, table.description,
+            [tuple(getattr(column, field, None) for field in COLUMN_FIELDS)
+             for column in table.columns])
+
+
+def _table_from_record(record):
+    schema, name, description, columns = record
+    table = TapTableMeta()
+    table.schema = schema
+    table.name = name
+    table.description = description
+    for values in columns:
+        column = TapColumn(None)
+        for field, value in zip(COLUMN_FIELDS, values):
+            setattr(column, field, value)
+        table.add_column(column)
+    return table
+
+
+class TableIndex(object):
+    """Lookup of tables and columns by name and UCD
+
+    Names are matched regardless of case. Tables are found by their name,
+    with or without the schema, and by their qualified name.
+
+    Parameters
+    ----------
+    tables : list, mandatory
+        table objects, e.g. returned by ``load_tables``
+    """
+
+    def __init__(self, tables):
+        self.tables = list(tables)
+        self.__tables = {}
+        self.__columns = {}
+        self.__ucds = {}
+        for table in self.tables:
+            names = [table.name]
+            if table.schema is not None and table.name is not None:
+                names.append(table.schema + "." + table.name)
+            if table.name is not None and "." in table.name:
+                names.append(table.name.split(".", 1)[1])
+            for name in names:
+                if name is not None:
+                    self.__tables.setdefault(name.lower(), table)
+            for column in table.columns:
+                if column.name is not None:
+                    self.__columns.setdefault(column.name.lower(), []) \
+                        .append((table, column))
+                for ucd in (column.ucd or '').split(';'):
+                    ucd = ucd.strip().lower()
+                    if ucd:
+                        self.__ucds.setdefault(ucd, []).append((table,
+                                                                column))
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __contains__(self, name):
+        return name.lower() in self.__tables
+
+    def get_table(self, name):
+        """Returns a table by name
+
+        Parameters
+        ----------
+        name : str, mandatory
+            table name, with or without schema
+
+        Returns
+        -------
+        A table object, or None if not found
+        """
+        return self.__tables.get(name.lower())
+
+    def find_columns(self, name):
+        """Returns the columns with a name
+
+        Parameters
+        ----------
+        name : str, mandatory
+            column name
+
+        Returns
+        -------
+        A list of (table, column) pairs
+        """
+        return list(self.__columns.get(name.lower(), []))
+
+    def find_ucd(self, ucd):
+        """Returns the columns with a UCD
+
+        Parameters
+        ----------
+        ucd : str, mandatory
+            a single UCD word, e.g. 'pos.eq.ra'; a column matches if any
+            word of its UCD is the same
+
+        Returns
+        -------
+        A list of (table, column) pairs
+        """
+        return list(self.__ucds.get(ucd.lower(), []))
@@ -0,0 +1,119 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import os
+import threading
+import time
+
+import pytest
+
+from concurrent.futures import CancelledError
+
+from astroquery.exceptions import TimeoutError
+from astroquery.utils.tap.model.job import Job
+from astroquery.utils.tap.scheduler import JobScheduler
+from astroquery.utils.tap.conn.tests.DummyConnHandler import DummyConnHandler
+from astroquery.utils.tap.conn.tests.DummyResponse import DummyResponse
+from astroquery.utils.tap.xmlparser import utils
+
+
+def data_path(filename):
+    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    return os.path.join(data_dir, filename)
+
+
+def make_response(body=None, status=200):
+    response = DummyResponse()
+    response.set_status_code(status)
+    response.set_message("OK")
+    response.set_data(method='GET', context=None, body=body, headers=None)
+    return response
+
+
+class FakeTap(object):
+    """Launches jobs completing after 'delay' seconds, or never if the
+    query is 'forever'"""
+
+    def __init__(self):
+        self.launched = []
+        self.aborted = []
+        self.lock = threading.Lock()
+
+    def launch_job_async(self, query, background=False, **kwargs):
+        assert background
+        with self.lock:
+            self.launched.append(query)
+        jobid = query.split()[0]
+        connHandler = FakeConnHandler(self, jobid)
+        connHandler.set_response("async/" + jobid + "/results/result",
+                                 make_response(utils.read_file_content(
+                                     data_path('job_1.vot'))))
+        connHandler.set_response("async/" + jobid + "/phase?PHASE=ABORT",
+                                 make_response())
+        job = Job(async_job=True, query=query, connhandler=connHandler)
+        job.jobid = jobid
+        job.set_phase('EXECUTING')
+        return job
+
+
+class FakeConnHandler(DummyConnHandler):
+
+    def __init__(self, tap, jobid):
+        super(FakeConnHandler, self).__init__()
+        self.tap = tap
+        self.jobid = jobid
+        self.start = time.time()
+
+    def execute_tapget(self, request=None, verbose=False):
+        if request.endswith('/phase'):
+            delay = float(self.jobid[1:]) if self.jobid[0] == 'j' else 1e9
+            done = time.time() - self.start >= delay
+            return make_response('COMPLETED' if done else 'EXECUTING')
+        return super(FakeConnHandler, self).execute_tapget(request, verbose)
+
+    def execute_tappost(self, subcontext=None, data=None,
+                        content_type=None, verbose=False):
+        with self.tap.lock:
+            self.tap.aborted.append(self.jobid)
+        return super(FakeConnHandler, self).execute_tappost(
+            subcontext, data, content_type, verbose)
+
+
+def test_results_as_completed():
+    tap = FakeTap()
+    done = []
+    with JobScheduler(tap, max_workers=4, callback=done.append) as scheduler:
+        futures = scheduler.submit_many(['j0.6 q', 'j0 q', 'j0.3 q'])
+        jobids = [future.result().jobid
+                  for future in scheduler.as_completed()]
+        results = scheduler.results()
+    assert jobids == ['j0', 'j0.3', 'j0.6']
+    assert len(done) == 3
+    assert [len(table) for table in results] == [3, 3, 3]
+    assert futures[0].result().get_phase() == 'COMPLETED'
+
+
+def test_timeout_aborts_job():
+    tap = FakeTap()
+    with JobScheduler(tap, timeout=0.5) as scheduler:
+        scheduler.submit_many(['forever q', 'j0 q'])
+        results = scheduler.results()
+    assert isinstance(results[0], TimeoutError)
+    assert len(results[1]) == 3
+    assert tap.aborted == ['forever']
+
+    with pytest.raises(TimeoutError):
+        scheduler.results(return_exceptions=False)
+
+
+def test_cancel():
+    tap = FakeTap()
+    scheduler = JobScheduler(tap, max_workers=1)
+    futures = scheduler.submit_many(['forever q', 'j0 q'])
+    while not tap.launched:
+        time.sleep(0.01)
+    scheduler.cancel()
+    scheduler.shutdown()
+    with pytest.raises(CancelledError):
+        futures[0].result()
+    assert futures[1].cancelled()
+    assert tap.launched == ['forever q']
+    assert tap.aborted == ['forever']
@@ -0,0 +1,97 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import json
+import os
+
+from astroquery.utils.tap.core import TapPlus
+from astroquery.utils.tap.schemacache import SchemaCache, TableIndex
+from astroquery.utils.tap.conn.tests.DummyConnHandler import DummyConnHandler
+from astroquery.utils.tap.conn.tests.DummyResponse import DummyResponse
+from astroquery.utils.tap.xmlparser import utils
+
+
+def data_path(filename):
+    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    return os.path.join(data_dir, filename)
+
+
+def make_tap(tmpdir, status=200, headers=None):
+    connHandler = DummyConnHandler()
+    tap = TapPlus("http://test:1111/tap", connhandler=connHandler)
+    tap.schema_cache = SchemaCache(tmpdir.strpath)
+    response = DummyResponse()
+    response.set_status_code(status)
+    response.set_message("OK")
+    response.set_data(method='GET', context=None,
+                      body=utils.read_file_content(
+                          data_path('test_tables.xml')),
+                      headers=headers)
+    connHandler.set_response("tables", response)
+    return tap, connHandler
+
+
+def test_load_tables_revalidated(tmpdir):
+    headers = [('ETag', '"v1"'), ('Last-Modified', 'Mon, 1 Jun 2020')]
+    tap, connHandler = make_tap(tmpdir, headers=headers)
+    tables = tap.load_tables()
+    assert connHandler.get_last_headers() is None
+    assert len(os.listdir(tmpdir.strpath)) == 1
+    file_name = tmpdir.join(os.listdir(tmpdir.strpath)[0]).strpath
+    with open(file_name) as f:
+        assert json.load(f)['etag'] == '"v1"'
+
+    # another process: the cache file is revalidated
+    tap, connHandler = make_tap(tmpdir, status=304)
+    cached = tap.load_tables()
+    assert connHandler.get_last_headers() == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 1 Jun 2020'}
+    assert [table.get_qualified_name() for table in cached] == \
+        [table.get_qualified_name() for table in tables]
+    column = cached[1].columns[0]
+    assert column.name == 'table2_col1'
+    assert column.data_type == 'VARCHAR'
+    assert column.flag == 'indexed'
+
+    # a modified tableset is parsed again
+    tap, connHandler = make_tap(tmpdir, headers=[('ETag', '"v2"')])
+    assert len(tap.load_tables()) == 2
+    assert SchemaCache(tmpdir.strpath).validators(
+        "test:1111/tap/tables") == {'If-None-Match': '"v2"'}
+
+
+def test_load_tables_without_validators(tmpdir):
+    tap, connHandler = make_tap(tmpdir)
+    tap.load_tables()
+    tap.load_tables()
+    assert connHandler.get_last_headers() is None
+    assert os.listdir(tmpdir.strpath) == []
+
+
+def test_table_index(tmpdir):
+    tap, connHandler = make_tap(tmpdir)
+    index = tap.load_table_index()
+    assert len(index) == 2
+    assert 'PUBLIC.table1' in index
+    assert index.get_table('table2').name == 'table2'
+    assert index.get_table('missing') is None
+    assert [(table.name, column.name) for table, column
+            in index.find_columns('TABLE2_COL3')] == [('table2',
+                                                        'table2_col3')]
+    tables = index.tables
+    tables[0].columns[0].ucd = 'pos.eq.ra;meta.main'
+    tables[1].columns[1].ucd = 'pos.eq.ra'
+    index = TableIndex(tables)
+    assert [column.name for table, column
+            in index.find_ucd('pos.eq.ra')] == ['table1_col1', 'table2_col2']
+    assert len(index.find_ucd('meta.main')) == 1
+
+
+def test_unreadable_entry(tmpdir):
+    headers = [('ETag', '"v1"')]
+    tap, connHandler = make_tap(tmpdir, headers=headers)
+    tap.load_tables()
+    file_name = tmpdir.join(os.listdir(tmpdir.strpath)[0]).strpath
+    with open(file_name, 'wb') as f:
+        f.write(b'\x80\x04not json')
+    cache = SchemaCache(tmpdir.strpath)
+    assert cache.get("test:1111/tap/tables") is None
+    assert cache.validators("test:1111/tap/tables") == {}
@@ -16,15 +16,28 @@ Created on 30 jun. 2016
 """
 
 import xml.sax
+from xml.parsers import expat
 
 from astroquery.utils.tap.model.taptable import TapTableMeta
 from astroquery.utils.tap.model.tapcolumn import TapColumn
-from astroquery.utils.tap.xmlparser import utils as Utils
 
 READING_SCHEMA = 10
 READING_TABLE = 20
 READING_TABLE_COLUMN = 30
 
+BLOCK_SIZE = 2 ** 16
+
+# elements whose text is read, by parser status
+TEXT_ELEMENTS = {READING_SCHEMA: ('name',),
+                 READING_TABLE: ('name', 'description'),
+                 READING_TABLE_COLUMN: ('name', 'description', 'unit', 'ucd',
+                                        'utype', 'datatype', 'flag')}
+
+# attribute of TapColumn set from the text of each element
+COLUMN_ATTRIBUTES = {'name': 'name', 'description': 'description',
+                     'unit': 'unit', 'ucd': 'ucd', 'utype': 'utype',
+                     'datatype': 'data_type', 'flag': 'flag'}
+
 
 class TableSaxParser(xml.sax.ContentHandler):
     '''
@@ -47,127 +60,94 @@ class TableSaxParser(xml.sax.ContentHandler):
         self.__currentColumn = None
 
     def __create_string_from_buffer(self):
-        return Utils.util_create_string_from_buffer(self.__charBuffer)
+        return ''.join(self.__charBuffer)
 
-    def __check_item_id(self, itemId, tmpValue):
-        if str(itemId).lower() == str(tmpValue).lower():
-            return True
-        return False
+    def parseData(self, data):
+        """Parses a VODataService tableset
 
-    def __start_reading_data(self):
-        self.__concatData = True
-        del self.__charBuffer[:]
+        The document is read with expat directly, rather than through
+        `xml.sax`, with the text of an element passed in one piece.
 
-    def __stop_reading_data(self):
-        self.__concatData = False
+        Parameters
+        ----------
+        data : file or str, mandatory
+            file object (e.g. an HTTP response) or file name
 
-    def parseData(self, data):
+        Returns
+        -------
+        A list of table objects
+        """
         del self.__tables[:]
         self.__status = READING_SCHEMA
-        xml.sax.parse(data, self)
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = BLOCK_SIZE
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        parser.CharacterDataHandler = self.characters
+        if isinstance(data, str):
+            with open(data, 'rb') as f:
+                self.__feed(parser, f)
+        else:
+            self.__feed(parser, data)
         return self.__tables
 
+    def __feed(self, parser, f):
+        # files opened in text mode give str blocks, also accepted by expat
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            parser.Parse(block, False)
+        parser.Parse(b'', True)
+
     def startElement(self, name, attrs):
-        if self.__status == READING_SCHEMA:
-            self.__reading_schema(name, attrs)
-        elif self.__status == READING_TABLE:
-            self.__reading_table(name, attrs)
-        elif self.__status == READING_TABLE_COLUMN:
-            self.__reading_table_column(name, attrs)
+        name = name.lower()
+        status = self.__status
+        if name in TEXT_ELEMENTS[status]:
+            self.__concatData = True
+            del self.__charBuffer[:]
+        elif status == READING_SCHEMA:
+            if name == 'table':
+                self.__status = READING_TABLE
+                self.__currentTable = TapTableMeta()
+                self.__currentTable.schema = self.__currentSchemaName
+        elif status == READING_TABLE:
+            if name == 'column':
+                self.__status = READING_TABLE_COLUMN
+                self.__currentColumn = TapColumn(attrs.get('esatapplus:flags'))
 
     def endElement(self, name):
-        if self.__status == READING_SCHEMA:
-            self.__end_schema(name)
-        elif self.__status == READING_TABLE:
-            self.__end_table(name)
-        elif self.__status == READING_TABLE_COLUMN:
-            self.__end_table_column(name)
+        name = name.lower()
+        status = self.__status
+        if status == READING_TABLE_COLUMN:
+            if name in COLUMN_ATTRIBUTES:
+                setattr(self.__currentColumn, COLUMN_ATTRIBUTES[name],
+                        self.__create_string_from_buffer())
+                self.__concatData = False
+            elif name == 'column':
+                self.__status = READING_TABLE
+                self.__currentTable.add_column(self.__currentColumn)
+        elif status == READING_TABLE:
+            if name == 'name':
+                self.__concatData = False
+                self.__currentTable.name = self.__create_string_from_buffer()
+            elif name == 'description':
+                self.__concatData = False
+                self.__currentTable.description = \
+                    self.__create_string_from_buffer()
+            elif name == 'table':
+                self.__tables.append(self.__currentTable)
+                self.__status = READING_SCHEMA
+        elif status == READING_SCHEMA:
+            if name == 'name':
+                self.__currentSchemaName = self.__create_string_from_buffer()
+                self.__concatData = False
 
     def characters(self, content):
         if self.__concatData:
             self.__charBuffer.append(content)
 
-    def __reading_schema(self, name, attrs):
-        if self.__check_item_id("name", name):
-            self.__start_reading_data()
-        if self.__check_item_id("table", name):
-            self.__status = READING_TABLE
-            self.__currentTable = TapTableMeta()
-            self.__currentTable.schema = self.__currentSchemaName
-
-    def __end_schema(self, name):
-        if self.__check_item_id("name", name):
-            self.__currentSchemaName = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-
-    def __reading_table(self, name, attrs):
-        if self.__check_item_id("name", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("description", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("column", name):
-            self.__status = READING_TABLE_COLUMN
-            self.__currentColumn = TapColumn(attrs.getValue('esatapplus:flags'))
-
-    def __end_table(self, name):
-        if self.__check_item_id("name", name):
-            self.__stop_reading_data()
-            self.__currentTable.name = self.__create_string_from_buffer()
-        elif self.__check_item_id("description", name):
-            self.__stop_reading_data()
-            self.__currentTable.description = self.__create_string_from_buffer()
-        elif self.__check_item_id("table", name):
-            self.__tables.append(self.__currentTable)
-            self.__status = READING_SCHEMA
-
-    def __reading_table_column(self, name, attrs):
-        if self.__check_item_id("name", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("description", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("unit", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("ucd", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("utype", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("datatype", name):
-            self.__start_reading_data()
-        elif self.__check_item_id("flag", name):
-            self.__start_reading_data()
-
-    def __end_table_column(self, name):
-        if self.__check_item_id("name", name):
-            self.__currentColumn.name = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("description", name):
-            self.__currentColumn.description = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("unit", name):
-            self.__currentColumn.unit = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("ucd", name):
-            self.__currentColumn.ucd = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("utype", name):
-            self.__currentColumn.utype = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("datatype", name):
-            self.__currentColumn.data_type = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        elif self.__check_item_id("flag", name):
-            self.__currentColumn.flag = self.__create_string_from_buffer()
-            self.__stop_reading_data()
-        if self.__check_item_id("column", name):
-            self.__status = READING_TABLE
-            self.__currentTable.add_column(self.__currentColumn)
-
-    def __show_attributes(self, attrs):
-        return str(attrs.getNames())
-
-    def __nothing(self, name, attrs):
-        pass
-
     def get_table(self):
         if len(self.__tables) < 1:
             return None
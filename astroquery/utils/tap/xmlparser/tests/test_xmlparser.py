@@ -17,6 +17,13 @@ Created on 30 jun. 2016
 
 import unittest
 import os
+
+import numpy as np
+import pytest
+from astropy import units as u
+from astropy.io.votable import from_table, writeto
+from astropy.table import MaskedColumn, Table, vstack
+
 from astroquery.utils.tap.xmlparser.tableSaxParser import TableSaxParser
 from astroquery.utils.tap.xmlparser.jobListSaxParser import JobListSaxParser
 from astroquery.utils.tap.xmlparser.jobSaxParser import JobSaxParser
@@ -99,3 +106,125 @@ class XmlParserTest(unittest.TestCase):
         o = job.ownerid
         assert str(o) == str(jobOwner), \
             "Expected job owner: %s, found %s" % (jobOwner, o)
+
+
+@pytest.fixture
+def big_table():
+    n = 1003
+    table = Table()
+    table['id'] = np.arange(n)
+    table['ra'] = np.linspace(0, 360, n)
+    table['ra'].unit = 'deg'
+    table['name'] = ['src' + 'x' * (i % 5) for i in range(n)]
+    table['flag'] = MaskedColumn(np.arange(n) % 4, mask=np.arange(n) % 3 == 0)
+    table['pos'] = np.random.rand(n, 2)
+    return table
+
+
+@pytest.mark.parametrize('serialization', ['tabledata', 'binary', 'binary2'])
+def test_read_results_chunks_votable(big_table, serialization, tmpdir,
+                                     monkeypatch):
+    # small blocks so that rows are split between reads
+    monkeypatch.setattr(utils.votablechunks, 'BLOCK_SIZE', 1000)
+    votable = from_table(big_table)
+    resource = votable.get_first_table()
+    resource._config['version_1_3_or_later'] = True
+    resource.format = serialization
+    resource.fields[2].arraysize = '*'
+    resource.fields[3].values.null = -1
+    fileName = tmpdir.join('results.vot').strpath
+    writeto(votable, fileName)
+
+    chunks = list(utils.read_results_chunks(fileName, 'votable', 300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 103]
+    expected = Table.read(fileName, format='votable')
+    result = vstack(chunks)
+    for name in expected.colnames:
+        assert np.all(result[name] == expected[name])
+        assert result[name].unit == expected[name].unit
+    assert np.all(result['flag'].mask == expected['flag'].mask)
+
+
+@pytest.mark.parametrize('serialization', ['tabledata', 'binary'])
+def test_read_results_chunks_multiple_tables(big_table, serialization,
+                                             tmpdir, monkeypatch):
+    # only the rows of the first table are read
+    monkeypatch.setattr(utils.votablechunks, 'BLOCK_SIZE', 1000)
+    votable = from_table(big_table['id', 'name'])
+    votable.resources[0].tables.append(
+        from_table(big_table['ra', 'name'][:10]).get_first_table())
+    for table in votable.iter_tables():
+        table.format = serialization
+    fileName = tmpdir.join('results.vot').strpath
+    writeto(votable, fileName)
+
+    chunks = list(utils.read_results_chunks(fileName, 'votable', 300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 103]
+    result = vstack(chunks)
+    assert result.colnames == ['id', 'name']
+    assert list(result['name']) == list(big_table['name'])
+
+
+def test_read_results_chunks_empty(big_table, tmpdir):
+    fileName = tmpdir.join('empty.vot').strpath
+    big_table[:0].write(fileName, format='votable')
+    chunks = list(utils.read_results_chunks(fileName, 'votable', 300))
+    assert len(chunks) == 1
+    assert len(chunks[0]) == 0
+    assert chunks[0].colnames == big_table.colnames
+
+
+def test_read_results_chunks_csv(big_table, tmpdir):
+    fileName = tmpdir.join('results.csv').strpath
+    big_table['id', 'ra', 'name'].write(fileName, format='ascii.csv')
+    chunks = list(utils.read_results_chunks(fileName, 'csv', 500))
+    assert [len(chunk) for chunk in chunks] == [500, 500, 3]
+    assert list(vstack(chunks)['name']) == list(big_table['name'])
+
+
+def test_read_results_chunks_csv_types(tmpdir):
+    # the types guessed for the second chunk alone would be int and float
+    fileName = tmpdir.join('results.csv').strpath
+    with open(fileName, 'w') as f:
+        f.write('flux,code\n1.5,a1\n2.5,b2\n3,12\n4,\n')
+    chunks = list(utils.read_results_chunks(fileName, 'csv', 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    for chunk in chunks:
+        assert chunk['flux'].dtype == np.float64
+        assert chunk['code'].dtype.kind == 'U'
+    assert list(chunks[1]['code'].filled('')) == ['12', '']
+    assert list(vstack(chunks)['flux']) == [1.5, 2.5, 3.0, 4.0]
+
+
+@pytest.mark.parametrize('output_format', ['votable', 'fits', 'csv'])
+@pytest.mark.parametrize('spool_size', [10 ** 9, 1000])
+def test_read_http_response_spool(big_table, output_format, spool_size,
+                                  tmpdir, monkeypatch):
+    # small spool files are read from memory, larger ones from disk
+    monkeypatch.setattr(utils, 'BLOCK_SIZE', 700)
+    monkeypatch.setattr(utils, 'SPOOL_SIZE', spool_size)
+    monkeypatch.setattr(utils.tempfile, 'tempdir', str(tmpdir))
+    big_table = big_table['id', 'ra', 'name']
+    fileName = tmpdir.join('results').strpath
+    big_table.write(fileName, format=utils.get_suitable_astropy_format(
+        output_format))
+    with open(fileName, 'rb') as response:
+        result = utils.read_http_response(response, output_format)
+    assert list(result['name']) == list(big_table['name'])
+    assert np.all(result['ra'] == big_table['ra'])
+    assert not [name for name in os.listdir(str(tmpdir))
+                if name != 'results']
+
+
+def test_correct_table_units_cache(monkeypatch):
+    monkeypatch.setattr(utils, '_unit_translations', {})
+    table = Table([[1.0], [2.0], [3.0]], names=['flux', 'flux_error', 'x'])
+    for name in table.colnames[:2]:
+        table[name].unit = u.Unit("'electron'.s**-1", parse_strict='silent')
+    table['x'].unit = u.Unit("'nonsense'", parse_strict='silent')
+    utils.correct_table_units(table)
+    assert table['flux'].unit == u.electron / u.s
+    assert table['flux_error'].unit == u.electron / u.s
+    assert isinstance(table['x'].unit, u.UnrecognizedUnit)
+    assert utils._unit_translations == {"'electron'.s**-1": u.electron / u.s,
+                                        "'nonsense'": None}
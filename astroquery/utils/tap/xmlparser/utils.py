@@ -16,10 +16,21 @@ Created on 30 jun. 2016
 """
 
 import io
+import os
+import tempfile
+
 from astropy import units as u
+from astropy.io.ascii import convert_numpy
 from astropy.table import Table as APTable
 import six
 
+from astroquery.utils.tap.xmlparser import votablechunks
+
+BLOCK_SIZE = 2 ** 20
+
+# response bodies up to this size are kept in memory
+SPOOL_SIZE = 2 ** 24
+
 
 def util_create_string_from_buffer(buffer):
     if six.PY2:
@@ -37,24 +48,174 @@ def read_http_response(response, outputFormat, correct_units=True):
         result = APTable.read(response, format=astropyFormat)
     else:
         # 3.0
-        # If we want to use astropy.table, we have to read the data
-        data = io.BytesIO(response.read())
-        result = APTable.read(data, format=astropyFormat)
+        # astropy needs a seekable file: the body is copied a block at a
+        # time to a spool file, kept in memory only while it is small
+        with _Spool(response) as data:
+            if astropyFormat == 'fits' and data.on_disk:
+                result = APTable.read(data.file, format=astropyFormat,
+                                      memmap=True)
+            else:
+                result = APTable.read(data.file, format=astropyFormat)
 
     if correct_units:
-        for cn in result.colnames:
-            col = result[cn]
-            if isinstance(col.unit, u.UnrecognizedUnit):
-                try:
-                    col.unit = u.Unit(col.unit.name.replace(".", " ").replace("'", ""))
-                except Exception as ex:
-                    pass
-            elif isinstance(col.unit, str):
-                col.unit = col.unit.replace(".", " ").replace("'", "")
+        correct_table_units(result)
 
     return result
 
 
+class _Spool(object):
+    """Seekable copy of a response body, moved to a temporary file once it
+    exceeds SPOOL_SIZE bytes"""
+
+    def __init__(self, response):
+        self.file = io.BytesIO()
+        self.name = None
+        while True:
+            block = response.read(BLOCK_SIZE)
+            if not block:
+                break
+            if self.name is None and \
+                    self.file.tell() + len(block) > SPOOL_SIZE:
+                spilled = tempfile.NamedTemporaryFile(suffix='.tmp',
+                                                      delete=False)
+                spilled.write(self.file.getbuffer())
+                self.file = spilled
+                self.name = spilled.name
+            self.file.write(block)
+        if self.name is not None:
+            # reopened read only, as FITS files are memory mapped
+            self.file.close()
+            self.file = open(self.name, 'rb')
+        self.file.seek(0)
+
+    @property
+    def on_disk(self):
+        return self.name is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if self.name is not None:
+            try:
+                os.remove(self.name)
+            except OSError:
+                # still mapped (Windows), left to the system
+                pass
+        return False
+
+
+# unit strings of the results of a service repeat across queries and columns
+_unit_translations = {}
+
+
+def _translate_unit(unit):
+    """Returns the unit recognized for an unrecognized unit string, or None"""
+    try:
+        return _unit_translations[unit]
+    except KeyError:
+        pass
+    try:
+        translated = u.Unit(_clean_unit(unit))
+    except Exception:
+        translated = None
+    _unit_translations[unit] = translated
+    return translated
+
+
+def _clean_unit(unit):
+    return unit.replace(".", " ").replace("'", "")
+
+
+def correct_table_units(table):
+    for cn in table.colnames:
+        col = table[cn]
+        if isinstance(col.unit, u.UnrecognizedUnit):
+            translated = _translate_unit(col.unit.name)
+            if translated is not None:
+                col.unit = translated
+        elif isinstance(col.unit, str):
+            col.unit = _clean_unit(col.unit)
+
+
+def read_results_chunks(file_name, outputFormat, chunk_size=100000,
+                        correct_units=True):
+    """Reads a results file as a sequence of tables
+
+    VOTable and CSV files are read incrementally, so that memory use is
+    bounded by the chunk size; FITS files are memory mapped. Other formats
+    are read at once and split.
+
+    Parameters
+    ----------
+    file_name : str, mandatory
+        results file
+    outputFormat : str, mandatory
+        results format
+    chunk_size : int, optional, default 100000
+        maximum number of rows per table
+    correct_units : bool, optional, default 'True'
+        if 'True', fix the unit strings of the tables
+
+    Returns
+    -------
+    An iterator of tables
+    """
+    astropyFormat = get_suitable_astropy_format(outputFormat)
+    if astropyFormat.startswith('votable'):
+        chunks = votablechunks.iter_votable_chunks(file_name, chunk_size)
+    elif astropyFormat == 'ascii.csv':
+        chunks = _iter_csv_chunks(file_name, chunk_size)
+    else:
+        if astropyFormat == 'fits':
+            table = APTable.read(file_name, format='fits', memmap=True)
+        else:
+            table = APTable.read(file_name, format=astropyFormat)
+        chunks = (table[i:i + chunk_size]
+                  for i in range(0, max(len(table), 1), chunk_size))
+    for chunk in chunks:
+        if correct_units:
+            correct_table_units(chunk)
+        yield chunk
+
+
+def _iter_csv_chunks(file_name, chunk_size):
+    with open(file_name, 'r') as f:
+        header = f.readline()
+        lines = []
+        inQuotes = False
+        dtypes = None
+        for line in f:
+            lines.append(line)
+            # a quoted value may span several lines
+            if line.count('"') % 2:
+                inQuotes = not inQuotes
+            if not inQuotes and len(lines) >= chunk_size:
+                chunk = _read_csv_chunk(header, lines, dtypes)
+                if dtypes is None:
+                    # all the chunks get the types of the first one
+                    dtypes = [chunk[name].dtype for name in chunk.colnames]
+                yield chunk
+                lines = []
+        if lines or dtypes is None:
+            yield _read_csv_chunk(header, lines, dtypes)
+
+
+def _read_csv_chunk(header, lines, dtypes):
+    table = APTable.read([header] + lines, format='ascii.csv', guess=False)
+    if dtypes is None or all(
+            col.dtype == dtype or col.dtype.kind == dtype.kind == 'U'
+            for col, dtype in zip(table.itercols(), dtypes)):
+        return table
+    # the guessed types differ: read again with the types of the first chunk
+    converters = {name: [convert_numpy(str if dtype.kind == 'U'
+                                       else dtype.type)]
+                  for name, dtype in zip(table.colnames, dtypes)}
+    return APTable.read([header] + lines, format='ascii.csv', guess=False,
+                        fast_reader=False, converters=converters)
+
+
 def get_suitable_astropy_format(outputFormat):
     if "csv" == outputFormat:
         return "ascii.csv"
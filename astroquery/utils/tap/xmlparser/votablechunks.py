@@ -0,0 +1,249 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""
+=============
+TAP plus
+=============
+
+Incremental reading of large VOTable files as a sequence of tables.
+
+The rows of the first table are read from disk a block at a time and each
+group of rows is parsed by `astropy.io.votable` together with the header of
+the document and the closing tags of the elements it leaves open, so that
+chunks get the same columns, types, masks and units as a complete read while
+memory use stays bounded by the chunk size. TABLEDATA, BINARY and BINARY2
+serializations are supported.
+
+"""
+import base64
+import io
+import math
+import re
+import struct
+
+from astropy.io import votable
+from astropy.table import Table as APTable
+
+__all__ = ['iter_votable_chunks']
+
+BLOCK_SIZE = 2 ** 20
+
+DATA_START = re.compile(br'<((?:[\w.-]+:)?)(TABLEDATA|BINARY2?)\b[^>]*>')
+STREAM_START = re.compile(br'<(?:[\w.-]+:)?STREAM\b[^>]*>')
+COMMENT = re.compile(br'<!--.*?-->', re.DOTALL)
+TAG = re.compile(br'<(/?)([A-Za-z_][\w.:-]*)[^>]*?(/?)>')
+
+# size in bytes of the VOTable primitive types; bits are handled separately
+DATATYPE_SIZES = {'boolean': 1, 'unsignedByte': 1, 'short': 2, 'int': 4,
+                  'long': 8, 'char': 1, 'unicodeChar': 2, 'float': 4,
+                  'double': 8, 'floatComplex': 8, 'doubleComplex': 16}
+
+
+def iter_votable_chunks(file_name, chunk_size):
+    """Reads the first table of a VOTable file in chunks of rows
+
+    Parameters
+    ----------
+    file_name : str, mandatory
+        VOTable file
+    chunk_size : int, mandatory
+        number of rows per chunk
+
+    Returns
+    -------
+    An iterator of `~astropy.table.Table`; at least one, possibly empty,
+    table is returned
+    """
+    with open(file_name, 'rb') as f:
+        layout = _find_data(f)
+        if layout is None:
+            # no table data, e.g. an empty result: small enough to read
+            f.seek(0)
+            yield _read_votable(f.read())
+            return
+        header, start, closing, tag = layout
+        footer = _closing_tags(header)
+        blocks = _read_data(f, start, closing)
+        if tag == b'TABLEDATA':
+            chunks = _iter_tabledata(blocks, chunk_size, _closing_tr(header))
+        else:
+            fields = votable.parse(io.BytesIO(header + footer)) \
+                .get_first_table().fields
+            chunks = _iter_binary(blocks, chunk_size,
+                                  _row_scanner(fields, tag == b'BINARY2'))
+        empty = True
+        for data in chunks:
+            empty = False
+            yield _read_votable(header + data + footer)
+        if empty:
+            yield _read_votable(header + footer)
+
+
+def _read_votable(content):
+    return APTable.read(io.BytesIO(content), format='votable')
+
+
+def _find_data(f):
+    """Returns the header, data start offset and data closing tag of the
+    first table"""
+    head = b''
+    match = None
+    while match is None:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            return None
+        head += block
+        match = DATA_START.search(head)
+    prefix, tag = match.group(1), match.group(2)
+    start = match.end()
+    if tag != b'TABLEDATA':
+        stream = STREAM_START.search(head, start)
+        while stream is None:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return None
+            head += block
+            stream = STREAM_START.search(head, start)
+        start = stream.end()
+        closing = b'</' + prefix + b'STREAM>'
+    else:
+        closing = b'</' + prefix + b'TABLEDATA>'
+    return head[:start], start, closing, tag
+
+
+def _closing_tags(header):
+    """Returns the closing tags of the elements left open by the header"""
+    stack = []
+    for match in TAG.finditer(COMMENT.sub(b'', header)):
+        closing, name, empty = match.groups()
+        if closing:
+            if stack and stack[-1] == name:
+                stack.pop()
+        elif not empty:
+            stack.append(name)
+    return b''.join(b'</' + name + b'>' for name in reversed(stack))
+
+
+def _read_data(f, start, closing):
+    """Yields the bytes of the data of a table, a block at a time, up to
+    its closing tag; the data of the following tables is never read"""
+    f.seek(start)
+    # a closing tag may be split between blocks
+    keep = len(closing) - 1
+    tail = b''
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            raise ValueError("Truncated VOTable: no " +
+                             closing.decode('ascii'))
+        block = tail + block
+        pos = block.find(closing)
+        if pos >= 0:
+            if pos:
+                yield block[:pos]
+            return
+        tail = block[-keep:]
+        if len(block) > keep:
+            yield block[:-keep]
+
+
+def _closing_tr(header):
+    match = DATA_START.search(header)
+    return b'</' + match.group(1) + b'TR>'
+
+
+def _iter_tabledata(blocks, chunk_size, closing):
+    buffer = bytearray()
+    searched = 0
+    rows = 0
+    for block in blocks:
+        buffer += block
+        while True:
+            pos = buffer.find(closing, searched)
+            if pos < 0:
+                # a closing tag may be split between blocks
+                searched = max(searched, len(buffer) - len(closing))
+                break
+            searched = pos + len(closing)
+            rows += 1
+            if rows == chunk_size:
+                yield bytes(buffer[:searched])
+                del buffer[:searched]
+                searched = 0
+                rows = 0
+    if rows:
+        yield bytes(buffer[:searched])
+
+
+def _row_scanner(fields, binary2):
+    """Returns a function giving the end offset of the rows of a buffer
+
+    Each item of the row layout is the size of a run of fixed-size fields,
+    or a negative item size for a variable length array, prefixed by its
+    4-byte element count (-0.125 for bit arrays, counted in bits).
+    """
+    layout = [int(math.ceil(len(fields) / 8.)) if binary2 else 0]
+    for field in fields:
+        if field.datatype == 'bit':
+            itemsize = 0.125
+        else:
+            itemsize = DATATYPE_SIZES[field.datatype]
+        dims = (field.arraysize or '1').split('x')
+        for dim in dims[:-1]:
+            itemsize *= int(dim)
+        if dims[-1].endswith('*'):
+            layout.extend([-itemsize, 0])
+        else:
+            layout[-1] += int(math.ceil(itemsize * int(dims[-1])))
+
+    if len(layout) == 1:
+        rowsize = layout[0]
+
+        def scan(buffer, pos, nrows):
+            nrows = min(nrows, (len(buffer) - pos) // rowsize)
+            return pos + nrows * rowsize, nrows
+        return scan
+
+    unpack = struct.Struct('>I').unpack_from
+
+    def scan(buffer, pos, nrows):
+        size = len(buffer)
+        done = 0
+        while done < nrows:
+            p = pos
+            for item in layout:
+                if item >= 0:
+                    p += item
+                else:
+                    if p + 4 > size:
+                        return pos, done
+                    p += 4 + int(math.ceil(-item * unpack(buffer, p)[0]))
+            if p > size:
+                break
+            pos = p
+            done += 1
+        return pos, done
+    return scan
+
+
+def _iter_binary(blocks, chunk_size, scan):
+    text = b''
+    # decoded rows of the current chunk, complete up to pos
+    buffer = bytearray()
+    pos = 0
+    rows = 0
+    for block in blocks:
+        text += b''.join(block.split())
+        usable = len(text) - len(text) % 4
+        buffer += base64.b64decode(text[:usable])
+        text = text[usable:]
+        while True:
+            pos, nrows = scan(buffer, pos, chunk_size - rows)
+            rows += nrows
+            if rows < chunk_size:
+                break
+            yield base64.b64encode(buffer[:pos])
+            del buffer[:pos]
+            pos = 0
+            rows = 0
+    if rows:
+        yield base64.b64encode(buffer[:pos])
@@ -0,0 +1,109 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+import hashlib
+import io
+import os
+
+import pytest
+import requests
+
+from ...query import BaseQuery
+from ..download_manager import Download, DownloadManager
+
+DATA = bytes(range(256)) * 1000
+
+
+class MockServer(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append((method, url, headers.get('Range')))
+        response = requests.Response()
+        response.url = url
+        response.headers['Accept-Ranges'] = 'bytes'
+        if 'missing' in url:
+            response.status_code = 404
+            response.raw = io.BytesIO(b'')
+            return response
+        body = DATA
+        response.status_code = 200
+        if 'Range' in headers:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            body = DATA[int(start):int(end) + 1]
+            response.status_code = 206
+        response.headers['Content-Length'] = str(len(body))
+        response.raw = io.BytesIO(b'' if method == 'HEAD' else body)
+        return response
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockServer()
+
+    def mock_request(session, *args, **kwargs):
+        return server.request(*args, **kwargs)
+
+    monkeypatch.setattr(requests.Session, 'request', mock_request)
+    return server
+
+
+def test_download_many(server, tmpdir):
+    query = BaseQuery()
+    paths = [tmpdir.join(name).strpath for name in ('a', 'b', 'c')]
+    manifest = DownloadManager(query).download(
+        [('http://a.b/a', paths[0]), ('http://a.b/missing', paths[1]),
+         Download('http://c.d/c', paths[2], size=len(DATA))])
+
+    assert list(manifest['Status']) == ['COMPLETE', 'ERROR', 'COMPLETE']
+    assert list(manifest['URL']) == ['http://a.b/a', 'http://a.b/missing',
+                                     'http://c.d/c']
+    assert 'HTTPError' in manifest['Message'][1]
+    for path in (paths[0], paths[2]):
+        with open(path, 'rb') as f:
+            assert f.read() == DATA
+
+
+def test_resume(server, tmpdir):
+    query = BaseQuery()
+    path = tmpdir.join('partial').strpath
+    with open(path, 'wb') as f:
+        f.write(DATA[:1000])
+
+    manifest = DownloadManager(query).download([('http://a.b/p', path)])
+
+    assert manifest['Status'][0] == 'COMPLETE'
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert ('GET', 'http://a.b/p',
+            'bytes=1000-{0}'.format(len(DATA) - 1)) in server.requests
+    # the range request must not leak into the session
+    assert 'Range' not in query._session.headers
+
+
+def test_segmented(server, tmpdir):
+    query = BaseQuery()
+    path = tmpdir.join('big').strpath
+    manager = DownloadManager(query, segments=4, segment_threshold=1000)
+    manifest = manager.download([('http://a.b/big', path)])
+
+    assert manifest['Status'][0] == 'COMPLETE'
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    ranges = [r for method, url, r in server.requests if method == 'GET']
+    assert len(ranges) == 4
+    assert ranges[0] == 'bytes=0-63999'
+
+
+def test_checksum(server, tmpdir):
+    query = BaseQuery()
+    good, bad = tmpdir.join('good').strpath, tmpdir.join('bad').strpath
+    md5 = hashlib.md5(DATA).hexdigest()
+    manifest = DownloadManager(query).download(
+        [Download('http://a.b/good', good, checksum='md5:' + md5),
+         Download('http://a.b/bad', bad, checksum='0' * 32)])
+
+    assert list(manifest['Status']) == ['COMPLETE', 'ERROR']
+    assert 'Checksum mismatch' in manifest['Message'][1]
+    assert not os.path.exists(bad)
@@ -1,5 +1,6 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import asyncio
 from collections import OrderedDict
 import os
 import requests
@@ -401,6 +402,22 @@ def test_payload_return(cls=DummyQuery):
     assert isinstance(result, six.string_types)
 
 
+def test_awaitable_query(cls=DummyQuery):
+    async def gather():
+        return await asyncio.gather(
+            DummyQuery.aquery(get_query_payload=True),
+            DummyQuery().aquery(get_query_payload=False))
+
+    loop = asyncio.new_event_loop()
+    try:
+        payload, result = loop.run_until_complete(gather())
+    finally:
+        loop.close()
+    assert payload == dict(msg='payload returned')
+    assert result == 'needs to be parsed'
+    assert 'query' in DummyQuery.aquery.__doc__
+
+
 fitsfilepath = os.path.join(os.path.dirname(__file__),
                             '../../sdss/tests/data/emptyfile.fits')
 
@@ -495,3 +512,21 @@ def test_is_coordinate(coordinates, expected):
 def test_radius_to_unit(radius):
     c = commons.radius_to_unit(radius)
     assert c is not None
+
+
+def test_split_batches():
+    batches = commons.split_batches(25, 10)
+    assert [(b.start, b.stop) for b in batches] == [(0, 9), (9, 17), (17, 25)]
+    assert commons.split_batches(3, 10) == [slice(0, 3)]
+    assert commons.split_batches(0, 10) == [slice(0, 0)]
+
+
+def test_map_concurrent():
+    def invert(value):
+        return 1. / value
+
+    results = commons.map_concurrent(invert, [1, 0, 4], 2)
+    assert results[0] == 1 and results[2] == 0.25
+    assert isinstance(results[1], ZeroDivisionError)
+    with pytest.raises(ZeroDivisionError):
+        commons.map_concurrent(invert, [1, 0, 4], 2, return_exceptions=False)
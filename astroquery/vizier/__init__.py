@@ -42,6 +42,15 @@ class Conf(_config.ConfigNamespace):
         'Maximum number of rows that will be fetched from the result '
         '(set to -1 for unlimited).')
 
+    batch_size = _config.ConfigItem(
+        1000,
+        'Maximum number of positions sent in a single multi-position '
+        'query; longer lists of positions are split into several queries.')
+
+    batch_workers = _config.ConfigItem(
+        4,
+        'Maximum number of multi-position queries in progress at once.')
+
 
 conf = Conf()
 
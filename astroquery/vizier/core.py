@@ -7,6 +7,7 @@ import json
 import copy
 import re
 
+import numpy as np
 import six
 from six import BytesIO
 import astropy.units as u
@@ -361,14 +362,7 @@ class VizierClass(BaseQuery):
             c = commons.parse_coordinates(coordinates).transform_to('fk5')
 
             if not c.isscalar:
-                pos_list = []
-                for pos in c:
-                    ra_deg = pos.ra.to_string(unit="deg", decimal=True,
-                                              precision=8)
-                    dec_deg = pos.dec.to_string(unit="deg", decimal=True,
-                                                precision=8, alwayssign=True)
-                    pos_list += ["{}{}".format(ra_deg, dec_deg)]
-                center["-c"] = "<<;" + ";".join(pos_list)
+                center["-c"] = "<<;" + ";".join(_format_positions(c))
                 columns += ["_q"]  # request a reference to the input table
             else:
                 ra = c.ra.to_string(unit='deg', decimal=True, precision=8)
@@ -378,18 +372,11 @@ class VizierClass(BaseQuery):
         elif isinstance(coordinates, tbl.Table):
             if (("_RAJ2000" in coordinates.keys()) and ("_DEJ2000" in
                                                         coordinates.keys())):
-                pos_list = []
                 sky_coord = coord.SkyCoord(coordinates["_RAJ2000"],
                                            coordinates["_DEJ2000"],
                                            unit=(coordinates["_RAJ2000"].unit,
                                                  coordinates["_DEJ2000"].unit))
-                for (ra, dec) in zip(sky_coord.ra, sky_coord.dec):
-                    ra_deg = ra.to_string(unit="deg", decimal=True,
-                                          precision=8)
-                    dec_deg = dec.to_string(unit="deg", decimal=True,
-                                            precision=8, alwayssign=True)
-                    pos_list += ["{}{}".format(ra_deg, dec_deg)]
-                center["-c"] = "<<;" + ";".join(pos_list)
+                center["-c"] = "<<;" + ";".join(_format_positions(sky_coord))
                 columns += ["_q"]  # request a reference to the input table
             else:
                 raise ValueError("Table must contain '_RAJ2000' and "
@@ -445,6 +432,92 @@ class VizierClass(BaseQuery):
             data=data_payload, timeout=self.TIMEOUT, cache=cache)
         return response
 
+    def query_region(self, coordinates, radius=None, inner_radius=None,
+                     width=None, height=None, catalog=None,
+                     get_query_payload=False, cache=True,
+                     return_type='votable', column_filters={}, verbose=False):
+        """
+        Queries a region around the specified coordinates.
+
+        Parameters
+        ----------
+        coordinates : str, `astropy.coordinates` object, or `~astropy.table.Table`
+            The target around which to search. It may be specified as a
+            string in which case it is resolved using online services or as
+            the appropriate `astropy.coordinates` object. ICRS coordinates
+            may also be entered as a string.  If a table is used, each of
+            its rows will be queried, as long as it contains two columns
+            named ``_RAJ2000`` and ``_DEJ2000`` with proper angular units.
+        radius : convertible to `~astropy.coordinates.Angle`
+            The radius of the circular region to query.
+        inner_radius : convertible to `~astropy.coordinates.Angle`
+            When set in addition to ``radius``, the queried region becomes
+            annular, with outer radius ``radius`` and inner radius
+            ``inner_radius``.
+        width : convertible to `~astropy.coordinates.Angle`
+            The width of the square region to query.
+        height : convertible to `~astropy.coordinates.Angle`
+            When set in addition to ``width``, the queried region becomes
+            rectangular, with the specified ``width`` and ``height``.
+        catalog : str or list, optional
+            The catalog(s) which must be searched for this identifier.
+            If not specified, all matching catalogs will be searched.
+        column_filters: dict, optional
+            Constraints on columns of the result. The dictionary contains
+            the column name as keys, and the constraints as values.
+
+        Returns
+        -------
+        result : `~astroquery.utils.commons.TableList`
+            The tables of the catalogs matching the region.
+
+        Notes
+        -----
+        Lists of more than ``conf.batch_size`` positions are split into
+        several queries, up to ``conf.batch_workers`` of them in progress at
+        once.  The tables of each catalog are stacked in the order of the
+        positions, and their ``_q`` column holds the (1-based) index of the
+        matching position in the whole list.  The row limit applies to each
+        query.
+        """
+        positions = None
+        if not get_query_payload and return_type == 'votable':
+            if isinstance(coordinates, tbl.Table):
+                positions = coordinates
+            elif isinstance(coordinates, commons.CoordClasses):
+                positions = commons.parse_coordinates(coordinates)
+                if positions.isscalar:
+                    positions = None
+        if positions is not None and len(positions) > conf.batch_size:
+            batches = commons.split_batches(len(positions), conf.batch_size)
+            payloads = [dict(method='POST',
+                             url=self._server_to_url(return_type=return_type),
+                             data=self.query_region_async(
+                                 positions[batch], radius=radius,
+                                 inner_radius=inner_radius, width=width,
+                                 height=height, catalog=catalog,
+                                 get_query_payload=True,
+                                 column_filters=column_filters))
+                        for batch in batches]
+            responses = self.request_many(payloads,
+                                          max_workers=conf.batch_workers,
+                                          return_exceptions=False,
+                                          timeout=self.TIMEOUT, cache=cache)
+            results = [self._parse_result(response, verbose=verbose)
+                       for response in responses]
+            result = _merge_position_results(results, batches)
+        else:
+            response = self.query_region_async(
+                coordinates, radius=radius, inner_radius=inner_radius,
+                width=width, height=height, catalog=catalog,
+                get_query_payload=get_query_payload, cache=cache,
+                return_type=return_type, column_filters=column_filters)
+            if get_query_payload:
+                return response
+            result = self._parse_result(response, verbose=verbose)
+        self.table = result
+        return result
+
     def query_constraints_async(self, catalog=None, return_type='votable',
                                 cache=True, get_query_payload=False,
                                 **kwargs):
@@ -617,7 +690,7 @@ class VizierClass(BaseQuery):
         return script
 
     def _parse_result(self, response, get_catalog_names=False, verbose=False,
-                      invalid='warn'):
+                      invalid='warn', columns=None, table_number=None):
         """
         Parses the HTTP response to create a `~astropy.table.Table`.
 
@@ -634,12 +707,18 @@ class VizierClass(BaseQuery):
         invalid : 'warn', 'mask' or 'exception'
             (only for VOTABLE queries)
             The behavior if a VOTABLE cannot be parsed. The default is
-            'warn', which will try to parse the table, but if an
-            exception is raised during parsing, the exception will be
-            issued as a warning instead and a masked table will be
-            returned. A value of 'exception' will not catch the
-            exception, while a value of 'mask' will simply always mask
-            invalid values.
+            'warn', which, like 'mask', masks invalid values and shows the
+            warnings of the VOTABLE parser if ``verbose`` is set. A value
+            of 'exception' raises the first error instead.
+        columns : list of str, optional
+            (only for VOTABLE queries)
+            The names of the columns to read; the other columns are skipped
+            while parsing. Every table of the VOTABLE, including those
+            skipped with ``table_number``, must have these columns.
+        table_number : int, optional
+            (only for VOTABLE queries)
+            The position of the only table to read in the VOTABLE, starting
+            at 0; the data of the other tables is skipped while parsing.
 
         Returns
         -------
@@ -648,11 +727,15 @@ class VizierClass(BaseQuery):
             as a string.
 
         """
-        if response.content[:5] == b'<?xml':
+        with commons.response_fileobj(response) as fileobj:
+            is_votable = fileobj.read(5) == b'<?xml'
+        if is_votable:
             try:
-                return parse_vizier_votable(
-                    response.content, verbose=verbose, invalid=invalid,
-                    get_catalog_names=get_catalog_names)
+                with commons.response_fileobj(response) as fileobj:
+                    return parse_vizier_votable(
+                        fileobj, verbose=verbose, invalid=invalid,
+                        get_catalog_names=get_catalog_names,
+                        columns=columns, table_number=table_number)
             except Exception as ex:
                 self.response = response
                 self.table_parse_error = ex
@@ -705,42 +788,60 @@ def parse_vizier_tsvfile(data, verbose=False):
 
 
 def parse_vizier_votable(data, verbose=False, invalid='warn',
-                         get_catalog_names=False):
+                         get_catalog_names=False, columns=None,
+                         table_number=None):
     """
-    Given a votable as string, parse it into dict or tables
+    Given a votable as string or binary file object, parse it into dict or
+    tables
+
+    Parameters
+    ----------
+    data : str or file
+        The VOTable
+    invalid : 'warn', 'mask' or 'exception'
+        The behavior for values that cannot be parsed: 'warn' and 'mask'
+        mask them, the warnings of the VOTable parser being shown only if
+        ``verbose`` is set, and 'exception' raises the first error.
+    get_catalog_names : bool
+        If True, return the resources by name instead of tables.
+    columns : list of str, optional
+        The names of the columns to read, the other columns being skipped
+        by the parser.  Every table of the VOTable must have them.
+    table_number : int, optional
+        The position of the only table to read, the data of the other tables
+        being skipped by the parser.
     """
     if not verbose:
         commons.suppress_vo_warnings()
 
-    tf = BytesIO(data)
-
-    if invalid == 'mask':
-        vo_tree = votable.parse(tf, pedantic=False, invalid='mask')
-    elif invalid == 'warn':
-        try:
-            vo_tree = votable.parse(tf, pedantic=False, invalid='exception')
-        except Exception as ex:
-            warnings.warn("VOTABLE parsing raised exception: {0}".format(ex))
-            vo_tree = votable.parse(tf, pedantic=False, invalid='mask')
-    elif invalid == 'exception':
-        vo_tree = votable.parse(tf, pedantic=False, invalid='exception')
-    else:
+    if invalid in ('warn', 'mask'):
+        invalid = 'mask'
+    elif invalid != 'exception':
         raise ValueError("Invalid keyword for 'invalid'. "
                          "Must be exception, mask, or warn")
 
+    tf = data if hasattr(data, 'read') else BytesIO(data)
+    # a single pass over the document, reading only the selected data
+    vo_tree = votable.parse(tf, pedantic=False, invalid=invalid,
+                            columns=columns, table_number=table_number)
+
     if get_catalog_names:
         return OrderedDict([(R.name, R) for R in vo_tree.resources])
     else:
         table_dict = OrderedDict()
         for t in vo_tree.iter_tables():
-            if len(t.array) > 0:
+            # tables skipped for table_number are empty
+            if not t.is_empty() and len(t.array) > 0:
                 if t.ref is not None:
                     name = vo_tree.get_table_by_id(t.ref).name
                 else:
                     name = t.name
                 if name not in table_dict.keys():
                     table_dict[name] = []
-                table_dict[name] += [t.to_table()]
+                table = t.to_table()
+                if columns is not None:
+                    table.keep_columns(columns)
+                table_dict[name] += [table]
         for name in table_dict.keys():
             if len(table_dict[name]) > 1:
                 table_dict[name] = tbl.vstack(table_dict[name])
@@ -749,6 +850,36 @@ def parse_vizier_votable(data, verbose=False, invalid='warn',
         return commons.TableList(table_dict)
 
 
+def _format_positions(sky_coord):
+    """
+    Formats the positions of a `~astropy.coordinates.SkyCoord` array as
+    decimal degrees, e.g. ``'10.68470833+41.26875000'``, in one go.
+    """
+    return np.char.add(np.char.mod('%.8f', sky_coord.ra.deg),
+                       np.char.mod('%+.8f', sky_coord.dec.deg)).tolist()
+
+
+def _merge_position_results(results, batches):
+    """
+    Merges the results of the batches of a multi-position query into a
+    single `~astroquery.utils.commons.TableList`, stacking the tables of each
+    catalog and shifting their ``_q`` references by the offset of the batch.
+    """
+    merged = OrderedDict()
+    for result, batch in zip(results, batches):
+        for name in result.keys():
+            table = result[name]
+            if '_q' in table.colnames and batch.start:
+                table['_q'] += batch.start
+            merged.setdefault(name, []).append(table)
+    for name, tables in merged.items():
+        if len(tables) > 1:
+            merged[name] = tbl.vstack(tables, metadata_conflicts='silent')
+        else:
+            merged[name] = tables[0]
+    return commons.TableList(merged)
+
+
 def _parse_angle(angle):
     """
     Returns the Vizier-formatted units and values for box/radius
@@ -1,5 +1,6 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 import os
+import numpy as np
 import requests
 from numpy import testing as npt
 import pytest
@@ -117,6 +118,60 @@ def test_parse_result(filepath, objlen):
     assert isinstance(result[result.keys()[0]], Table)
 
 
+INVALID_VOTABLE = b"""<?xml version="1.0"?>
+<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">
+<RESOURCE name="cat">
+<TABLE name="cat/table">
+<FIELD name="id" ID="id" datatype="int"/>
+<FIELD name="mag" ID="mag" datatype="double"/>
+<DATA><TABLEDATA>
+<TR><TD>1</TD><TD>10.5</TD></TR>
+<TR><TD>abc</TD><TD>11.5</TD></TR>
+<TR><TD>3</TD><TD>12.5</TD></TR>
+</TABLEDATA></DATA>
+</TABLE>
+</RESOURCE>
+</VOTABLE>
+"""
+
+
+def test_parse_votable_invalid(monkeypatch):
+    parse = vizier.core.votable.parse
+    calls = []
+
+    def counting_parse(*args, **kwargs):
+        calls.append(kwargs['invalid'])
+        return parse(*args, **kwargs)
+    monkeypatch.setattr(vizier.core.votable, 'parse', counting_parse)
+
+    for invalid in ('warn', 'mask'):
+        table = vizier.core.parse_vizier_votable(
+            INVALID_VOTABLE, invalid=invalid)['cat/table']
+        assert list(table['id'].mask) == [False, True, False]
+        assert list(table['id'][[0, 2]]) == [1, 3]
+        assert list(table['mag']) == [10.5, 11.5, 12.5]
+    # the VOTable is parsed a single time
+    assert calls == ['mask', 'mask']
+
+    with pytest.raises(ValueError):
+        vizier.core.parse_vizier_votable(INVALID_VOTABLE, invalid='exception')
+    with pytest.raises(ValueError):
+        vizier.core.parse_vizier_votable(INVALID_VOTABLE, invalid='ignore')
+
+    # the invalid column is not parsed when not selected
+    table = vizier.core.parse_vizier_votable(
+        INVALID_VOTABLE, invalid='exception', columns=['mag'])['cat/table']
+    assert table.colnames == ['mag']
+    assert list(table['mag']) == [10.5, 11.5, 12.5]
+
+
+def test_parse_result_table_number():
+    response = MockResponse(open(data_path('viz.xml'), 'rb').read())
+    result = vizier.core.Vizier._parse_result(response, table_number=1)
+    assert result.keys() == ['I/34/greenw2a']
+    assert result[0].colnames == ['_RAB1950', '_DEB1950']
+
+
 def test_query_region_async(patch_post):
     target = commons.ICRSCoordGenerator(ra=299.590, dec=35.201,
                                         unit=(u.deg, u.deg))
@@ -150,6 +205,49 @@ def test_query_regions(patch_post):
                                     catalog=["HIP", "NOMAD", "UCAC"])
 
 
+def positions_mockreturn(self, method, url, data=None, timeout=10, **kwargs):
+    """Answers a multi-position query with one row per position, in two
+    catalogs"""
+    script = dict(line.split('=', 1) for line in data.split('\n'))
+    positions = script['-c'][3:].split(';')
+    rows = "".join("<TR><TD>{0}</TD><TD>{1}</TD></TR>".format(q, position)
+                   for q, position in enumerate(positions, 1))
+    resource = ('<RESOURCE name="{0}"><TABLE name="{0}">'
+                '<FIELD name="_q" ID="_q" datatype="int"/>'
+                '<FIELD name="pos" ID="pos" datatype="char" arraysize="*"/>'
+                '<DATA><TABLEDATA>{1}</TABLEDATA></DATA></TABLE></RESOURCE>')
+    content = ('<?xml version="1.0"?><VOTABLE version="1.3">' +
+               resource.format('cat1', rows) + resource.format('cat2', rows) +
+               '</VOTABLE>')
+    return MockResponse(content.encode('ascii'))
+
+
+def test_query_region_batches(monkeypatch):
+    monkeypatch.setattr(requests.Session, 'request', positions_mockreturn)
+    targets = commons.ICRSCoordGenerator(ra=np.linspace(0, 10, 7),
+                                         dec=np.linspace(-5, 5, 7),
+                                         unit=(u.deg, u.deg))
+    expected = vizier.core._format_positions(targets.transform_to('fk5'))
+    table_expected = vizier.core._format_positions(targets)
+
+    with vizier.conf.set_temp('batch_size', 3):
+        result = vizier.core.Vizier.query_region(targets, radius=5 * u.deg)
+        table = Table([targets.ra, targets.dec], names=['_RAJ2000',
+                                                        '_DEJ2000'])
+        table_result = vizier.core.Vizier.query_region(table,
+                                                       radius=5 * u.deg)
+    for result, positions in [(result, expected),
+                              (table_result, table_expected)]:
+        assert result.keys() == ['cat1', 'cat2']
+        for name in result.keys():
+            assert list(result[name]['_q']) == list(range(1, 8))
+            assert list(result[name]['pos']) == positions
+
+    payload = vizier.core.Vizier.query_region(targets, radius=5 * u.deg,
+                                              get_query_payload=True)
+    assert '-c=<<;' + ';'.join(expected) in payload
+
+
 def test_query_object_async(patch_post):
     response = vizier.core.Vizier.query_object_async(
         "HD 226868", catalog=["NOMAD", "UCAC"])
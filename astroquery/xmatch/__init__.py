@@ -14,6 +14,20 @@ class Conf(_config.ConfigNamespace):
         300,
         'time limit for connecting to xMatch server')
 
+    tables_ttl = _config.ConfigItem(
+        86400,
+        'Number of seconds the list of the VizieR tables available in xMatch '
+        'is kept in memory before being downloaded again.')
+
+    batch_size = _config.ConfigItem(
+        1000000,
+        'Maximum number of rows of an uploaded table sent in a single query; '
+        'larger tables are split into declination bands queried separately.')
+
+    batch_workers = _config.ConfigItem(
+        2,
+        'Maximum number of queries of a split table in progress at once.')
+
 
 conf = Conf()
 
@@ -1,9 +1,19 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import bisect
+import fnmatch
+import hashlib
+import io
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
 import six
 from astropy.io import ascii
 import astropy.units as u
-from astropy.table import Table
+from astropy.table import Table, vstack
 
 from . import conf
 from ..query import BaseQuery
@@ -66,7 +76,21 @@ class XMatchClass(BaseQuery):
         -------
         table : `~astropy.table.Table`
             Query results table
+
+        Notes
+        -----
+        An uploaded ``cat1`` table of more than ``conf.batch_size`` rows is
+        split into declination bands, each sent as a separate query with up
+        to ``conf.batch_workers`` of them in progress at once, and the results
+        are stacked.  Every row of ``cat1`` is matched against the whole of
+        ``cat2``, so that the result holds the same matches as a single
+        query, in a different order.
         """
+        if (not get_query_payload and isinstance(cat1, Table) and
+                len(cat1) > conf.batch_size):
+            return self._query_batches(cat1, cat2, max_distance, colRA1,
+                                       colDec1, colRA2, colDec2, area=area,
+                                       cache=cache, **kwargs)
         response = self.query_async(cat1, cat2, max_distance, colRA1, colDec1,
                                     colRA2, colDec2, area=area, cache=cache,
                                     get_query_payload=get_query_payload,
@@ -103,12 +127,43 @@ class XMatchClass(BaseQuery):
         if get_query_payload:
             return payload, kwargs
 
-        response = self._request(method='POST', url=self.URL, data=payload,
+        if 'files' in kwargs:
+            # the uploaded tables are streamed rather than encoded in memory
+            data = _MultipartBody(payload, kwargs.pop('files'))
+            kwargs['headers'] = {'Content-Type': data.content_type}
+        else:
+            data = payload
+        response = self._request(method='POST', url=self.URL, data=data,
                                  timeout=self.TIMEOUT, cache=cache, **kwargs)
         response.raise_for_status()
 
         return response
 
+    def _query_batches(self, cat1, cat2, max_distance, colRA1, colDec1,
+                       colRA2, colDec2, area='allsky', cache=True, **kwargs):
+        """
+        Queries the declination bands of a large ``cat1`` table concurrently
+        and stacks the results.
+        """
+        if colDec1 in cat1.colnames:
+            order = np.argsort(np.asarray(cat1[colDec1]), kind='mergesort')
+        else:
+            # the missing column is reported by the query
+            order = np.arange(len(cat1))
+        n_batches = -(-len(cat1) // conf.batch_size)
+
+        def query_band(rows):
+            return self.query(cat1[rows], cat2, max_distance, colRA1, colDec1,
+                              colRA2, colDec2, area=area, cache=cache,
+                              **kwargs)
+
+        results = self.map_query(query_band, np.array_split(order, n_batches),
+                                 max_workers=conf.batch_workers,
+                                 return_exceptions=False)
+        # bands without matches may have untyped columns
+        tables = [table for table in results if len(table)] or results[:1]
+        return vstack(tables, metadata_conflicts='silent')
+
     def _prepare_sending_table(self, i, payload, kwargs, cat, colRA, colDec):
         '''Check if table is a string, a `astropy.table.Table`, etc. and set
         query parameters accordingly.
@@ -120,13 +175,12 @@ class XMatchClass(BaseQuery):
             # write the Table's content into a new, temporary CSV-file
             # so that it can be pointed to via the `files` option
             # file will be closed when garbage-collected
-            fp = six.StringIO()
-            cat.write(fp, format='ascii.csv')
-            fp.seek(0)
-            kwargs['files'] = {catstr: ('cat1.csv', fp.read())}
+            kwargs.setdefault('files', {})[catstr] = ('cat1.csv',
+                                                      _write_csv(cat))
         else:
             # assume it's a file-like object, support duck-typing
-            kwargs['files'] = {catstr: ('cat1.csv', cat.read())}
+            kwargs.setdefault('files', {})[catstr] = ('cat1.csv',
+                                                      _copy_file(cat))
 
         if not self.is_table_available(cat):
             if ((colRA is None) or (colDec is None)):
@@ -164,39 +218,250 @@ class XMatchClass(BaseQuery):
         if (table_id[:7] == 'vizier:'):
             table_id = table_id[7:]
 
-        return table_id in self.get_available_tables()
+        return table_id in self._get_table_index()
 
-    def get_available_tables(self, cache=True):
+    def get_available_tables(self, cache=True, pattern=None):
         """Get the list of the VizieR tables which are available in the
         xMatch service and return them as a list of strings.
 
+        The list is downloaded once and kept in memory for
+        ``conf.tables_ttl`` seconds, shared by all the `XMatchClass`
+        instances using the same service.
+
+        Parameters
+        ----------
+        cache : bool
+            If False, the list is downloaded again.
+        pattern : str, optional
+            Only return the names matching this shell-style pattern, e.g.
+            ``'II/246/*'``, in alphabetical order.
+
         """
-        response = self._request(
-            'GET',
-            url_helpers.urljoin_keep_path(self.URL, 'tables'),
-            {'action': 'getVizieRTableNames', 'RESPONSEFORMAT': 'txt'},
-            cache=cache,
-        )
+        index = self._get_table_index(cache=cache)
+        if pattern is None:
+            return list(index.names)
+        return index.match(pattern)
 
-        content = response.text
-        return content.splitlines()
+    def _get_table_index(self, cache=True):
+        """Returns the `_TableIndex` of the service, downloading the list of
+        tables if it is missing or expired.
+        """
+        with _table_indexes_lock:
+            index = _table_indexes.get(self.URL)
+            if cache and index is not None and not index.expired():
+                return index
+            response = self._request(
+                'GET',
+                url_helpers.urljoin_keep_path(self.URL, 'tables'),
+                {'action': 'getVizieRTableNames', 'RESPONSEFORMAT': 'txt'},
+                cache=cache,
+            )
+            index = _TableIndex(response.text.splitlines())
+            _table_indexes[self.URL] = index
+            return index
 
     def _parse_text(self, text):
         """
         Parse a CSV text file that has potentially duplicated header names
         """
-        header = text.split("\n")[0]
-        colnames = header.split(",")
+        header, newline, _ = text.partition("\n")
+        if not newline:
+            # a lone line would be taken for a file name
+            text += "\n"
+        colnames = header.rstrip("\r").split(",")
         for cn in colnames:
             if colnames.count(cn) > 1:
                 ii = 1
                 while colnames.count(cn) > 0:
                     colnames[colnames.index(cn)] = cn + "_{ii}".format(ii=ii)
                     ii += 1
-        new_text = ",".join(colnames) + "\n" + "\n".join(text.split("\n")[1:])
-        result = ascii.read(new_text, format='csv', fast_reader=False)
+        # the header is renamed rather than rewritten in a copy of the text
+        result = ascii.read(text, format='csv', names=colnames)
 
         return result
 
 
+class _TableIndex(object):
+    """
+    The names of the VizieR tables available in the xMatch service, with a
+    hash set for membership tests and a sorted list for prefix and pattern
+    lookups.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self._set = frozenset(names)
+        self._sorted = sorted(self._set)
+        self.loaded = time.time()
+
+    def __contains__(self, name):
+        return name in self._set
+
+    def __len__(self):
+        return len(self._set)
+
+    def expired(self):
+        return time.time() - self.loaded > conf.tables_ttl
+
+    def with_prefix(self, prefix):
+        """Returns the names starting with 'prefix', in alphabetical order"""
+        start = bisect.bisect_left(self._sorted, prefix)
+        names = []
+        for name in self._sorted[start:]:
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+        return names
+
+    def match(self, pattern):
+        """Returns the names matching a shell-style pattern, in alphabetical
+        order"""
+        # only the names starting with the literal part of the pattern
+        # are compared with the pattern
+        prefix = re.split(r'[*?\[]', pattern, 1)[0]
+        names = self.with_prefix(prefix)
+        if prefix == pattern:
+            return names if pattern in self._set else []
+        return [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+
+
+# the table indexes of the services, by URL
+_table_indexes = {}
+_table_indexes_lock = threading.Lock()
+
+# files up to this size are kept in memory rather than on disk
+SPOOL_SIZE = 2 ** 24
+
+# number of rows of a table converted to CSV at once
+CSV_BLOCK_ROWS = 100000
+
+
+def _write_csv(table):
+    """
+    Writes a table as CSV to a temporary file, a block of rows at a time so
+    that the text of the whole table is never held in memory.
+    """
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    for start in range(0, max(len(table), 1), CSV_BLOCK_ROWS):
+        block = six.StringIO()
+        table[start:start + CSV_BLOCK_ROWS].write(block, format='ascii.csv')
+        text = block.getvalue()
+        if start:
+            text = text[text.index('\n') + 1:]
+        fileobj.write(text.encode('utf-8'))
+    fileobj.seek(0)
+    return fileobj
+
+
+def _copy_file(source):
+    """
+    Copies a text or binary file object to a temporary binary file.
+    """
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    while True:
+        block = source.read(io.DEFAULT_BUFFER_SIZE)
+        if not block:
+            break
+        if isinstance(block, six.text_type):
+            block = block.encode('utf-8')
+        fileobj.write(block)
+    fileobj.seek(0)
+    return fileobj
+
+
+class _MultipartBody(object):
+    """
+    A multipart/form-data request body streamed from seekable binary files.
+
+    The body is read by `requests` a block at a time; its length is known
+    beforehand.  The boundary is derived from the content, so that the same
+    request gets the same cache key.
+    """
+
+    def __init__(self, fields, files):
+        digest = hashlib.sha224()
+        for name, value in sorted(fields.items()):
+            digest.update(u'{0}={1}\n'.format(name, value).encode('utf-8'))
+        sizes = {}
+        for name, (filename, fileobj) in sorted(files.items()):
+            digest.update(u'{0}={1}\n'.format(name, filename).encode('utf-8'))
+            fileobj.seek(0)
+            size = 0
+            for block in iter(lambda: fileobj.read(io.DEFAULT_BUFFER_SIZE),
+                              b''):
+                digest.update(block)
+                size += len(block)
+            sizes[name] = size
+            fileobj.seek(0)
+        self.cache_key = digest.hexdigest()
+        self.boundary = self.cache_key[:32]
+        self.content_type = ('multipart/form-data; boundary=' +
+                             self.boundary)
+
+        # the parts are byte strings and (file, size) pairs
+        self._parts = []
+        for name, value in fields.items():
+            self._parts.append(self._part_header(name) +
+                               six.text_type(value).encode('utf-8') + b'\r\n')
+        for name, (filename, fileobj) in files.items():
+            self._parts.append(self._part_header(name, filename))
+            self._parts.append((fileobj, sizes[name]))
+            self._parts.append(b'\r\n')
+        self._parts.append(u'--{0}--\r\n'.format(self.boundary)
+                           .encode('ascii'))
+        self._length = sum(len(part) if isinstance(part, bytes) else part[1]
+                           for part in self._parts)
+        self.seek(0)
+
+    def _part_header(self, name, filename=None):
+        disposition = u'form-data; name="{0}"'.format(name)
+        if filename is not None:
+            disposition += u'; filename="{0}"'.format(filename)
+        header = u'--{0}\r\nContent-Disposition: {1}\r\n'.format(
+            self.boundary, disposition)
+        if filename is not None:
+            header += u'Content-Type: text/csv\r\n'
+        return (header + u'\r\n').encode('utf-8')
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(lambda: self.read(io.DEFAULT_BUFFER_SIZE), b'')
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Body can only be rewound")
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+        return 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        chunks = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, bytes):
+                chunk = part[self._offset:self._offset + size]
+                length = len(part)
+            else:
+                fileobj, length = part
+                fileobj.seek(self._offset)
+                chunk = fileobj.read(min(size, length - self._offset))
+            self._offset += len(chunk)
+            if self._offset >= length or not chunk:
+                self._index += 1
+                self._offset = 0
+            size -= len(chunk)
+            chunks.append(chunk)
+        data = b''.join(chunks)
+        self._position += len(data)
+        return data
+
+
 XMatch = XMatchClass()
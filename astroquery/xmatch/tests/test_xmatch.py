@@ -3,13 +3,17 @@ import os.path
 
 import requests
 import pytest
+import six
+import urllib3
 from astropy.io import ascii
 from astropy.table import Table
 from astropy.units import arcsec
 
 from ...utils import commons
 from ...utils.testing_tools import MockResponse
-from ...xmatch import XMatch
+from ...xmatch import XMatch, XMatchClass, conf
+from ...xmatch import core as xmatch_core
+from ...xmatch.core import _MultipartBody, _write_csv
 
 DATA_FILES = {
     'get': 'tables.csv',  # .action.getVizieRTableNames
@@ -42,6 +46,13 @@ def patch_request(request):
     return mp
 
 
+@pytest.fixture(autouse=True)
+def clear_table_indexes():
+    xmatch_core._table_indexes.clear()
+    yield
+    xmatch_core._table_indexes.clear()
+
+
 def request_mockreturn(method, url, data, **kwargs):
     return MockResponseXmatch(method, url, data)
 
@@ -68,6 +79,34 @@ def test_get_available_tables(monkeypatch):
     assert 'II/246/out' in tables
 
 
+def test_available_tables_index(monkeypatch):
+    requests_made = []
+
+    def counting_request(self, method, url, data, **kwargs):
+        requests_made.append(url)
+        return request_mockreturn(method, url, data, **kwargs)
+    monkeypatch.setattr(XMatchClass, '_request', counting_request)
+
+    # the index is shared by the instances
+    assert XMatch().is_table_available('II/246/out')
+    assert not XMatch().is_table_available('II/246')
+    assert len(requests_made) == 1
+
+    xm = XMatch()
+    assert xm.get_available_tables(pattern='II/246/*') == ['II/246/out']
+    assert xm.get_available_tables(pattern='II/246/out') == ['II/246/out']
+    assert xm.get_available_tables(pattern='II/246') == []
+    assert all(name.startswith('J/')
+               for name in xm.get_available_tables(pattern='J/*/t?ble*'))
+    assert len(requests_made) == 1
+
+    xm.get_available_tables(cache=False)
+    assert len(requests_made) == 2
+    with conf.set_temp('tables_ttl', -1):
+        xm.is_table_available('II/246/out')
+    assert len(requests_made) == 3
+
+
 def test_xmatch_is_avail_table(monkeypatch):
     xm = XMatch()
     monkeypatch.setattr(xm, '_request', request_mockreturn)
@@ -127,3 +166,71 @@ def test_xmatch_query_cat1_table_local(monkeypatch):
 def test_parse_text(datafile):
     xm = XMatch()
     xm._parse_text(datafile)
+
+
+def test_parse_text_duplicates():
+    with open(data_path('poslist_duplicates.csv')) as f:
+        table = XMatch()._parse_text(f.read())
+    assert table.colnames == ['ra', 'dec_1', 'my_id_1', '          ra',
+                              'dec_2', 'my_id_2']
+    assert len(table) == 6
+
+
+def test_multipart_body():
+    table = Table.read(data_path('posList.csv'), format='ascii.csv')
+    fileobj = _write_csv(table)
+    csv = fileobj.read()
+    fields = {'request': 'xmatch', 'distMaxArcsec': 5.0, 'cat2': 'simbad'}
+    body = _MultipartBody(fields, {'cat1': ('cat1.csv', fileobj)})
+    expected, content_type = urllib3.encode_multipart_formdata(
+        [(k, str(v)) for k, v in fields.items()] +
+        [('cat1', ('cat1.csv', csv, 'text/csv'))], boundary=body.boundary)
+    assert body.content_type == content_type
+    assert len(body) == len(expected)
+    assert b''.join(iter(lambda: body.read(7), b'')) == expected
+    body.seek(0)
+    assert body.read() == expected
+
+    # the boundary, hence the cache key, only depends on the content
+    fileobj.seek(0)
+    again = _MultipartBody(fields, {'cat1': ('cat1.csv', fileobj)})
+    assert again.cache_key == body.cache_key
+
+
+def test_write_csv_blocks(monkeypatch):
+    table = Table.read(data_path('posList.csv'), format='ascii.csv')
+    monkeypatch.setattr('astroquery.xmatch.core.CSV_BLOCK_ROWS', 4)
+    expected = open(data_path('posList.csv'), 'rb').read()
+    assert _write_csv(table).read().split() == expected.split()
+    assert _write_csv(table[:0]).read().strip() == b'ra,dec,my_id'
+
+
+def test_xmatch_query_batches(monkeypatch):
+    xm = XMatch()
+    uploads = []
+
+    def match_request(method, url, data, **kwargs):
+        if method == 'GET':
+            return request_mockreturn(method, url, data, **kwargs)
+        # matches each uploaded row with itself
+        content = data.read()
+        csv = content.split(b'filename="cat1.csv"')[1].split(b'\r\n\r\n')[1]
+        upload = ascii.read(csv.split(b'\r\n--')[0].decode(), format='csv')
+        uploads.append(upload)
+        upload['angDist'] = 0.
+        text = six.StringIO()
+        upload.write(text, format='ascii.csv')
+        return MockResponse(text.getvalue().encode())
+    monkeypatch.setattr(xm, '_request', match_request)
+
+    input_table = Table.read(data_path('posList.csv'), format='ascii.csv')
+    with conf.set_temp('batch_size', 2):
+        table = xm.query(cat1=input_table, cat2='vizier:II/246/out',
+                         max_distance=5 * arcsec, colRA1='ra', colDec1='dec')
+    assert len(uploads) == 3
+    assert all(len(upload) == 2 for upload in uploads)
+    # the batches are declination bands
+    bands = sorted((min(u['dec']), max(u['dec'])) for u in uploads)
+    assert all(bands[i][1] < bands[i + 1][0] for i in range(2))
+    assert sorted(table['my_id']) == list(range(1, 7))
+    assert table.colnames == ['ra', 'dec', 'my_id', 'angDist']